@@ -0,0 +1,84 @@
+"""
+Timings of the method analysis on generated code with huge functions.
+
+Three shapes of source are generated at growing sizes:
+  - wide:   one function with n parameters of every kind
+  - long:   one function with n statements and n return statements
+  - nested: about n functions in chains nested up to 90 deep, each with its own returns
+
+For each, the time of method_analyzer() (its own walk) and of file_analyzer()
+(the single pass used by the analysis) is printed with the time per AST node.
+The per-node time should stay about flat as n grows: the analysis is linear.
+
+    python benchmarks/method_analyzer_benchmark.py [--sizes 250 500 1000 2000] [--repeat 3]
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from web_app.analyzer.method_analyzer import method_analyzer
+from web_app.analyzer.file_analyzer import file_analyzer
+
+def wide_function(n: int) -> str:
+    quarter = max(1, n // 4)
+    posonly = ", ".join(f"p{i}: int" for i in range(quarter))
+    positional = ", ".join(f"a{i}=({i}, 'x')" for i in range(quarter))
+    kwonly = ", ".join(f"k{i}: str = 'v{i}'" for i in range(quarter))
+    return (
+        "class Wide:\n"
+        f"    async def call(self, {posonly}, /, {positional}, *args, {kwonly}, **kwargs):\n"
+        "        return args\n"
+    )
+
+def long_function(n: int) -> str:
+    lines = ["def long(flag):", "    total = 0"]
+    for i in range(n):
+        lines.append(f"    total = total + {i}")
+        lines.append(f"    if flag == {i}:")
+        lines.append(f"        return {'total' if i % 2 else i}")
+    lines.append("    return None")
+    return "\n".join(lines) + "\n"
+
+def nested_functions(n: int) -> str:
+    # Deep nesting is limited by the parser, so long chains are split into blocks.
+    depth = min(n, 90)
+    lines = []
+    for block in range(max(1, n // depth)):
+        for level in range(depth):
+            indent = "    " * level
+            lines.append(f"{indent}def level_{block}_{level}(x{level}):")
+            lines.append(f"{indent}    if x{level}:")
+            lines.append(f"{indent}        return x{level}")
+        lines.append("    " * depth + "return 0")
+    return "\n".join(lines) + "\n"
+
+SHAPES = {"wide": wide_function, "long": long_function, "nested": nested_functions}
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'shape':<8}{'n':>7}{'nodes':>10}{'method (s)':>13}{'us/node':>10}{'file (s)':>12}{'us/node':>10}")
+    for shape, generate in SHAPES.items():
+        for n in args.sizes:
+            code = generate(n)
+            nodes = sum(1 for _ in ast.walk(ast.parse(code)))
+            method_time = best_time(lambda: method_analyzer(code), args.repeat)
+            file_time = best_time(lambda: file_analyzer(code, f"{shape}.py"), args.repeat)
+            print(f"{shape:<8}{n:>7}{nodes:>10}{method_time:>13.4f}{method_time / nodes * 1e6:>10.2f}"
+                  f"{file_time:>12.4f}{file_time / nodes * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,108 @@
 import os
 import sys
+import threading
+import time
 import pymysql
+from pymysql.constants import SERVER_STATUS
 from sshtunnel import SSHTunnelForwarder
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+class PoolTimeoutError(pymysql.OperationalError):
+    """
+    No connection became free within the checkout timeout.
+    """
+
+class ConnectionPool:
+    """
+    Bounded pool of pymysql connections shared by the threads of one process.
+
+    A connection that sat idle for longer than ping_interval seconds is pinged
+    before it is handed out; if the ping fails (e.g. the SSH tunnel dropped and came
+    back) it is reconnected, and if that fails too it is discarded and a fresh
+    connection is opened. Returned connections with an open transaction are rolled back.
+    """
+    def __init__(self, connect, max_size=5, ping_interval=30, checkout_timeout=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.ping_interval = ping_interval
+        self.checkout_timeout = checkout_timeout
+        self._idle = []                     # (connection, time it was returned)
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._condition:
+            while not self._idle and self._in_use + len(self._idle) >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No database connection free after {self.checkout_timeout}s")
+                self._condition.wait(remaining)
+            entry = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        try:
+            if entry is not None:
+                connection = self._check(*entry)
+                if connection is not None:
+                    return connection
+            return self._connect()
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def _check(self, connection, returned_at):
+        """
+        Return the connection if it is (or could be made) usable again, else None.
+        """
+        if time.monotonic() - returned_at < self.ping_interval:
+            return connection
+        try:
+            connection.ping(reconnect=True)
+            return connection
+        except Exception as e:
+            print(f"⚠️ Dropping dead database connection: {e}")
+            self._close(connection)
+            return None
+
+    def release(self, connection):
+        healthy = connection.open
+        if healthy and connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                connection.rollback()
+            except Exception:
+                healthy = False
+        if not healthy:
+            self._close(connection)
+        with self._condition:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """
+        Close every idle connection.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
 class DB:
-    _db = None
-    _cursor = None
+    # One pool per process; gunicorn workers each get their own after the fork.
+    _pool = None
+    _pool_lock = threading.Lock()
 
     @classmethod
     def get_mysql_password(cls):
@@ -24,13 +120,8 @@ class DB:
 
     def db_connect(self):
         """
-        Establish a connection to MySQL via an SSH tunnel.
-        If a connection is already established, return the existing connection.
+        Open a new connection to MySQL through the pre-opened SSH tunnel.
         """
-        # Check if connection is already established
-        if self._db:
-            return self._db, self._cursor
-
         config = {
             "host": "127.0.0.1",
             "port": int(os.getenv("MYSQL_TUNNEL_PORT")),
@@ -39,71 +130,67 @@ class DB:
             "database": "cd_insight",
             "cursorclass": pymysql.cursors.DictCursor,
             "autocommit": True,
+            "connect_timeout": 10,
         }
         try:
             print("🔹 Connecting to MySQL through pre-opened tunnel …")
-            self._db = pymysql.connect(**config)
-            self._cursor = self._db.cursor()
+            db = pymysql.connect(**config)
             print("✅ Connected!")
+            return db
         except pymysql.MySQLError as e:
             print(f"❌ MySQL connection failed: {e}")
-            self._db = self._cursor = None
+            raise
 
-        return self._db, self._cursor
-
-    def close_db(self):
+    def get_pool(self):
         """
-        Close the database connection.
+        The connection pool of this process, created on first use.
+        Size and health-check interval come from DB_POOL_SIZE and DB_PING_INTERVAL.
         """
-        if self._cursor:
-            self._cursor.close()
-        if self._db:
-            self._db.close()
+        with DB._pool_lock:
+            if DB._pool is None:
+                DB._pool = ConnectionPool(
+                    self.db_connect,
+                    max_size=int(os.getenv("DB_POOL_SIZE", "5")),
+                    ping_interval=float(os.getenv("DB_PING_INTERVAL", "30"))
+                )
+            return DB._pool
 
     def reset_db(self):
         """
-        Reset the database tables by truncating them.
-        Uses the shared connection.
-        
+        Reset the analysis tables of every user by truncating them; admin use only
+        (reset_db.py), no route calls it. Projects and their manifests are kept, but
+        the manifests are marked stale so each project's next analysis is a full one.
+        Uses a connection checked out from the pool.
+
         Returns:
             bool: True if reset succeeded, False otherwise.
         """
-        if not self._db:
-            self.db_connect()
-
+        pool = self.get_pool()
+        db = pool.acquire()
+        cursor = db.cursor()
         try:
-            self._cursor.execute("SET FOREIGN_KEY_CHECKS=0;")
-            self._cursor.execute("TRUNCATE TABLE methodparameters;")
-            self._cursor.execute("TRUNCATE TABLE methods;")
-            self._cursor.execute("TRUNCATE TABLE components;")
-            self._cursor.execute("TRUNCATE TABLE variables;")
-            self._cursor.execute("TRUNCATE TABLE organizations;")
-            self._cursor.execute("SET FOREIGN_KEY_CHECKS=1;")
-            self._db.commit()
+            cursor.execute("SET FOREIGN_KEY_CHECKS=0;")
+            cursor.execute("TRUNCATE TABLE variableusages;")
+            cursor.execute("TRUNCATE TABLE methodparameters;")
+            cursor.execute("TRUNCATE TABLE methods;")
+            cursor.execute("TRUNCATE TABLE components;")
+            cursor.execute("TRUNCATE TABLE variables;")
+            cursor.execute("TRUNCATE TABLE organizations;")
+            cursor.execute("UPDATE filemanifest SET analyzer_version = NULL, row_id = NULL;")
+            cursor.execute("SET FOREIGN_KEY_CHECKS=1;")
+            db.commit()
             print({"message": "✅ Database has been reset successfully!"})
             return True
         except Exception as e:
-            self._db.rollback()
+            db.rollback()
             print({"error": f"Reset failed: {e}"})
             return False
         finally:
-            # Clean up resources after reset
-            self.close_db()
-
-    def get_db(self):
-        if not self._db:
-            self.db_connect()
-        return self._db
-
-    def get_cursor(self):
-        if not self._db:
-            self.db_connect()
-        return self._cursor
-
-    def is_db_connected(self):
-        return self._db
+            # Return the connection to the pool after reset
+            cursor.close()
+            pool.release(db)
 
 
 if __name__ == "__main__":
     connector = DB()
-    connector.db_connect()
\ No newline at end of file
+    connector.get_pool().release(connector.get_pool().acquire())
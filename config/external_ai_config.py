@@ -2,7 +2,13 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
-from openai import AzureOpenAI
+from functools import lru_cache
+from openai import AzureOpenAI, AsyncAzureOpenAI
+
+# One client per process: it keeps a pool of HTTPS connections that every request
+# (and every thread of a batch) reuses. The async client belongs to one event loop
+# and is still created per use.
+@lru_cache(maxsize=1)
 def get_openai():
     client = AzureOpenAI(
     azure_endpoint=os.getenv("OPENAI_ENDPOINT"),
@@ -11,6 +17,17 @@ def get_openai():
     )
     return client
 
+def get_async_openai():
+    client = AsyncAzureOpenAI(
+    azure_endpoint=os.getenv("OPENAI_ENDPOINT"),
+    api_key=os.getenv("OPENAI_API_KEY"),
+    api_version="2024-12-01-preview"
+    )
+    return client
+
+# Part of the LLM cache key; bump it whenever get_prompt's wording changes.
+PROMPT_VERSION = "2"
+
 def get_prompt(document_type: str, file_content) -> str:
     """
     Returns a prompt to generate a PlantUML diagram of a given type.
@@ -21,7 +38,7 @@ def get_prompt(document_type: str, file_content) -> str:
 
     From the below, the data inside are metadata extracted from a project. 
     The data includes information of the actual code. 
-    You are given that the end of the data indicate the order of data that will appear. 
+    The first lines of the data explain its format. 
     From the relationship of the data, 
     please try to draw a {document_type} to illustrate the design of the project. 
     Please only send back the PlantUML syntax code without any explanation.
@@ -29,3 +46,22 @@ def get_prompt(document_type: str, file_content) -> str:
     {file_content}
 
     """
+
+def get_partial_prompt(document_type: str, file_content, part: int, parts: int) -> str:
+    """
+    Prompt for one part of a project too big for a single prompt (map-reduce generation).
+    The partial diagrams are merged afterwards, so names must match across parts.
+    """
+    return f"""Please help me generate this document type: {document_type}.
+    If it is not a technical document, please respond with 0 only.
+
+    The metadata of a large project has been split into {parts} parts by folder; this is part {part}.
+    Draw only the elements of this part and their relationships, including relationships
+    to elements of other parts, which you refer to by their exact names.
+    Use the names from the metadata as they are, without aliases, so the parts can be merged.
+    The first lines of the data explain its format. 
+    Please only send back the PlantUML syntax code without any explanation.
+    Start of the metadata:
+    {file_content}
+
+    """
@@ -27,13 +27,23 @@ export MYSQL_TUNNEL_PORT
 echo "Selected local tunnel port $MYSQL_TUNNEL_PORT"
 
 # ─── 3. Open the tunnel ---------------------------------------------------
+# Re-opened whenever ssh exits, so a dropped tunnel comes back on its own;
+# the app's connection pool reconnects through it on the next health check.
 echo "Opening SSH tunnel → ${SSH_MYSQL_HOST}:3306 via ${SSH_MYSQL_BASTION}"
-ssh -o ExitOnForwardFailure=yes \
-    -o StrictHostKeyChecking=no \
-    -i ~/.ssh/id_ecdsa \
-    -L "${MYSQL_TUNNEL_PORT}:${SSH_MYSQL_HOST}:3306" \
-    "${SSH_MYSQL_USER}@${SSH_MYSQL_BASTION}" \
-    -N &
+(
+  while true; do
+    ssh -o ExitOnForwardFailure=yes \
+        -o StrictHostKeyChecking=no \
+        -o ServerAliveInterval=15 \
+        -o ServerAliveCountMax=3 \
+        -i ~/.ssh/id_ecdsa \
+        -L "${MYSQL_TUNNEL_PORT}:${SSH_MYSQL_HOST}:3306" \
+        "${SSH_MYSQL_USER}@${SSH_MYSQL_BASTION}" \
+        -N || true
+    echo "SSH tunnel closed, reopening in 2s" >&2
+    sleep 2
+  done
+) &
 TUNNEL_PID=$!
 
 # Wait until the local port is listening
@@ -44,4 +54,6 @@ done || die "SSH tunnel failed to open"
 echo "SSH tunnel up on 127.0.0.1:${MYSQL_TUNNEL_PORT}"
 
 # ─── 4. Launch Gunicorn ---------------------------------------------------
-exec gunicorn -w 2 -b "0.0.0.0:${PORT}" wsgi:app
\ No newline at end of file
+# Threaded workers: analysis runs in background jobs and progress streams (SSE)
+# hold a thread each, without blocking the rest of the worker.
+exec gunicorn -w "${GUNICORN_WORKERS:-2}" --worker-class gthread --threads "${GUNICORN_THREADS:-8}" -b "0.0.0.0:${PORT}" wsgi:app
\ No newline at end of file
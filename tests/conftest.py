@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app is run from the repository root (python wsgi.py / gunicorn wsgi:app); the tests import it the same way.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,155 @@
+import io
+import os
+import tarfile
+import time
+import zipfile
+
+import pytest
+
+from web_app.controller.archive_controller import (
+    ArchiveError, ArchiveLimitError, ArchiveLimits, detect_archive_type,
+    extract_archive_stream, sanitize_archive_path, secure_path_part
+)
+
+MB = 1024 * 1024
+LIMITS = ArchiveLimits(max_archive_bytes=10 * MB, max_extracted_bytes=10 * MB, max_file_bytes=5 * MB, max_entries=1000)
+
+def is_python(name):
+    return name.endswith(".py")
+
+class _NonSeekable(io.RawIOBase):
+    # zipfile writes data descriptors (sizes after the data) when it cannot seek back.
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+def zip_bytes(members, descriptors=False, compression=zipfile.ZIP_DEFLATED):
+    out = _NonSeekable() if descriptors else io.BytesIO()
+    with zipfile.ZipFile(out, "w", compression) as archive:
+        for name, data in members:
+            if isinstance(data, int):
+                with archive.open(name, "w") as f:
+                    for _ in range(data // MB):
+                        f.write(b"\0" * MB)
+            else:
+                archive.writestr(name, data)
+    return bytes(out.data) if descriptors else out.getvalue()
+
+def tar_gz_bytes(members):
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w:gz") as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return out.getvalue()
+
+def extract(data, archive_type, dest, limits=LIMITS):
+    return extract_archive_stream(io.BytesIO(data), archive_type, str(dest), is_python, limits)
+
+def extracted_files(dest):
+    return sorted(
+        os.path.relpath(os.path.join(folder, name), dest)
+        for folder, _, names in os.walk(dest) for name in names
+    )
+
+@pytest.mark.parametrize("name, parts", [
+    ("pkg/module.py", ["pkg", "module.py"]),
+    ("../../etc/passwd.py", ["etc", "passwd.py"]),
+    ("/abs/path/x.py", ["abs", "path", "x.py"]),
+    ("C:\\Users\\me\\x.py", ["C", "Users", "me", "x.py"]),
+    ("pkg//./__init__.py", ["pkg", "__init__.py"]),
+    ("pkg/_private.py", ["pkg", "_private.py"]),
+    ("pkg/my file.py", ["pkg", "my_file.py"]),
+    ("..", []),
+])
+def test_sanitize_archive_path(name, parts):
+    assert sanitize_archive_path(name) == parts
+
+def test_secure_path_part_keeps_leading_underscores():
+    assert secure_path_part("__main__.py") == "__main__.py"
+    assert secure_path_part("..") == ""
+
+def test_detect_archive_type():
+    assert detect_archive_type("application/zip") == "zip"
+    assert detect_archive_type("application/octet-stream", "tgz") == "tar.gz"
+    with pytest.raises(ArchiveError):
+        detect_archive_type("application/zip", "rar")
+
+@pytest.mark.parametrize("descriptors", [False, True])
+def test_zip_extracts_allowed_files_inside_the_destination(tmp_path, descriptors):
+    data = zip_bytes([
+        ("proj/a.py", "x = 1\n"),
+        ("proj/pkg/b.py", "y = 2\n"),
+        ("proj/readme.md", "not extracted"),
+        ("../escape.py", "z = 3\n"),
+    ], descriptors=descriptors)
+    counts = extract(data, "zip", tmp_path)
+    assert counts["files"] == 3 and counts["skipped"] == 1
+    assert extracted_files(tmp_path) == ["escape.py", "proj/a.py", "proj/pkg/b.py"]
+    assert (tmp_path / "proj" / "pkg" / "b.py").read_text() == "y = 2\n"
+
+def test_tar_gz_extracts_allowed_files(tmp_path):
+    data = tar_gz_bytes([("proj/a.py", b"x = 1\n"), ("proj/data.bin", b"\0" * 10)])
+    counts = extract(data, "tar.gz", tmp_path)
+    assert counts["files"] == 1
+    assert extracted_files(tmp_path) == ["proj/a.py"]
+
+def test_skipped_zip_entry_with_known_size_is_not_inflated(tmp_path):
+    data = zip_bytes([("proj/a.py", "x = 1\n"), ("proj/huge.bin", 200 * MB), ("proj/b.py", "y = 2\n")])
+    started = time.monotonic()
+    counts = extract(data, "zip", tmp_path)
+    assert time.monotonic() - started < 2
+    assert counts["files"] == 2
+    assert extracted_files(tmp_path) == ["proj/a.py", "proj/b.py"]
+
+def test_skipped_zip_entry_without_sizes_counts_towards_the_limits(tmp_path):
+    data = zip_bytes([("proj/a.py", "x = 1\n"), ("proj/huge.bin", 200 * MB)], descriptors=True)
+    with pytest.raises(ArchiveLimitError):
+        extract(data, "zip", tmp_path)
+
+def test_file_limit(tmp_path):
+    data = zip_bytes([("proj/big.py", "#" * (2 * MB))])
+    limits = ArchiveLimits(10 * MB, 10 * MB, max_file_bytes=MB, max_entries=1000)
+    with pytest.raises(ArchiveLimitError):
+        extract(data, "zip", tmp_path, limits)
+
+def test_total_limit(tmp_path):
+    data = zip_bytes([(f"proj/m{i}.py", "#" * MB) for i in range(3)])
+    limits = ArchiveLimits(10 * MB, max_extracted_bytes=2 * MB, max_file_bytes=5 * MB, max_entries=1000)
+    with pytest.raises(ArchiveLimitError):
+        extract(data, "zip", tmp_path, limits)
+
+def test_entry_limit(tmp_path):
+    data = zip_bytes([(f"proj/m{i}.py", "") for i in range(5)])
+    limits = ArchiveLimits(10 * MB, 10 * MB, 5 * MB, max_entries=3)
+    with pytest.raises(ArchiveLimitError):
+        extract(data, "zip", tmp_path, limits)
+
+def test_archive_size_limit(tmp_path):
+    data = zip_bytes([("proj/noise.py", os.urandom(MB).hex())], compression=zipfile.ZIP_STORED)
+    limits = ArchiveLimits(max_archive_bytes=MB, max_extracted_bytes=10 * MB, max_file_bytes=5 * MB, max_entries=1000)
+    with pytest.raises(ArchiveLimitError):
+        extract(data, "zip", tmp_path, limits)
+
+def test_tar_member_size_limit(tmp_path):
+    data = tar_gz_bytes([("proj/big.py", b"#" * (2 * MB))])
+    limits = ArchiveLimits(10 * MB, 10 * MB, max_file_bytes=MB, max_entries=1000)
+    with pytest.raises(ArchiveLimitError):
+        extract(data, "tar.gz", tmp_path, limits)
+
+def test_corrupt_zip_entry_is_rejected(tmp_path):
+    data = bytearray(zip_bytes([("proj/a.py", "x = 1\n")], compression=zipfile.ZIP_STORED))
+    data[data.find(b"x = 1")] = ord("y")
+    with pytest.raises(ArchiveError):
+        extract(bytes(data), "zip", tmp_path)
+
+def test_not_an_archive(tmp_path):
+    with pytest.raises(ArchiveError):
+        extract(b"plain text, not a tar.gz", "tar.gz", tmp_path)
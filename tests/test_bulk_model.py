@@ -0,0 +1,89 @@
+import pytest
+
+from web_app.model.bulk_model import insert_rows, transaction
+
+class FakeCursor:
+    """
+    Records the statements and hands out AUTO_INCREMENT ids like InnoDB does for a
+    multi-row INSERT: consecutive, auto_increment_increment apart.
+    """
+    def __init__(self, next_id=1, step=1):
+        self.next_id = next_id
+        self.step = step
+        self.statements = []
+        self.lastrowid = None
+        self._result = None
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        if sql.startswith("SELECT @@auto_increment_increment"):
+            self._result = {"step": self.step}
+            return
+        rows = sql.count("(%s")
+        self.lastrowid = self.next_id
+        self.next_id += rows * self.step
+
+    def fetchone(self):
+        return self._result
+
+class FakeDb:
+    def __init__(self):
+        self.calls = []
+
+    def begin(self):
+        self.calls.append("begin")
+
+    def commit(self):
+        self.calls.append("commit")
+
+    def rollback(self):
+        self.calls.append("rollback")
+
+def inserts(cursor):
+    return [(sql, params) for sql, params in cursor.statements if sql.startswith("INSERT")]
+
+def test_ids_follow_last_insert_id_in_row_order():
+    cursor = FakeCursor(next_id=41)
+    ids = insert_rows(cursor, "methods", ("project_id", "method_name"), [(1, "a"), (1, "b"), (1, "c")])
+    assert ids == [41, 42, 43]
+    [(sql, params)] = inserts(cursor)
+    assert sql == "INSERT INTO methods (project_id, method_name) VALUES (%s, %s), (%s, %s), (%s, %s)"
+    assert params == [1, "a", 1, "b", 1, "c"]
+
+def test_ids_use_the_auto_increment_step():
+    cursor = FakeCursor(next_id=5, step=2)
+    assert insert_rows(cursor, "components", ("component_name",), [("a",), ("b",), ("c",)]) == [5, 7, 9]
+
+def test_step_is_read_once_per_cursor():
+    cursor = FakeCursor()
+    insert_rows(cursor, "components", ("component_name",), [("a",)])
+    insert_rows(cursor, "components", ("component_name",), [("b",)])
+    steps = [sql for sql, _ in cursor.statements if sql.startswith("SELECT")]
+    assert len(steps) == 1
+
+def test_chunks_get_their_own_statement_and_ids():
+    cursor = FakeCursor(next_id=100)
+    rows = [(f"v{i}",) for i in range(7)]
+    ids = insert_rows(cursor, "variables", ("variable_name",), rows, chunk_size=3)
+    assert ids == list(range(100, 107))
+    assert [len(params) for _, params in inserts(cursor)] == [3, 3, 1]
+
+def test_no_rows_no_statement():
+    cursor = FakeCursor()
+    assert insert_rows(cursor, "variables", ("variable_name",), []) == []
+    assert cursor.statements == []
+
+def test_transaction_commits_or_rolls_back():
+    db = FakeDb()
+    with transaction(db):
+        pass
+    with pytest.raises(RuntimeError):
+        with transaction(db):
+            raise RuntimeError("insert failed")
+    assert db.calls == ["begin", "commit", "begin", "rollback"]
+
+def test_transaction_of_the_caller_is_left_alone():
+    db = FakeDb()
+    with transaction(db, commit=False):
+        pass
+    assert db.calls == []
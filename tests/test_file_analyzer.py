@@ -0,0 +1,119 @@
+"""
+file_analyzer() walks the tree once for all three analyses; its results must be
+those of component_analyzer(), method_analyzer() and variable_analyzer().
+"""
+import glob
+import os
+
+import pytest
+
+from web_app.analyzer.component_analyzer import component_analyzer
+from web_app.analyzer.file_analyzer import file_analyzer
+from web_app.analyzer.method_analyzer import method_analyzer
+from web_app.analyzer.variable_analyzer import variable_analyzer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SOURCES = {
+    "classes": '''
+import os
+from typing import Dict, List
+
+LIMIT = 10
+_cache: Dict[str, int] = {}
+
+class Base:
+    kind = "base"
+
+    def __init__(self, name: str, tags: List[str] = None):
+        self.name = name
+        self._tags = tags or []
+
+    def describe(self) -> str:
+        return f"{self.kind}: {self.name}"
+
+class Child(Base, Mixin):
+    kind = "child"
+
+    @staticmethod
+    def build(*args, **kwargs):
+        return Child(*args, **kwargs)
+
+    @property
+    def size(self):
+        total = 0
+        for tag in self._tags:
+            total = total + len(tag)
+        return total
+
+def helper(path, mode="r"):
+    with open(path, mode) as f:
+        return f.read()
+''',
+    "nested": '''
+class Outer:
+    class Inner:
+        value = 1
+
+        def inner_method(self):
+            return self.value
+
+    after_inner = 2
+
+    def outer_method(self):
+        def local(x):
+            return x * 2
+        self.result = local(3)
+        return self.result
+
+def factory():
+    class Local:
+        def run(self):
+            return None
+    return Local
+''',
+    "async_and_lambdas": '''
+import asyncio
+
+class Client:
+    retries = 3
+
+    async def fetch(self, url: str, *, timeout: float = 5.0) -> bytes:
+        for attempt in range(self.retries):
+            data = await asyncio.sleep(0, result=url)
+            if data:
+                return data
+        return b""
+
+handler = lambda event: event
+async def main(*urls):
+    client = Client()
+    return [await client.fetch(url) for url in urls]
+''',
+    "empty": "",
+}
+
+def assert_same_as_individual_analyzers(code, file_path):
+    combined = file_analyzer(code, file_path)
+    assert combined["component"] == component_analyzer(code, file_path)
+    assert combined["method"] == method_analyzer(code)
+    assert combined["variable"] == variable_analyzer(code)
+
+@pytest.mark.parametrize("name", sorted(SOURCES))
+def test_matches_individual_analyzers(name):
+    assert_same_as_individual_analyzers(SOURCES[name], f"/projects/demo/pkg/{name}.py")
+
+@pytest.mark.parametrize("file_path", sorted(
+    path for path in glob.glob(os.path.join(REPO_ROOT, "web_app", "**", "*.py"), recursive=True)
+    if os.path.basename(path) != "tempCodeRunnerFile.py"
+))
+def test_matches_individual_analyzers_on_the_app_sources(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        code = f.read()
+    assert_same_as_individual_analyzers(code, file_path)
+
+def test_syntax_error_gives_empty_results():
+    result = file_analyzer("def broken(:\n    pass\n", "/projects/demo/broken.py")
+    assert result["component"]["components"] == []
+    assert result["method"] == {"methods": []}
+    assert result["variable"] == {"variables": [], "usages": [], "flows": []}
@@ -0,0 +1,128 @@
+import re
+
+import pytest
+
+from web_app.controller.llm_encoder import DETAIL_LEVELS, count_tokens, encode_chunks, encode_for_llm
+
+SCHEMAS = {
+    "organizations": ["organization_id", "organization_name", "organization_path", "description", "organization_type"],
+    "components": ["component_id", "organization_id", "component_name", "component_type", "description"],
+    "methods": ["method_id", "component_id", "method_name", "return_type", "visibility", "is_static", "description"],
+    "method_parameters": ["parameter_id", "method_id", "parameter_name", "parameter_type", "is_required",
+                          "default_value", "description"],
+    "variables": ["variable_id", "component_id", "method_id", "variable_name", "variable_type", "scope",
+                  "is_constant", "is_static", "visibility", "description"],
+}
+
+def make_export(organizations=3, components=4, methods=5):
+    data = {key: [] for key in SCHEMAS}
+    ids = {key: 0 for key in SCHEMAS}
+
+    def add(key, *values):
+        ids[key] += 1
+        data[key].append([ids[key], *values])
+        return ids[key]
+
+    for o in range(organizations):
+        org_id = add("organizations", f"module{o}", f"/srv/shop/module{o}", f"Module {o} of the shop", "package")
+        for c in range(components):
+            component_id = add("components", org_id, f"Service{o}_{c}", "class", f"Service {c} of module {o}")
+            add("variables", component_id, None, "_registry", "Dict[str, OrderRepository]", "class", 0, 1,
+                "private", None)
+            for m in range(methods):
+                name = f"_helper{m}" if m == 0 else f"handle{m}"
+                method_id = add("methods", component_id, name, "Optional[OrderRepository]",
+                                "private" if m == 0 else "public", 0, f"Handles case {m} in detail")
+                add("method_parameters", method_id, "order_id", "int", 1, None, None)
+                add("method_parameters", method_id, "options", "Dict[str, OrderRepository]", 0, "None", None)
+                add("variables", component_id, method_id, "result", "List[OrderRepository]", "method", 0, 0,
+                    "public", None)
+    return {"metadata": {"project_name": "shop"}, "schemas": SCHEMAS, "data": data}
+
+def rows(export, key):
+    return [dict(zip(export["schemas"][key], row)) for row in export["data"][key]]
+
+def expand_symbols(text):
+    """
+    The text with every $n reference replaced by its symbol table entry; the
+    symbol table must define every reference that is used.
+    """
+    symbols = dict(re.findall(r"^(\$\d+)=(.*)$", text, re.MULTILINE))
+    body = "\n".join(line for line in text.split("\n") if not re.match(r"^\$\d+=", line))
+    for ref in set(re.findall(r"\$\d+", body)):
+        assert ref in symbols, f"{ref} is used but not defined"
+    return re.sub(r"\$\d+", lambda match: symbols[match.group(0)], body)
+
+def test_full_detail_keeps_every_row():
+    export = make_export()
+    text, info = encode_for_llm(export)
+    assert info == {"tokens": count_tokens(text), "level": 0, "truncated": False}
+    lines = [line.strip() for line in expand_symbols(text).split("\n")]
+
+    for org in rows(export, "organizations"):
+        assert any(line.startswith(f"O {org['organization_name']} package") for line in lines)
+    for component in rows(export, "components"):
+        assert f"C {component['component_name']} class : {component['description']}" in lines
+    parameters = {}
+    for parameter in rows(export, "method_parameters"):
+        parameters.setdefault(parameter["method_id"], []).append(parameter)
+    signatures = [line for line in lines if line.startswith("M ")]
+    for method in rows(export, "methods"):
+        mark = "-" if method["visibility"] == "private" else "+"
+        assert (f"M {mark} {method['method_name']}(order_id:int, options:Dict[str, OrderRepository]=None)"
+                f"->Optional[OrderRepository] : {method['description']}") in signatures
+    assert len(signatures) == len(rows(export, "methods"))
+    assert lines.count("V - _registry:Dict[str, OrderRepository] class static") == len(rows(export, "components"))
+
+def test_repeated_types_become_symbols():
+    text, _ = encode_for_llm(make_export())
+    assert "Symbols:" in text
+    assert text.count("Optional[OrderRepository]") == 1      # only in the symbol table
+
+def test_details_are_dropped_level_by_level_to_fit_the_budget():
+    export = make_export()
+    full, _ = encode_for_llm(export)
+    budget = count_tokens(full) * 2 // 3
+    text, info = encode_for_llm(export, budget)
+    assert 0 < info["level"] < len(DETAIL_LEVELS)
+    assert not info["truncated"]
+    assert info["tokens"] == count_tokens(text) <= budget
+    assert "Handles case" not in text                         # descriptions go first
+
+def test_private_members_are_dropped_before_signatures():
+    export = make_export()
+    levels = {}
+    for budget in range(200, count_tokens(encode_for_llm(export)[0]), 100):
+        text, info = encode_for_llm(export, budget)
+        levels.setdefault(info["level"], text)
+    assert 3 in levels
+    assert "_helper0" not in levels[3] and "_registry" not in levels[3]
+    assert "handle1(" in levels[3]
+
+def test_text_is_cut_when_no_level_fits():
+    export = make_export(organizations=10)
+    text, info = encode_for_llm(export, 300)
+    assert info["truncated"] and info["level"] == len(DETAIL_LEVELS) - 1
+    assert info["tokens"] <= 300
+    assert re.search(r"\.\.\. \(\d+ more lines omitted\)$", text)
+    assert text.startswith("Project shop")
+
+@pytest.mark.parametrize("chunk_tokens", [400, 800, 5000])
+def test_chunks_hold_every_organization_once_within_the_limit(chunk_tokens):
+    export = make_export(organizations=6)
+    chunks = encode_chunks(export, chunk_tokens)
+    assert sum(info["organizations"] for _, info in chunks) == 6
+    seen = []
+    for text, info in chunks:
+        assert info["tokens"] == count_tokens(text) <= chunk_tokens
+        assert text.startswith("Project shop")
+        expand_symbols(text)                                   # self-contained symbol table
+        seen.extend(re.findall(r"^O (module\d+)", text, re.MULTILINE))
+    assert seen == [f"module{o}" for o in range(6)]
+
+def test_one_chunk_when_everything_fits():
+    export = make_export()
+    full, _ = encode_for_llm(export)
+    [(text, info)] = encode_chunks(export, count_tokens(full) + 100)
+    assert info["level"] == 0 and not info["truncated"]
+    assert expand_symbols(text) == expand_symbols(full)
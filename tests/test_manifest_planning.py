@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from web_app.analyzer.file_analyzer import ANALYZER_VERSION, file_content_hash
+from web_app.analyzer.project_tree import ProjectTree
+from web_app.controller.analyzer_controller import is_analyzable, plan_files
+from web_app.model.manifest_model import ManifestEntry, ProjectManifest
+
+def write(root, relative_path, text):
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+def entry_of(root, relative_path, row_id, **changes):
+    path = os.path.join(root, relative_path)
+    stat = os.stat(path)
+    entry = ManifestEntry(
+        relative_path=relative_path,
+        file_size=stat.st_size,
+        file_mtime_ns=stat.st_mtime_ns,
+        content_hash=file_content_hash(path),
+        analyzer_version=ANALYZER_VERSION,
+        row_id=row_id,
+    )
+    for name, value in changes.items():
+        setattr(entry, name, value)
+    return entry
+
+@pytest.fixture
+def project(tmp_path):
+    root = str(tmp_path / "project")
+    for relative_path in ("app.py", "pkg/models.py", "pkg/views.py", "pkg/old_version.py"):
+        write(root, relative_path, f"# {relative_path}\nx = 1\n")
+    write(root, "pkg/__init__.py", "")
+    manifest = ProjectManifest(project_id=7)
+    for row_id, relative_path in enumerate(("app.py", "pkg/models.py", "pkg/views.py"), start=1):
+        manifest.files[relative_path] = entry_of(root, relative_path, row_id)
+    manifest.files["pkg/old_version.py"] = entry_of(root, "pkg/old_version.py", 4, analyzer_version="0")
+    manifest.files["pkg/removed.py"] = ManifestEntry("pkg/removed.py", 10, 1, "0" * 64, ANALYZER_VERSION, 5)
+    return root, manifest
+
+def plan(root, manifest):
+    error_msg = []
+    tree = ProjectTree.scan(root, is_analyzable)
+    pending, touched, removed = plan_files(tree, manifest, error_msg)
+    assert error_msg == []
+    relative = {os.path.relpath(path, root): entry for path, entry in pending.items()}
+    return relative, {entry.relative_path: entry for entry in touched}, removed
+
+def test_unchanged_files_are_not_planned(project):
+    root, manifest = project
+    pending, touched, removed = plan(root, manifest)
+    assert sorted(pending) == ["pkg/old_version.py"]     # analyzed by another analyzer version
+    assert touched == {}
+    assert removed == ["pkg/removed.py"]
+
+def test_changed_content_is_analyzed_again(project):
+    root, manifest = project
+    write(root, "pkg/models.py", "class Model:\n    pass\n")
+    pending, touched, _ = plan(root, manifest)
+    assert "pkg/models.py" in pending
+    entry = pending["pkg/models.py"]
+    assert entry.content_hash == file_content_hash(os.path.join(root, "pkg/models.py"))
+    assert entry.analyzer_version == ANALYZER_VERSION
+    assert entry.row_id is None
+    assert "pkg/models.py" not in touched
+
+def test_touched_file_keeps_its_rows(project):
+    root, manifest = project
+    path = os.path.join(root, "pkg/views.py")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    pending, touched, _ = plan(root, manifest)
+    assert "pkg/views.py" not in pending
+    assert touched["pkg/views.py"].row_id == 3
+    assert touched["pkg/views.py"].file_mtime_ns == stat.st_mtime_ns + 5_000_000_000
+
+def test_new_files_are_planned_and_init_files_skipped(project):
+    root, manifest = project
+    write(root, "pkg/sub/extra.py", "y = 2\n")
+    write(root, "pkg/sub/__init__.py", "")
+    write(root, "notes.txt", "not python")
+    pending, _, _ = plan(root, manifest)
+    assert sorted(pending) == ["pkg/old_version.py", "pkg/sub/extra.py"]
+
+def test_empty_manifest_plans_every_file(project):
+    root, _ = project
+    pending, touched, removed = plan(root, ProjectManifest(project_id=7))
+    assert sorted(pending) == ["app.py", "pkg/models.py", "pkg/old_version.py", "pkg/views.py"]
+    assert touched == {} and removed == []
@@ -0,0 +1,50 @@
+from web_app.controller.uml_controller import merge_plantuml, sanitise_plantuml
+
+def test_fragments_merge_into_one_diagram():
+    merged = merge_plantuml([
+        "@startuml\ntitle Shop\nclass Order {\n  +id: int\n}\nOrder --> Customer\n@enduml",
+        "```plantuml\n@startuml\ntitle Shop (part 2)\nclass Order {\n  +total(): float\n  +id: int\n}\n"
+        "class Customer\nOrder --> Customer\n@enduml\n```",
+    ])
+    assert merged == "\n".join([
+        "@startuml",
+        "title Shop",
+        "class Order {",
+        "  +id: int",
+        "  +total(): float",
+        "}",
+        "Order --> Customer",
+        "class Customer",
+        "@enduml",
+    ])
+
+def test_nested_packages_merge_by_header():
+    merged = merge_plantuml([
+        "package shop {\n  class Order\n  package billing {\n    class Invoice\n  }\n}",
+        "package shop {\n  package billing {\n    class Payment\n  }\n  class Order\n}",
+    ])
+    assert merged == "\n".join([
+        "@startuml",
+        "package shop {",
+        "  class Order",
+        "  package billing {",
+        "    class Invoice",
+        "    class Payment",
+        "  }",
+        "}",
+        "@enduml",
+    ])
+
+def test_groups_and_notes_are_kept_whole():
+    group = "alt paid\nA -> B : ship\nelse unpaid\nA -> B : remind\nend"
+    note = "note left of A\nchecks stock\nend note"
+    merged = merge_plantuml([f"A -> B : order\n{group}\n{note}", f"A -> B : order\n{group}\nB -> A : done"])
+    assert merged == "\n".join(["@startuml", "A -> B : order", group, note, "B -> A : done", "@enduml"])
+
+def test_refused_fragments_are_left_out():
+    assert merge_plantuml(["0", " 0 \n"]) == "0"
+    assert merge_plantuml(["0", "class A"]) == "@startuml\nclass A\n@enduml"
+
+def test_sanitise_adds_missing_markers():
+    assert sanitise_plantuml("```uml\nclass A\n```") == "@startuml\nclass A\n@enduml"
+    assert sanitise_plantuml("@startuml\nclass A\n@enduml") == "@startuml\nclass A\n@enduml"
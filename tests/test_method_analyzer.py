@@ -0,0 +1,68 @@
+from web_app.analyzer.method_analyzer import MAX_DEFAULT_LENGTH, MAX_TYPE_LENGTH, method_analyzer
+
+def methods_by_name(code):
+    return {method["method_name"]: method for method in method_analyzer(code)["methods"]}
+
+def parameters(method):
+    return [
+        (p["parameter_name"], p["parameter_type"], p["is_required"], p["default_value"])
+        for p in method["parameters"]
+    ]
+
+def test_every_parameter_kind_in_signature_order():
+    method = methods_by_name(
+        "def f(a, b: int, /, c, d=1, *args: str, e, g: bool = False, **kwargs: dict): pass\n"
+    )["f"]
+    assert parameters(method) == [
+        ("a", "Any", True, None),
+        ("b", "int", True, None),
+        ("c", "Any", True, None),
+        ("d", "Any", False, "1"),
+        ("*args", "str", False, None),
+        ("e", "Any", True, None),
+        ("g", "bool", False, "False"),
+        ("**kwargs", "dict", False, None),
+    ]
+
+def test_defaults_line_up_with_the_last_positional_parameters():
+    method = methods_by_name("def f(a, /, b=2, c=3): pass\n")["f"]
+    assert parameters(method) == [("a", "Any", True, None), ("b", "Any", False, "2"), ("c", "Any", False, "3")]
+
+def test_non_constant_defaults_are_source_text():
+    method = methods_by_name("def f(a=[], b=make(1), *, c=None): pass\n")["f"]
+    assert [p["default_value"] for p in method["parameters"]] == ["[]", "make(1)", "None"]
+
+def test_async_functions_and_methods():
+    methods = methods_by_name(
+        "class Client:\n"
+        "    async def fetch(self, url: str, *, timeout: float = 5.0) -> bytes:\n"
+        "        return b''\n"
+        "async def main(*urls):\n"
+        "    return urls\n"
+    )
+    assert methods["fetch"]["location"] == "Client"
+    assert methods["fetch"]["return_type"] == "bytes"
+    # self and cls are not parameters of the interface.
+    assert parameters(methods["fetch"]) == [
+        ("url", "str", True, None),
+        ("timeout", "float", False, "5.0"),
+    ]
+    assert parameters(methods["main"]) == [("*urls", "Any", False, None)]
+
+def test_class_restored_after_nested_class():
+    methods = methods_by_name(
+        "class Outer:\n"
+        "    class Inner:\n"
+        "        def inner(self): pass\n"
+        "    def after(self): pass\n"
+    )
+    assert methods["inner"]["location"] == "Inner"
+    assert methods["after"]["location"] == "Outer"
+
+def test_long_types_and_defaults_fit_their_columns():
+    long_type = "Dict[" + ", ".join(f"Key{i}" for i in range(40)) + "]"
+    long_default = "(" + ", ".join(str(i) for i in range(200)) + ")"
+    method = methods_by_name(f"def f(a: {long_type} = {long_default}) -> {long_type}: pass\n")["f"]
+    assert len(method["return_type"]) <= MAX_TYPE_LENGTH
+    assert len(method["parameters"][0]["parameter_type"]) <= MAX_TYPE_LENGTH
+    assert len(method["parameters"][0]["default_value"]) <= MAX_DEFAULT_LENGTH
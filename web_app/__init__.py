@@ -3,21 +3,56 @@ import os
 import sys
 from config.dbConfig import DB
 from config.external_ai_config import get_openai, get_prompt
+from web_app.model.db_session import release_db
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "./")))
 def init_app():
     app = Flask(__name__)
     app.secret_key=os.getenv("FLASK_SECRET_KEY")
-    conn = DB()
-    db = conn.get_db()
-    cursor = conn.get_cursor()
-    
-    # Store the db and cursor in the app config so they can be used globally
-    app.config['db'] = db
-    app.config['cursor'] = cursor
+    # Every request (app context) checks a connection out of the pool and returns it at teardown
+    app.config["db_pool"] = DB().get_pool()
+    app.teardown_appcontext(release_db)
     app.config["USERS_PATH"] = "/var/data/users"
     app.config["JSON_DIR"] = ""
     app.config["is_login"] = False
     app.config["user_name"] = None
     app.config["ALLOWED_EXTENSIONS"] = {"py"}
+    # Limits of a single-archive upload (.zip / .tar.gz), checked while it is extracted.
+    app.config["UPLOAD_MAX_ARCHIVE_BYTES"] = int(os.getenv("UPLOAD_MAX_ARCHIVE_MB", "200")) * 1024 * 1024
+    app.config["UPLOAD_MAX_EXTRACTED_BYTES"] = int(os.getenv("UPLOAD_MAX_EXTRACTED_MB", "200")) * 1024 * 1024
+    app.config["UPLOAD_MAX_FILE_BYTES"] = int(os.getenv("UPLOAD_MAX_FILE_MB", "5")) * 1024 * 1024
+    app.config["UPLOAD_MAX_ARCHIVE_ENTRIES"] = int(os.getenv("UPLOAD_MAX_ARCHIVE_ENTRIES", "100000"))
+    # Processes used to analyze files, per gunicorn worker (GUNICORN_WORKERS of them, as in
+    # entrypoint.sh); 0 shares the CPUs available to the container between the gunicorn workers.
+    app.config["ANALYSIS_WORKERS"] = int(os.getenv("ANALYSIS_WORKERS", "0"))
+    app.config["GUNICORN_WORKERS"] = int(os.getenv("GUNICORN_WORKERS", "2"))
+    # Background analysis jobs: their state files, and how many run at once per gunicorn worker.
+    app.config["JOBS_DIR"] = os.getenv("JOBS_DIR", "/var/data/jobs")
+    app.config["ANALYSIS_JOBS"] = int(os.getenv("ANALYSIS_JOBS", "1"))
+    # Analysis results shared by every project, keyed by file content; "" disables the cache.
+    app.config["ANALYSIS_CACHE_DIR"] = os.getenv("ANALYSIS_CACHE_DIR", "/var/data/cache/analysis")
+    app.config["ANALYSIS_CACHE_MAX_BYTES"] = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024
+    # Variable usages are always stored; they go into the exports (and so the prompt) only when set.
+    app.config["EXPORT_VARIABLE_USAGES"] = os.getenv("EXPORT_VARIABLE_USAGES", "false").lower() == "true"
     app.config["PLANTUML_JAR_PATH"] = os.getenv("PLANTUML_JAR_PATH", "/opt/plantuml.jar")
+    # Warm PlantUML processes per gunicorn worker (JVMs, across all formats) and the limit of one render.
+    app.config["PLANTUML_PROCESSES"] = int(os.getenv("PLANTUML_PROCESSES", "2"))
+    app.config["PLANTUML_RENDER_TIMEOUT"] = float(os.getenv("PLANTUML_RENDER_TIMEOUT", "60"))
+    # Rendered diagrams by hash of PlantUML source, format and jar, served at /diagrams.
+    # Every render is stored there; "" means a directory under the system temp dir.
+    app.config["RENDER_CACHE_DIR"] = os.getenv("RENDER_CACHE_DIR", "/var/data/cache/diagrams")
+    app.config["RENDER_CACHE_MAX_BYTES"] = int(os.getenv("RENDER_CACHE_MAX_MB", "512")) * 1024 * 1024
+    # Model replies by hash of export, diagram type, model and prompt; "" disables the cache.
+    app.config["LLM_CACHE_DIR"] = os.getenv("LLM_CACHE_DIR", "/var/data/cache/llm")
+    app.config["LLM_CACHE_MAX_BYTES"] = int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024
+    # Most tokens of project metadata put in one prompt; less detail is sent above it, 0 means no limit.
+    app.config["LLM_TOKEN_BUDGET"] = int(os.getenv("LLM_TOKEN_BUDGET", "60000"))
+    # Over the budget, "auto" generation asks for partial diagrams of chunks of
+    # LLM_CHUNK_TOKENS, LLM_MAX_CONCURRENCY at a time, and merges them ("single" never does).
+    # Class, component and package diagrams are drawn from the analysis without the model
+    # in "auto" (and "local") mode; "single" or "chunked" still ask the model for them.
+    app.config["LLM_GENERATION_MODE"] = os.getenv("LLM_GENERATION_MODE", "auto")
+    app.config["LLM_CHUNK_TOKENS"] = int(os.getenv("LLM_CHUNK_TOKENS", "20000"))
+    app.config["LLM_MAX_CONCURRENCY"] = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    # Diagrams of one /get_uml/batch request generated (and rendered) at the same time.
+    app.config["UML_BATCH_CONCURRENCY"] = int(os.getenv("UML_BATCH_CONCURRENCY", "4"))
     return app
\ No newline at end of file
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.analyzer.component_analyzer import ComponentAnalyzer
+from web_app.analyzer.file_analyzer import analyze_file, ANALYZER_VERSION
+from web_app.cache.disk_cache import DiskCache
+
+# One cache object per directory and process, so hit/miss counters add up over requests.
+_caches: Dict[str, DiskCache] = {}
+_caches_lock = threading.Lock()
+
+def get_analysis_cache(directory: str, max_bytes: int) -> Optional[DiskCache]:
+    """
+    Shared on-disk cache of file_analyzer() results, or None when caching is
+    disabled (no directory) or the directory cannot be created.
+    """
+    if not directory or max_bytes <= 0:
+        return None
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            try:
+                cache = DiskCache(directory, max_bytes, suffix=".json.z")
+            except OSError as e:
+                print(f"⚠️ Analysis cache disabled, cannot use {directory}: {e}")
+                return None
+            _caches[directory] = cache
+        return cache
+
+def analysis_cache_key(content_hash: str) -> str:
+    # The same source analyzed by another analyzer version is a different entry.
+    return f"{content_hash}-v{ANALYZER_VERSION}"
+
+def rebind_file_path(analyzed_file: Dict, file_location: str,
+                     organization: Optional[Tuple[str, str]] = None) -> Dict:
+    """
+    Replace the parts of a cached result that come from where the file lives
+    rather than from its content: file location, component name and organization
+    (given, or worked out from the file's folders).
+    """
+    component_name = os.path.splitext(os.path.basename(file_location))[0]
+    location = ComponentAnalyzer(file_location, organization)
+    component_result = analyzed_file["component"]
+    component_result["file_location"] = file_location
+    for component in component_result["components"]:
+        component["component_name"] = component_name
+        component["organization_name"] = location.organization_name
+        component["organization_path"] = location.organization_path
+    for dependency in component_result["dependencies"]:
+        dependency["organization_name"] = location.organization_name
+        dependency["organization_path"] = location.organization_path
+    return analyzed_file
+
+def load_analysis(cache: DiskCache, content_hash: str, file_location: str,
+                  organization: Optional[Tuple[str, str]] = None) -> Optional[Dict]:
+    """
+    Cached analysis of a file with this content, bound to file_location; None on a miss.
+    """
+    data = cache.get(analysis_cache_key(content_hash))
+    if data is None:
+        return None
+    return decode_analysis(data, file_location, organization)
+
+def decode_analysis(data: bytes, file_location: str,
+                    organization: Optional[Tuple[str, str]] = None) -> Optional[Dict]:
+    """
+    Turn a cache entry back into a file_analyzer() result bound to file_location.
+    """
+    try:
+        analyzed_file = json.loads(zlib.decompress(data))
+    except (zlib.error, ValueError) as e:
+        print(f"⚠️ Ignored corrupt analysis cache entry for {file_location}: {e}")
+        return None
+    return rebind_file_path(analyzed_file, file_location, organization)
+
+def store_analysis(cache: DiskCache, content_hash: str, analyzed_file: Dict):
+    # Enum values (scope, visibility, ...) are str subclasses and are stored as their values.
+    data = json.dumps(analyzed_file, separators=(",", ":")).encode("utf-8")
+    try:
+        cache.put(analysis_cache_key(content_hash), zlib.compress(data, 1))
+    except OSError as e:
+        print(f"⚠️ Could not write analysis cache entry: {e}")
+
+def analyze_file_cached(file_location: str, content_hash: str, cache_dir: str, max_bytes: int,
+                        organization: Optional[Tuple[str, str]] = None) -> Dict:
+    """
+    analyze_file() that also stores its result in the analysis cache.
+    Runs in the analysis worker processes, which have no Flask app, so the
+    cache is passed as its directory and size.
+    """
+    analyzed_file = analyze_file(file_location, organization)
+    cache = get_analysis_cache(cache_dir, max_bytes)
+    if cache is not None:
+        store_analysis(cache, content_hash, analyzed_file)
+    return analyzed_file
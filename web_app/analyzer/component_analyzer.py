@@ -2,7 +2,7 @@ import ast
 import os
 import sys
 import json
-from typing import List
+from typing import List, Optional, Tuple
 from dataclasses import dataclass, asdict
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
@@ -35,13 +35,17 @@ class ComponentAnalyzer(ast.NodeVisitor):
       
     It also gathers organization information from the file's path.
     """
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, organization: Optional[Tuple[str, str]] = None):
         self.component_classes = []  # Each entry: { "name": str, "methods": List[str], "docstring": str }
         self.component_methods = []  # Global functions (module-level)
         self.dependencies = []       # Inheritance dependencies between classes
         self.organization_name = ""
         self.organization_path = ""
-        self._set_organization_info(file_path)
+        if organization is not None:
+            # Already known from the project walk (ProjectTree.organization_info).
+            self.organization_name, self.organization_path = organization
+        else:
+            self._set_organization_info(file_path)
         
     def _set_organization_info(self, file_path: str):
         abs_path = os.path.abspath(file_path)
@@ -64,14 +68,21 @@ class ComponentAnalyzer(ast.NodeVisitor):
     def visit_Module(self, node: ast.Module):
         # Check for global (module-level) functions.
         for stmt in node.body:
-            if isinstance(stmt, ast.FunctionDef):
-                self.component_methods.append(stmt.name)
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.record_module_function(stmt)
             else:
                 self.visit(stmt)
                 
     def visit_ClassDef(self, node: ast.ClassDef):
+        self.record_class(node)
+        self.generic_visit(node)
+
+    def record_module_function(self, node: ast.FunctionDef):
+        self.component_methods.append(node.name)
+
+    def record_class(self, node: ast.ClassDef):
         # Record class methods and docstring.
-        methods = [item.name for item in node.body if isinstance(item, ast.FunctionDef)]
+        methods = [item.name for item in node.body if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))]
         self.component_classes.append({
             "name": node.name,
             "methods": methods,
@@ -88,13 +99,13 @@ class ComponentAnalyzer(ast.NodeVisitor):
                     "organization_name": self.organization_name,
                     "organization_path": self.organization_path
                 })
-        self.generic_visit(node)
 
 def component_analyzer(code: str, file_path: str):
     """
     Analyze a Python file and returns a dictionary with the following keys:
        - "components": a list of one component, built from the file name and its analyzed content.
        - "dependencies": a list of inheritance dependencies (if any).
+       - "classes": name and docstring of every class defined in the file.
        - "file_location": the provided file path.
     
     The component is built in such a way that:
@@ -111,6 +122,7 @@ def component_analyzer(code: str, file_path: str):
         return {
             "components": [],
             "dependencies": [],
+            "classes": [],
             "file_location": file_path
         }
     
@@ -119,7 +131,13 @@ def component_analyzer(code: str, file_path: str):
         analyzer.visit(tree)
     except Exception as visitor_err:
         print(f"Ignored visitor error in file {file_path}: {visitor_err}")
-    
+    return build_component_result(analyzer, file_path)
+
+def build_component_result(analyzer: ComponentAnalyzer, file_path: str):
+    """
+    Turn the state collected by a ComponentAnalyzer into the
+    "components" / "dependencies" / "file_location" result dictionary.
+    """
     # Collect methods defined inside classes.
     class_methods = []
     for cls in analyzer.component_classes:
@@ -154,6 +172,8 @@ def component_analyzer(code: str, file_path: str):
     return {
         "components": [asdict(component)],
         "dependencies": analyzer.dependencies,
+        # Classes defined in the file, for diagrams drawn straight from the analysis.
+        "classes": [{"name": cls["name"], "docstring": cls["docstring"]} for cls in analyzer.component_classes],
         "file_location": file_path
     }
 
@@ -0,0 +1,151 @@
+import ast
+import hashlib
+import os
+import sys
+from dataclasses import asdict
+from typing import Dict, Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.analyzer.component_analyzer import ComponentAnalyzer, build_component_result
+from web_app.analyzer.method_analyzer import MethodAnalyzer, FUNCTION_TYPES
+from web_app.analyzer.variable_analyzer import VariableAnalyzer
+
+# Bump whenever a change to the analyzers changes their output for the same source code.
+ANALYZER_VERSION = "4"
+
+class FileAnalyzer:
+    """
+    Single-pass analyzer for a Python file.
+
+    The file is parsed once and the tree is walked once. During that walk every
+    node is handed to the ComponentAnalyzer, MethodAnalyzer and VariableAnalyzer
+    hooks, reproducing what their own NodeVisitor passes would have collected:
+      - component hooks are skipped inside module-level functions,
+      - method hooks see every function (async ones too) and every ``return``,
+      - variable hooks are skipped below a ``return`` statement,
+      - ``parent`` pointers are set exactly as VariableAnalyzer expects.
+    """
+    def __init__(self, file_path: str, organization: Optional[Tuple[str, str]] = None):
+        self.component = ComponentAnalyzer(file_path, organization)
+        self.method = MethodAnalyzer()
+        self.variable = VariableAnalyzer()
+
+    def analyze(self, tree: ast.Module):
+        for stmt in tree.body:
+            stmt.parent = tree
+            if isinstance(stmt, FUNCTION_TYPES):
+                self.component.record_module_function(stmt)
+                self._visit(stmt, False, True)
+            else:
+                self._visit(stmt, True, True)
+
+    def _visit(self, node: ast.AST, component_active: bool, variable_active: bool):
+        node_type = type(node)
+
+        if node_type is ast.Name:
+            if variable_active:
+                self.variable.record_name(node)
+            return
+
+        if node_type is ast.ClassDef:
+            if component_active:
+                self.component.record_class(node)
+            self.method.enter_class(node)
+            if variable_active:
+                self.variable.enter_class(node)
+            self._visit_children(node, component_active, variable_active)
+            self.method.leave_class(node)
+            if variable_active:
+                self.variable.leave_class(node)
+            return
+
+        if node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef:
+            self.method.record_function(node)
+            if variable_active:
+                self.variable.enter_function(node)
+            self._visit_children(node, component_active, variable_active)
+            self.method.leave_function(node)
+            if variable_active:
+                self.variable.leave_function(node)
+            return
+
+        if node_type is ast.Return:
+            self.method.record_return(node)
+
+        if variable_active:
+            if node_type is ast.Assign:
+                self.variable.record_assign(node)
+            elif node_type is ast.Attribute:
+                self.variable.record_attribute(node)
+            elif node_type is ast.Return:
+                self.variable.record_return(node)
+                variable_active = False
+
+        self._visit_children(node, component_active, variable_active)
+
+    def _visit_children(self, node: ast.AST, component_active: bool, variable_active: bool):
+        for child in ast.iter_child_nodes(node):
+            # Load/Store/Del contexts are shared singletons with nothing to record.
+            if isinstance(child, ast.expr_context):
+                continue
+            child.parent = node
+            self._visit(child, component_active, variable_active)
+
+def file_analyzer(code: str, file_path: str, organization: Optional[Tuple[str, str]] = None) -> Dict:
+    """
+    Analyze a Python file in one parse and one traversal.
+    organization is the file's (organization_name, organization_path) when the
+    caller already knows it; otherwise it is worked out from the file's folders.
+
+    Returns a dictionary with the three results the individual analyzers produce:
+       - "component": same shape as component_analyzer()
+       - "method": same shape as method_analyzer()
+       - "variable": same shape as variable_analyzer()
+    """
+    analyzer = FileAnalyzer(file_path, organization)
+    try:
+        tree = ast.parse(code)
+    except Exception as parse_err:
+        print(f"Ignored parsing error in file {file_path}: {parse_err}")
+        return {
+            "component": {"components": [], "dependencies": [], "classes": [], "file_location": file_path},
+            "method": {"methods": []},
+            "variable": {"variables": [], "usages": [], "flows": []}
+        }
+
+    try:
+        analyzer.analyze(tree)
+    except Exception as visitor_err:
+        print(f"Ignored visitor error in file {file_path}: {visitor_err}")
+
+    return {
+        "component": build_component_result(analyzer.component, file_path),
+        "method": {"methods": [asdict(m) for m in analyzer.method.methods]},
+        "variable": {
+            "variables": [asdict(v) for v in analyzer.variable.variables],
+            "usages": [asdict(u) for u in analyzer.variable.usages],
+            "flows": [asdict(f) for f in analyzer.variable.flows]
+        }
+    }
+
+def file_content_hash(file_location: str) -> str:
+    """
+    SHA-256 of the file's bytes, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_location, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def analyze_file(file_location: str, organization: Optional[Tuple[str, str]] = None) -> Dict:
+    """
+    Read a Python file once and run the component, method and variable analysis on it.
+    """
+    with open(file_location, "r", encoding="utf-8") as f:
+        code = f.read()
+    return file_analyzer(code, file_location, organization)
+
+if __name__ == "__main__":
+    file_location = "project_sample/library_management_python/Misc/functions.py"
+    analyzed_file = analyze_file(file_location)
+    print(analyzed_file)
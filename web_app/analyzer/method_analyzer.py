@@ -20,10 +20,41 @@ class Method:
     parameters: List[MethodParameter]
     location: str  # This will store the class name if method is inside a class, or "global" if it's a standalone function
 
+FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+# Widths of the methods.return_type, methodparameters.parameter_type and default_value columns
+MAX_TYPE_LENGTH = 100
+MAX_DEFAULT_LENGTH = 255
+
+def _fit(text: Optional[str], limit: int) -> Optional[str]:
+    # Long annotations or defaults (e.g. dict literals) are cut to fit their column.
+    if text is None or len(text) <= limit:
+        return text
+    return text[:limit - 3] + "..."
+
+@dataclass
+class _Frame:
+    """
+    A function being analyzed: its Method, and the types of its return
+    statements in the order they appear.
+    """
+    method: Method
+    has_annotation: bool
+    return_types: Dict[str, None]
+
 class MethodAnalyzer(ast.NodeVisitor):
+    """
+    Methods and functions (async ones included) with their signatures.
+
+    Every node is visited once. A function's return statements are collected while
+    its body is visited and belong to the innermost enclosing function only; its
+    return type is settled when it is left (see leave_function). So the work is
+    linear in the size of the tree however deeply functions are nested.
+    """
     def __init__(self):
         self.methods = []
         self.current_class = None
+        # Enclosing classes (names) and functions (_Frame), innermost last
+        self.scopes = []
 
     def _format_complex_type(self, node: ast.Subscript) -> str:
         if isinstance(node.value, ast.Name):
@@ -37,28 +68,21 @@ class MethodAnalyzer(ast.NodeVisitor):
             return f'{base_type}[{param_type}]'
         return 'Any'
 
+    def _annotation_type(self, annotation: Optional[ast.expr]) -> Optional[str]:
+        if isinstance(annotation, ast.Name):
+            return annotation.id
+        elif isinstance(annotation, ast.Constant):
+            return str(annotation.value)
+        elif isinstance(annotation, ast.Subscript):
+            return self._format_complex_type(annotation)
+        return None
+
     def get_return_type(self, node: ast.FunctionDef) -> str:
-        # Check for return annotation
-        if node.returns:
-            if isinstance(node.returns, ast.Name):
-                return node.returns.id
-            elif isinstance(node.returns, ast.Constant):
-                return str(node.returns.value)
-            elif isinstance(node.returns, ast.Subscript):
-                return self._format_complex_type(node.returns)
-        
-        # Try to infer return type from return statements
-        return_types = set()
-        for child in ast.walk(node):
-            if isinstance(child, ast.Return) and child.value:
-                if isinstance(child.value, ast.Name):
-                    return_types.add(child.value.id)
-                elif isinstance(child.value, ast.Constant):
-                    return_types.add(type(child.value.value).__name__)
-        
-        if return_types:
-            return ' | '.join(return_types)
-        return 'Any'
+        """
+        Return annotation of a function; 'Any' when it has none (the type is then
+        inferred from its return statements, see record_return).
+        """
+        return self._annotation_type(node.returns) or 'Any'
 
     def get_visibility(self, node: ast.FunctionDef) -> str:
         if node.name.startswith('__'):
@@ -71,59 +95,101 @@ class MethodAnalyzer(ast.NodeVisitor):
         return any(isinstance(dec, ast.Name) and dec.id == 'staticmethod' 
                   for dec in node.decorator_list)
 
+    def _parameter(self, arg: ast.arg, name: str, default: Optional[ast.expr],
+                   is_required: bool) -> MethodParameter:
+        default_value = None
+        if default is not None:
+            default_value = str(default.value) if isinstance(default, ast.Constant) else ast.unparse(default)
+            default_value = _fit(default_value, MAX_DEFAULT_LENGTH)
+        return MethodParameter(
+            parameter_name=name,
+            parameter_type=_fit(self._annotation_type(arg.annotation) or 'Any', MAX_TYPE_LENGTH),
+            is_required=is_required,
+            default_value=default_value,
+            description=""  # Could be extracted from docstring if available
+        )
+
     def extract_parameters(self, node: ast.FunctionDef) -> List[MethodParameter]:
-        parameters = []
-        
-        # Skip 'self' parameter for instance methods
-        start_idx = 1 if (self.current_class and not self.is_static_method(node)) else 0
-        
-        for arg in node.args.args[start_idx:]:
-            param_type = 'Any'
-            if arg.annotation:
-                if isinstance(arg.annotation, ast.Name):
-                    param_type = arg.annotation.id
-                elif isinstance(arg.annotation, ast.Subscript):
-                    param_type = self._format_complex_type(arg.annotation)
-
-            # Find default value
-            default_value = None
-            is_required = True
-            arg_idx = node.args.args.index(arg)
-            defaults_idx = arg_idx - (len(node.args.args) - len(node.args.defaults))
-            if defaults_idx >= 0:
-                default = node.args.defaults[defaults_idx]
-                if isinstance(default, ast.Constant):
-                    default_value = str(default.value)
-                    is_required = False
-
-            parameters.append(MethodParameter(
-                parameter_name=arg.arg,
-                parameter_type=param_type,
-                is_required=is_required,
-                default_value=default_value,
-                description=""  # Could be extracted from docstring if available
-            ))
-        
+        """
+        Parameters in declaration order: positional-only, positional, *args,
+        keyword-only, **kwargs. *args and **kwargs keep their stars in the name.
+        """
+        args = node.args
+        positional = args.posonlyargs + args.args
+        # Defaults belong to the last positional parameters
+        defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+
+        # Skip 'self' (or 'cls') of methods defined in the class body
+        in_class_body = bool(self.scopes) and isinstance(self.scopes[-1], str)
+        start_idx = 1 if (in_class_body and not self.is_static_method(node)) else 0
+
+        parameters = [
+            self._parameter(arg, arg.arg, default, default is None)
+            for arg, default in zip(positional[start_idx:], defaults[start_idx:])
+        ]
+        if args.vararg:
+            parameters.append(self._parameter(args.vararg, f"*{args.vararg.arg}", None, False))
+        for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+            parameters.append(self._parameter(arg, arg.arg, default, default is None))
+        if args.kwarg:
+            parameters.append(self._parameter(args.kwarg, f"**{args.kwarg.arg}", None, False))
         return parameters
 
     def visit_ClassDef(self, node: ast.ClassDef):
-        self.current_class = node.name
+        self.enter_class(node)
         self.generic_visit(node)
-        self.current_class = None
+        self.leave_class(node)
 
     def visit_FunctionDef(self, node: ast.FunctionDef):
+        self.record_function(node)
+        self.generic_visit(node)
+        self.leave_function(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Return(self, node: ast.Return):
+        self.record_return(node)
+        self.generic_visit(node)
+
+    def enter_class(self, node: ast.ClassDef):
+        self.scopes.append(node.name)
+        self.current_class = node.name
+
+    def leave_class(self, node: ast.ClassDef):
+        self.scopes.pop()
+        # Back to the enclosing class, if any
+        self.current_class = next((scope for scope in reversed(self.scopes) if isinstance(scope, str)), None)
+
+    def record_function(self, node: ast.FunctionDef):
+        """
+        Record a function when it is entered; its inferred return type is filled
+        in by leave_function.
+        """
         method = Method(
             method_name=node.name,
-            return_type=self.get_return_type(node),
+            return_type=_fit(self.get_return_type(node), MAX_TYPE_LENGTH),
             visibility=self.get_visibility(node),
             is_static=self.is_static_method(node),
             description=ast.get_docstring(node) or "",
             parameters=self.extract_parameters(node),
             location=self.current_class or "global"
         )
-        
         self.methods.append(method)
-        self.generic_visit(node)
+        self.scopes.append(_Frame(method, self._annotation_type(node.returns) is not None, {}))
+
+    def record_return(self, node: ast.Return):
+        frame = self.scopes[-1] if self.scopes else None
+        if not isinstance(frame, _Frame) or frame.has_annotation or not node.value:
+            return
+        if isinstance(node.value, ast.Name):
+            frame.return_types[node.value.id] = None
+        elif isinstance(node.value, ast.Constant):
+            frame.return_types[type(node.value.value).__name__] = None
+
+    def leave_function(self, node: ast.FunctionDef):
+        frame = self.scopes.pop()
+        if frame.return_types:
+            frame.method.return_type = _fit(' | '.join(frame.return_types), MAX_TYPE_LENGTH)
 
 def method_analyzer(code: str) -> Dict:
     try:
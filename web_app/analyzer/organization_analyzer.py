@@ -1,6 +1,9 @@
 import os
+import sys
 from dataclasses import dataclass, asdict
-from typing import List
+from typing import List, Optional
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.analyzer.project_tree import ProjectTree
 
 
 @dataclass
@@ -9,52 +12,28 @@ class Organization:
     organization_path: str
     organization_type: str
 
-def dfs_collect_orgs(current_dir: str, root_path: str) -> List[dict]:
+def collect_orgs(tree: ProjectTree) -> List[dict]:
     """
-    Recursively traverse the directory structure using DFS not BFS.
-    A directory is considered a leaf organization (and thus output) only if it has no subdirectories.
-    
+    The leaf folders of the project (folders without subfolders), depth first.
+    A folder is a 'module' if it holds an __init__.py, otherwise a 'package'.
+
     Args:
-        current_dir (str): The directory to process.
-        root_path (str): The original root directory (used to calculate relative paths).
-        
+        tree (ProjectTree): The scanned project.
+
     Returns:
         List[dict]: A list of organization dictionaries for leaf directories.
     """
-    try:
-        entries = os.listdir(current_dir)
-    except Exception as err:
-        print(f"Error accessing directory {current_dir}: {err}")
-        return []
-    
-    # Filter subdirectories: ignore hidden directories and __pycache__
-    sub_dirs = [
-        entry for entry in entries 
-        if os.path.isdir(os.path.join(current_dir, entry)) 
-           and not entry.startswith('.') 
-           and entry != '__pycache__'
-    ]
-    
-    if not sub_dirs:
-        # Leaf folder: no subdirectories.
-        base_name = os.path.basename(current_dir)
-        has_init = '__init__.py' in entries
-        org_type = 'module' if has_init else 'package'
-        relative_path = os.path.relpath(current_dir, root_path)
+    organizations = []
+    for folder in tree.leaf_folders():
         organization = Organization(
-            organization_name=base_name,
-            organization_path=relative_path,
-            organization_type=org_type
+            organization_name=folder.name,
+            organization_path=folder.relative_path,
+            organization_type='module' if folder.has_init else 'package'
         )
-        return [asdict(organization)]
-    else:
-        organizations = []
-        for sub in sub_dirs:
-            full_sub_path = os.path.join(current_dir, sub)
-            organizations.extend(dfs_collect_orgs(full_sub_path, root_path))
-        return organizations
+        organizations.append(asdict(organization))
+    return organizations
 
-def analyze_organization(root_path: str) -> dict:
+def analyze_organization(root_path: str, tree: Optional[ProjectTree] = None) -> dict:
     """
     Analyze organizational units using DFS traversal.
     
@@ -63,12 +42,14 @@ def analyze_organization(root_path: str) -> dict:
     
     Args:
         root_path (str): Root directory path to start analysis.
+        tree (ProjectTree): The project already scanned from root_path, if the caller has it.
     
     Returns:
         dict: Dictionary containing a list of organization information.
     """
+    organizations = []
     try:
-        organizations = dfs_collect_orgs(root_path, root_path)
+        organizations = collect_orgs(tree or ProjectTree.scan(root_path))
     except Exception as parse_err:
         print(f"Ignored parsing error in organization analyzer: {parse_err}")
     return {"organizations": organizations}
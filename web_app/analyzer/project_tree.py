@@ -0,0 +1,152 @@
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class FileNode:
+    path: str
+    relative_path: str
+    size: int
+    mtime_ns: int
+    folder: "FolderNode"
+
+@dataclass
+class FolderNode:
+    path: str
+    relative_path: str                 # "." for the root
+    name: str
+    has_init: bool = False
+    package_path: str = ""             # enclosing folders with an __init__.py, outermost first, "/"-joined
+    readable: bool = True
+    folders: List["FolderNode"] = field(default_factory=list)
+    files: List[FileNode] = field(default_factory=list)
+
+def _skipped(name: str) -> bool:
+    # Hidden entries and bytecode caches are never part of the project.
+    return name.startswith('.') or name == '__pycache__'
+
+def _package_path_above(folder: str) -> str:
+    """
+    Package path of the folders above the project root, climbing while they hold an __init__.py.
+    """
+    parts = []
+    current = os.path.dirname(os.path.abspath(folder))
+    while current and os.path.isfile(os.path.join(current, '__init__.py')):
+        parts.append(os.path.basename(current))
+        parent = os.path.dirname(current)
+        if parent == current:
+            break
+        current = parent
+    return '/'.join(reversed(parts))
+
+class ProjectTree:
+    """
+    Folders and files of an uploaded project, read in one os.scandir walk.
+
+    Everything the analysis needs from the file system comes from here: the leaf
+    folders that become organizations, the files to analyze (with the size and
+    mtime the manifest compares), and the organization name and package path of
+    every file, which are worked out once per folder instead of once per file.
+    """
+    def __init__(self, root_folder: str):
+        self.root_folder = root_folder
+        self.root = FolderNode(root_folder, ".", os.path.basename(os.path.abspath(root_folder)))
+        self.files: Dict[str, FileNode] = {}
+        self.errors: List[str] = []
+
+    @classmethod
+    def scan(cls, root_folder: str, is_analyzable=None) -> "ProjectTree":
+        """
+        Walk root_folder breadth first. Only files accepted by is_analyzable (a
+        function of the file path) are kept; every folder is, for organizations.
+        Folders that cannot be read are recorded in errors and treated as empty.
+        """
+        tree = cls(root_folder)
+        queue = deque([tree.root])
+        while queue:
+            folder = queue.popleft()
+            subfolders, files = [], []
+            try:
+                with os.scandir(folder.path) as entries:
+                    for entry in entries:
+                        if entry.name == '__init__.py':
+                            folder.has_init = True
+                        if _skipped(entry.name):
+                            continue
+                        if entry.is_dir():
+                            subfolders.append(entry)
+                        elif entry.is_file() and (is_analyzable is None or is_analyzable(entry.path)):
+                            files.append(entry)
+            except OSError as e:
+                folder.readable = False
+                tree.errors.append(f"Cannot read {folder.path}: {e}")
+                continue
+
+            for entry in files:
+                try:
+                    stat = entry.stat()
+                except OSError as e:
+                    tree.errors.append(f"Error reading {entry.path}: {e}")
+                    continue
+                node = FileNode(entry.path, os.path.relpath(entry.path, root_folder),
+                                stat.st_size, stat.st_mtime_ns, folder)
+                folder.files.append(node)
+                tree.files[node.path] = node
+            for entry in subfolders:
+                child = FolderNode(entry.path, os.path.relpath(entry.path, root_folder), entry.name)
+                folder.folders.append(child)
+                queue.append(child)
+        tree._set_package_paths()
+        return tree
+
+    def _set_package_paths(self):
+        # Top down, once every folder knows whether it holds an __init__.py.
+        if self.root.has_init:
+            self.root.package_path = '/'.join(filter(None, [_package_path_above(self.root.path), self.root.name]))
+        queue = deque([self.root])
+        while queue:
+            folder = queue.popleft()
+            for child in folder.folders:
+                if child.has_init:
+                    child.package_path = f"{folder.package_path}/{child.name}" if folder.has_init else child.name
+                queue.append(child)
+
+    def files_bfs(self) -> List[str]:
+        """
+        Paths of the analyzable files, the root's first, then each following folder level.
+        """
+        paths = []
+        queue = deque([self.root])
+        while queue:
+            folder = queue.popleft()
+            paths.extend(node.path for node in folder.files)
+            queue.extend(folder.folders)
+        return paths
+
+    def leaf_folders(self) -> List[FolderNode]:
+        """
+        Folders without subfolders, depth first: the organizations of the project.
+        """
+        leaves = []
+        stack = [self.root]
+        while stack:
+            folder = stack.pop()
+            if not folder.readable:
+                continue
+            if folder.folders:
+                stack.extend(reversed(folder.folders))
+            else:
+                leaves.append(folder)
+        return leaves
+
+    def organization_info(self, file_location: str) -> Optional[Tuple[str, str]]:
+        """
+        (organization_name, organization_path) of a file, as ComponentAnalyzer reports
+        them: the name of its folder and the package path of its __init__.py folders.
+        None for a file that is not in the tree.
+        """
+        node = self.files.get(file_location)
+        if node is None:
+            return None
+        return node.folder.name, node.folder.package_path
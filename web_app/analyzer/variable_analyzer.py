@@ -70,6 +70,7 @@ class VariableAnalyzer(ast.NodeVisitor):
         self.current_method = None
         self.current_scope = Scope.GLOBAL
         self.scope_stack = []
+        self.class_stack = []
 
     def enter_scope(self, scope: Scope):
         self.scope_stack.append(self.current_scope)
@@ -114,6 +115,33 @@ class VariableAnalyzer(ast.NodeVisitor):
         return ''
 
     def visit_ClassDef(self, node: ast.ClassDef):
+        self.enter_class(node)
+        self.generic_visit(node)
+        self.leave_class(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self.enter_function(node)
+        self.generic_visit(node)
+        self.leave_function(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Assign(self, node: ast.Assign):
+        self.record_assign(node)
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        self.record_attribute(node)
+        self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name):
+        self.record_name(node)
+
+    def visit_Return(self, node: ast.Return):
+        self.record_return(node)
+
+    def enter_class(self, node: ast.ClassDef):
+        self.class_stack.append(self.current_class)
         self.current_class = node.name
         self.enter_scope(Scope.CLASS)
         
@@ -140,11 +168,13 @@ class VariableAnalyzer(ast.NodeVisitor):
                             line_number=item.lineno,
                             component_name=self.current_class
                         ))
-        self.generic_visit(node)
-        self.current_class = None
+
+    def leave_class(self, node: ast.ClassDef):
+        # Back to the enclosing class of a nested one
+        self.current_class = self.class_stack.pop()
         self.exit_scope()
 
-    def visit_FunctionDef(self, node: ast.FunctionDef):
+    def enter_function(self, node: ast.FunctionDef):
         self.current_method = node.name
         self.enter_scope(Scope.METHOD)
         # Handle parameters (skip "self").
@@ -175,11 +205,12 @@ class VariableAnalyzer(ast.NodeVisitor):
                 component_name=self.current_class,
                 method_name=self.current_method
             ))
-        self.generic_visit(node)
+
+    def leave_function(self, node: ast.FunctionDef):
         self.current_method = None
         self.exit_scope()
 
-    def visit_Assign(self, node: ast.Assign):
+    def record_assign(self, node: ast.Assign):
         for target in node.targets:
             if isinstance(target, (ast.Name, ast.Attribute)):
                 var_name = self.get_full_name(target)
@@ -217,9 +248,8 @@ class VariableAnalyzer(ast.NodeVisitor):
                         source_component=self.current_class,
                         target_component=self.current_class
                     ))
-        self.generic_visit(node)
 
-    def visit_Attribute(self, node: ast.Attribute):
+    def record_attribute(self, node: ast.Attribute):
         # Only record a usage for the outermost attribute in a chain.
         if not (hasattr(node, 'parent') and isinstance(node.parent, ast.Attribute)):
             if isinstance(node.ctx, ast.Load):
@@ -231,9 +261,8 @@ class VariableAnalyzer(ast.NodeVisitor):
                     component_name=self.current_class,
                     method_name=self.current_method
                 ))
-        self.generic_visit(node)
 
-    def visit_Name(self, node: ast.Name):
+    def record_name(self, node: ast.Name):
         # If this Name node is part of an attribute chain, skip it since
         # the outer Attribute already registers the complete variable.
         if hasattr(node, 'parent') and isinstance(node.parent, ast.Attribute):
@@ -247,7 +276,7 @@ class VariableAnalyzer(ast.NodeVisitor):
                 method_name=self.current_method
             ))
 
-    def visit_Return(self, node: ast.Return):
+    def record_return(self, node: ast.Return):
         if isinstance(node.value, (ast.Name, ast.Attribute)):
             var_name = (
                 node.value.id if isinstance(node.value, ast.Name)
@@ -0,0 +1,176 @@
+import os
+import sys
+import tempfile
+import threading
+from typing import Dict, Optional
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+class DiskCache:
+    """
+    Size-bounded key/value store of byte strings in a directory, evicting the
+    least recently used entries first.
+
+    Each entry is one file, <directory>/<first two characters of key>/<key><suffix>.
+    Entries are written to a temporary file and renamed into place, so several
+    processes (gunicorn workers, analysis workers) can share the directory.
+    A hit sets the entry's mtime to now; eviction removes the oldest mtimes until
+    the directory is back under low_water * max_bytes.
+
+    Every process keeps its own estimate of the directory size and re-scans the
+    directory after writing a further rescan_fraction of max_bytes, so the bound
+    can be exceeded by at most that much per writing process.
+    """
+    def __init__(self, directory: str, max_bytes: int, suffix: str = "",
+                 low_water: float = 0.9, rescan_fraction: float = 0.05):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.low_water = low_water
+        self.rescan_bytes = max(1, int(max_bytes * rescan_fraction))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None                  # estimated bytes in the directory, None until scanned
+        self._written_since_scan = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def contains(self, key: str) -> bool:
+        return os.path.isfile(self.path_for(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass                            # evicted meanwhile, or read-only; the data is still good
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def touch(self, key: str) -> Optional[str]:
+        """
+        Path of the entry, marked as just used, for serving it straight from disk; None on a miss.
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key: str, data: bytes):
+        path = self.path_for(key)
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[0]
+            else:
+                self._size += len(data)
+            self._written_since_scan += len(data)
+            must_evict = (self._size > self.max_bytes
+                          or self._written_since_scan >= self.rescan_bytes)
+        if must_evict:
+            self.evict()
+
+    def _entries(self):
+        """
+        (mtime, size, path) of every entry in the directory.
+        """
+        entries = []
+        try:
+            shards = list(os.scandir(self.directory))
+        except OSError:
+            return entries
+        for shard in shards:
+            if not shard.is_dir(follow_symlinks=False):
+                continue
+            try:
+                with os.scandir(shard.path) as files:
+                    for entry in files:
+                        if entry.name.startswith(".tmp-"):
+                            continue
+                        try:
+                            stat = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            except OSError:
+                continue
+        return entries
+
+    def _scan(self):
+        entries = self._entries()
+        return sum(size for _, size, _ in entries), len(entries)
+
+    def evict(self):
+        """
+        Re-scan the directory and delete least recently used entries until it is
+        under low_water * max_bytes (or do nothing if it is within max_bytes).
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        if total > self.max_bytes:
+            target = int(self.max_bytes * self.low_water)
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass                    # another process evicted it first
+                except OSError:
+                    continue
+                total -= size
+        with self._lock:
+            self._size = total
+            self._written_since_scan = 0
+            self.evictions += removed
+
+    def stats(self) -> Dict:
+        """
+        Counters of this process plus the current size of the directory.
+        """
+        size, entries = self._scan()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions
+            }
@@ -1,140 +1,401 @@
 import sys
 import os
+import threading
+import multiprocessing
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-from web_app.analyzer.component_analyzer import analyze_component
-from web_app.analyzer.method_analyzer import analyze_method
-from web_app.analyzer.variable_analyzer import analyze_variable
+from flask import current_app
+from web_app.model.db_session import get_db
+from web_app.analyzer.file_analyzer import analyze_file, file_content_hash, ANALYZER_VERSION
 from web_app.analyzer.organization_analyzer import analyze_organization
-from web_app.model.component_model import insert_components
+from web_app.analyzer.project_tree import ProjectTree
+from web_app.analyzer.analysis_cache import (
+    get_analysis_cache, analysis_cache_key, decode_analysis, analyze_file_cached
+)
+from web_app.model.component_model import insert_components, set_components_organization
 from web_app.model.method_model import insert_method
 from web_app.model.variable_model import insert_variable
 from web_app.model.organization_model import insert_organization
-def process_file(file_location):
-    error_msg=[]
+from web_app.model.bulk_model import transaction
+from web_app.model.symbol_table import SymbolTable
+from web_app.model.manifest_model import (
+    ManifestEntry, ProjectManifest, delete_component_rows, delete_organization_rows
+)
+from web_app.model.project_model import delete_project_rows
 
-    # Skip if not a Python file
-    if not file_location.endswith('.py'):
-        return []
+# Persistent pool of analysis worker processes, shared by every request of this worker.
+_analysis_pool = None
+_analysis_pool_size = 0
+_analysis_pool_lock = threading.Lock()
+# Files analyzed ahead of the one being written, per analysis process.
+IN_FLIGHT_PER_WORKER = 2
 
-    # Skip __init__.py files
-    if os.path.basename(file_location) == '__init__.py':
-        return []
+def default_worker_count(web_workers=1):
+    """
+    Share of the CPUs this container is allowed to run on for each of the
+    web_workers gunicorn workers, as every one of them has its own pool.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, cpus // max(1, web_workers))
 
-    print(f"Processing file: {file_location}")
-    analyzed_component = analyze_component(file_location)
-    analyzed_method = analyze_method(file_location)
-    analyzed_variable = analyze_variable(file_location)
+def get_analysis_pool(workers):
+    """
+    Return the shared process pool, creating it (or resizing it) on first use.
+    Workers are spawned rather than forked so they never inherit the DB connection
+    or locks held by other threads of the web worker.
+    """
+    global _analysis_pool, _analysis_pool_size
+    with _analysis_pool_lock:
+        if _analysis_pool is None or _analysis_pool_size != workers:
+            if _analysis_pool is not None:
+                _analysis_pool.shutdown(wait=False, cancel_futures=True)
+            _analysis_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _analysis_pool_size = workers
+        return _analysis_pool
 
-    try:
-        insert_components(analyzed_component)
-    except Exception as e:
-        error_msg.extend(f"Error during processing insert_components of {file_location} at process_file: {e}")
+def shutdown_analysis_pool():
+    global _analysis_pool, _analysis_pool_size
+    with _analysis_pool_lock:
+        if _analysis_pool is not None:
+            _analysis_pool.shutdown(wait=False, cancel_futures=True)
+        _analysis_pool = None
+        _analysis_pool_size = 0
 
-        return error_msg
-    try:
-        insert_method(analyzed_method)
-    except Exception as e:
-        error_msg.extend(f"Error during processing insert_method of{file_location} at process_file: {e}")
+def is_analyzable(file_location):
+    # Only Python files, and __init__.py files are skipped.
+    return file_location.endswith('.py') and os.path.basename(file_location) != '__init__.py'
 
-        return error_msg
+def ingest_file(file_location, analyzed_file, symbols, manifest=None, manifest_entry=None):
+    """
+    Insert the component, method and variable results of one analyzed file
+    in a single transaction; a failure rolls the whole file back.
+    Foreign keys are resolved through the run's SymbolTable.
+    With a manifest, the rows of the file's previous analysis are replaced and
+    its manifest entry is updated in the same transaction.
+    """
+    error_msg=[]
+    db = get_db()
+    stage = "insert_components"
     try:
-        insert_variable(analyzed_variable)
+        with transaction(db):
+            if manifest is not None:
+                previous = manifest.files.get(manifest_entry.relative_path)
+                if previous is not None:
+                    delete_component_rows([previous.row_id], commit=False)
+            component_ids = insert_components(analyzed_file["component"], symbols, commit=False)
+            stage = "insert_method"
+            insert_method(analyzed_file["method"], file_location, symbols, commit=False)
+            stage = "insert_variable"
+            insert_variable(analyzed_file["variable"], file_location, symbols, commit=False)
+            if manifest is not None:
+                stage = "record_manifest"
+                manifest_entry.row_id = component_ids[0] if component_ids else None
+                manifest.record("file", [manifest_entry])
     except Exception as e:
-        error_msg.extend(f"Error during processing insert_variable of {file_location} at process_file: {e}")
-
+        error_msg.append(f"Error during processing {stage} of {file_location} at process_file: {e}")
         return error_msg
-    
+
     print(f"✅ All data inserted successfully for {file_location}")
     return error_msg
-    
 
-def process_folder(root_folder):
+def scan_project(root_folder, error_msg):
+    """
+    Read the project's folders and analyzable files in one walk (see ProjectTree).
+    """
+    tree = ProjectTree.scan(root_folder, is_analyzable)
+    error_msg.extend(f"{error} at process_folder" for error in tree.errors)
+    return tree
+
+def analysis_cache():
+    """
+    The analysis cache configured for this app, or None when it is disabled.
+    """
+    return get_analysis_cache(
+        current_app.config.get("ANALYSIS_CACHE_DIR"),
+        current_app.config.get("ANALYSIS_CACHE_MAX_BYTES", 0)
+    )
+
+def _organization(tree, file_location):
+    return tree.organization_info(file_location) if tree is not None else None
+
+def _analysis_job(file_location, content_hashes, cache, tree=None):
+    """
+    Function and arguments that analyze one file, storing the result in the cache if there is one.
+    """
+    content_hash = content_hashes.get(file_location)
+    organization = _organization(tree, file_location)
+    if cache is None or content_hash is None:
+        return analyze_file, (file_location, organization)
+    return analyze_file_cached, (file_location, content_hash, cache.directory, cache.max_bytes, organization)
+
+def _prefetch_cached(file_locations, content_hashes, cache):
+    """
+    Compressed cache entries of the files whose content was analyzed before.
+    They are decoded one at a time as the files are ingested.
+    """
+    cached = {}
+    if cache is None:
+        return cached
+    for file_location in file_locations:
+        content_hash = content_hashes.get(file_location)
+        if content_hash is None:
+            continue
+        data = cache.get(analysis_cache_key(content_hash))
+        if data is not None:
+            cached[file_location] = data
+    return cached
+
+def _analyze_sequential(file_locations, error_msg, content_hashes=None, cache=None, cached=None, tree=None):
+    content_hashes = content_hashes or {}
+    cached = cached or {}
+    for file_location in file_locations:
+        print(f"Processing file: {file_location}")
+        try:
+            analyzed_file = None
+            if file_location in cached:
+                analyzed_file = decode_analysis(cached.pop(file_location), file_location,
+                                                _organization(tree, file_location))
+            if analyzed_file is None:
+                func, args = _analysis_job(file_location, content_hashes, cache, tree)
+                analyzed_file = func(*args)
+            yield file_location, analyzed_file
+        except Exception as e:
+            error_msg.append(f"Error analyzing {file_location} at process_folder: {e}")
+
+def _analyze_parallel(file_locations, workers, error_msg, content_hashes=None, cache=None, cached=None, tree=None):
+    """
+    Analyze files in the worker pool and yield the results in the original order,
+    so that the caller stays a single, ordered database writer.
+    Results wait in memory until their turn, so only IN_FLIGHT_PER_WORKER files per
+    process are submitted ahead of the one being yielded.
+    Files with a cached result are not submitted at all.
+    """
+    content_hashes = content_hashes or {}
+    cached = cached or {}
+    window = max(1, workers * IN_FLIGHT_PER_WORKER)
+    pending = deque(file_location for file_location in file_locations if file_location not in cached)
+    futures = {}
+
+    def submit_ahead():
+        # After shutdown_analysis_pool() this is a new pool.
+        pool = get_analysis_pool(workers)
+        while pending and len(futures) < window:
+            func, args = _analysis_job(pending[0], content_hashes, cache, tree)
+            futures[pending[0]] = pool.submit(func, *args)
+            pending.popleft()
+
+    for file_location in file_locations:
+        print(f"Processing file: {file_location}")
+        func, args = _analysis_job(file_location, content_hashes, cache, tree)
+        try:
+            if file_location in cached:
+                analyzed_file = decode_analysis(cached.pop(file_location), file_location,
+                                                _organization(tree, file_location))
+                yield file_location, analyzed_file if analyzed_file is not None else func(*args)
+            else:
+                submit_ahead()
+                yield file_location, futures.pop(file_location).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): finish this file here and hand the other
+            # files in flight to a new pool.
+            shutdown_analysis_pool()
+            futures.pop(file_location, None)
+            if pending and pending[0] == file_location:
+                pending.popleft()
+            pending.extendleft(reversed(list(futures)))
+            futures.clear()
+            try:
+                yield file_location, func(*args)
+            except Exception as e:
+                error_msg.append(f"Error analyzing {file_location} at process_folder: {e}")
+        except Exception as e:
+            error_msg.append(f"Error analyzing {file_location} at process_folder: {e}")
+
+def drop_previous_analysis(manifest):
+    """
+    Delete every row of the manifest's project, the manifest included.
+    """
+    delete_project_rows(manifest.project_id)
+    manifest.files.clear()
+    manifest.organizations.clear()
+
+def sync_organizations(tree, manifest, symbols):
+    """
+    Bring the organizations of the project in line with its current folders:
+    known folders keep their organization_id, new leaf folders are inserted and
+    folders that are gone (or are no longer leaves) are deleted.
+    Returns the paths of the newly inserted organizations.
+    """
+    db = get_db()
+    analyzed_organization = analyze_organization(tree.root_folder, tree)
+    current = {org["organization_path"]: org for org in analyzed_organization["organizations"]}
+
+    with transaction(db):
+        stale = [entry for path, entry in manifest.organizations.items() if path not in current]
+        delete_organization_rows([entry.row_id for entry in stale], commit=False)
+        manifest.forget("organization", [entry.relative_path for entry in stale])
+
+        # An entry without a row (after DB.reset_db) is inserted again like a new folder.
+        for path, entry in manifest.organizations.items():
+            if entry.row_id is not None:
+                symbols.add_organization(path, entry.row_id)
+
+        new_paths = [path for path in current if path not in symbols.organizations]
+        insert_organization({"organizations": [current[path] for path in new_paths]}, symbols, commit=False)
+        manifest.record("organization", [
+            ManifestEntry(relative_path=path, row_id=symbols.organizations[path])
+            for path in new_paths if path in symbols.organizations
+        ])
+    return new_paths
+
+def plan_files(tree, manifest, error_msg):
+    """
+    Compare the files on disk (their size and mtime as read by the project walk)
+    with the manifest.
+
+    Returns:
+        pending: {file_location: ManifestEntry} for files that are new or changed
+        touched: ManifestEntry list of files whose size/mtime changed but not their content
+        removed: relative paths of files in the manifest that no longer exist
+    A file is only hashed when its size or mtime differs from the manifest.
+    """
+    pending = {}
+    touched = []
+    seen = set()
+    for file_location in tree.files_bfs():
+        node = tree.files[file_location]
+        relative_path = node.relative_path
+        seen.add(relative_path)
+        previous = manifest.files.get(relative_path)
+        if (previous is not None
+                and previous.analyzer_version == ANALYZER_VERSION
+                and previous.file_size == node.size
+                and previous.file_mtime_ns == node.mtime_ns):
+            continue
+        try:
+            entry = ManifestEntry(
+                relative_path=relative_path,
+                file_size=node.size,
+                file_mtime_ns=node.mtime_ns,
+                content_hash=file_content_hash(file_location),
+                analyzer_version=ANALYZER_VERSION
+            )
+        except OSError as e:
+            error_msg.append(f"Error reading {file_location} at process_folder: {e}")
+            continue
+
+        if (previous is not None
+                and previous.analyzer_version == ANALYZER_VERSION
+                and previous.content_hash == entry.content_hash):
+            entry.row_id = previous.row_id
+            touched.append(entry)
+        else:
+            pending[file_location] = entry
+
+    removed = [relative_path for relative_path in manifest.files if relative_path not in seen]
+    return pending, touched, removed
+
+def process_folder(root_folder, project_id, workers=None, incremental=False, progress=None):
     """
     Process folders and files using BFS traversal except analyze_organization() is DFS.
-    
-    Original behavior was to list the children of the root folder and begin analysis 
-    on the next layer. In this updated version, we first analyze the root folder as
-    the first layer. Then, we populate the BFS queues with its children.
-    
+    The project is read from disk once (scan_project) and every step uses that walk.
+
+    The root folder is analyzed as the first layer, then every deeper layer in turn.
+    File analysis (parsing and AST walking) runs in a pool of worker processes when
+    more than one worker is configured; database writes always happen here, one file
+    at a time and in BFS order.
+
+    Files whose content was analyzed before, in any project, are read from the
+    analysis cache instead of being parsed again.
+
+    Every row written belongs to the project project_id. Every run keeps a manifest of
+    the files it analyzed (path, size, mtime, content hash). A full run replaces all
+    rows of the project. An incremental run only analyzes added or changed files,
+    deletes the rows of removed files and keeps the rest.
+
     Args:
         root_folder (str): Root directory path to start analysis.
+        project_id (int): Project (see get_or_create_project) the analysis belongs to.
+        workers (int): Number of analysis processes. Defaults to ANALYSIS_WORKERS.
+        incremental (bool): Only re-analyze what changed since the last run.
+        progress (callable): Called as progress(stage, files_done, files_total) as the run advances.
     """
     error_msg=[]
+    if progress is None:
+        progress = lambda stage, files_done=None, files_total=None: None
+    if workers is None:
+        workers = (current_app.config.get("ANALYSIS_WORKERS")
+                   or default_worker_count(current_app.config.get("GUNICORN_WORKERS") or 1))
+    symbols = SymbolTable(root_folder, project_id)
 
     try:
+        manifest = ProjectManifest(project_id).load()
+        # Without a manifest (first run, or rows migrated from before projects existed)
+        # nothing can be matched to files on disk, so whatever rows there are go.
+        if not incremental or not (manifest.files or manifest.organizations):
+            drop_previous_analysis(manifest)
+
+        tree = scan_project(root_folder, error_msg)
+
         # === Process the ROOT folder (first layer) ===
+        progress("organizations")
         print(f"Processing ROOT folder: {root_folder}")
+        new_organizations = []
         try:
-            analyzed_organization = analyze_organization(root_folder)
-            insert_organization(analyzed_organization)
+            new_organizations = sync_organizations(tree, manifest, symbols)
         except Exception as e:
-            error_msg.extend(f"Error processing insert_organization of folder at {root_folder} at process_folder: {e}")
+            error_msg.append(f"Error processing insert_organization of folder at {root_folder} at process_folder: {e}")
 
-        
-        # Optionally, process Python files directly under the root folder.
-        try:
-            for entry in os.listdir(root_folder):
-                if entry.startswith('.') or entry == '__pycache__':
-                    continue
-                full_path = os.path.join(root_folder, entry)
-                if os.path.isfile(full_path):
-                    error_msg.extend(process_file(full_path))
-        except PermissionError:
-            error_msg.extend(f"Permission denied accessing files in {root_folder} at process_folder")
-
-        # === Initialize the BFS queues with the children directories of the root folder ===
-        folder_queue = deque()
-        file_queue = deque()
-        try:
-            for entry in os.listdir(root_folder):
-                if entry.startswith('.') or entry == '__pycache__':
-                    continue
-                full_path = os.path.join(root_folder, entry)
-                if os.path.isdir(full_path):
-                    folder_queue.append(full_path)
-                # We already processed files in the root folder above.
-        except PermissionError:
-            error_msg.extend(f"Permission denied accessing {root_folder} at process_folder")
-
-        level = 2  # Since we already handled the first layer (root folder)
-        while folder_queue or file_queue:
-            print(f"\n--- Processing BFS Level {level} ---")
-
-            # Process all folder nodes in the current level.
-            current_level_folders = list(folder_queue)
-            folder_queue.clear()
-
-            # Process all file nodes in the current level.
-            current_level_files = list(file_queue)
-            file_queue.clear()
-
-            # Process all Python files in the current level.
-            for file_path in current_level_files:
-                error_msg.extend(process_file(file_path))
-            # For every folder in the current level, add its children for analysis.
-            for folder in current_level_folders:
-                try:
-                    for entry in os.listdir(folder):
-                        if entry.startswith('.') or entry == '__pycache__':
-                            continue
-                        full_path = os.path.join(folder, entry)
-                        if os.path.isdir(full_path):
-                            folder_queue.append(full_path)
-                        elif os.path.isfile(full_path):
-                            file_queue.append(full_path)
-                except PermissionError:
-                    error_msg.extend(f"Permission denied accessing {folder}")
-                    continue
-
-            level += 1
+        progress("planning")
+        file_locations = tree.files_bfs()
+        pending, touched, removed = plan_files(tree, manifest, error_msg)
+        print(f"Files: {len(pending)} to analyze, {len(file_locations) - len(pending)} unchanged, {len(removed)} removed")
+
+        db = get_db()
+        with transaction(db):
+            delete_component_rows([manifest.files[path].row_id for path in removed], commit=False)
+            manifest.forget("file", removed)
+            manifest.record("file", touched)
+            # Unchanged files in a folder that just became an organization join it.
+            for path in new_organizations:
+                component_ids = [
+                    entry.row_id for relative_path, entry in manifest.files.items()
+                    if entry.row_id and (os.path.dirname(relative_path) or ".") == path
+                ]
+                if path in symbols.organizations:
+                    set_components_organization(component_ids, symbols.organizations[path], commit=False)
+
+        file_locations = [file_location for file_location in file_locations if file_location in pending]
+        content_hashes = {file_location: entry.content_hash for file_location, entry in pending.items()}
+        progress("analyzing", 0, len(file_locations))
+        cache = analysis_cache()
+        cached = _prefetch_cached(file_locations, content_hashes, cache)
+        if cache is not None:
+            print(f"Analysis cache: {len(cached)} hits, {len(file_locations) - len(cached)} misses")
+        if workers > 1 and len(file_locations) - len(cached) > 1:
+            analyzed_files = _analyze_parallel(file_locations, workers, error_msg, content_hashes, cache, cached, tree)
+        else:
+            analyzed_files = _analyze_sequential(file_locations, error_msg, content_hashes, cache, cached, tree)
+
+        for files_done, (file_location, analyzed_file) in enumerate(analyzed_files, 1):
+            error_msg.extend(ingest_file(file_location, analyzed_file, symbols, manifest, pending[file_location]))
+            progress("analyzing", files_done, len(file_locations))
+        progress("analyzing", len(file_locations), len(file_locations))
 
     except Exception as e:
-        error_msg.extend(f"Error during folder processing: {e}")
+        error_msg.append(f"Error during folder processing: {e}")
 
     return error_msg
 
 if __name__ == "__main__":
     # Example usage
     project_root = "project_sample/library_management_python"
-    process_folder(project_root)
\ No newline at end of file
+    process_folder(project_root, project_id=1)
@@ -0,0 +1,364 @@
+import sys
+import os
+import shutil
+import struct
+import tarfile
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 64 * 1024
+
+# Content types (and ?archive= values) accepted as a single-archive upload.
+ARCHIVE_MIMETYPES = {
+    "application/zip": "zip",
+    "application/x-zip-compressed": "zip",
+    "application/gzip": "tar.gz",
+    "application/x-gzip": "tar.gz",
+    "application/x-compressed-tar": "tar.gz",
+}
+ARCHIVE_TYPES = ("zip", "tar.gz")
+
+class ArchiveError(ValueError):
+    """
+    The upload is not a readable archive of a supported kind.
+    """
+
+class ArchiveLimitError(ArchiveError):
+    """
+    The upload is bigger than the configured limits allow.
+    """
+
+@dataclass
+class ArchiveLimits:
+    max_archive_bytes: int        # compressed bytes read from the request
+    max_extracted_bytes: int      # decompressed bytes written, all files together
+    max_file_bytes: int           # decompressed bytes of one file
+    max_entries: int              # archive members looked at, extracted or not
+
+@dataclass
+class ArchiveEntry:
+    name: str
+    is_file: bool
+    mtime: Optional[float]
+    chunks: Iterator[bytes]
+
+def detect_archive_type(mimetype: str, requested: Optional[str] = None) -> Optional[str]:
+    """
+    "zip" or "tar.gz" if the request body is a single archive, else None.
+    """
+    if requested:
+        requested = requested.lower().lstrip(".")
+        if requested in ("tgz", "tar.gz", "gz"):
+            return "tar.gz"
+        if requested == "zip":
+            return "zip"
+        raise ArchiveError(f"Unsupported archive type: {requested}")
+    return ARCHIVE_MIMETYPES.get((mimetype or "").lower())
+
+class _LimitedReader:
+    """
+    Reads the request body, failing once more than max_bytes have arrived, and
+    allows bytes that were read ahead to be pushed back.
+    """
+    def __init__(self, stream, max_bytes: int):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self._pending = b""
+
+    def read(self, size: int = -1) -> bytes:
+        if self._pending:
+            if size < 0 or size >= len(self._pending):
+                data, self._pending = self._pending, b""
+            else:
+                data, self._pending = self._pending[:size], self._pending[size:]
+            return data
+        data = self.stream.read(CHUNK_SIZE if size < 0 else size)
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise ArchiveLimitError(f"Archive is larger than {self.max_bytes} bytes")
+        return data
+
+    def read_exact(self, size: int) -> bytes:
+        parts = []
+        while size > 0:
+            data = self.read(size)
+            if not data:
+                raise ArchiveError("Archive ends unexpectedly")
+            parts.append(data)
+            size -= len(data)
+        return b"".join(parts)
+
+    def unread(self, data: bytes):
+        self._pending = data + self._pending
+
+def _check_inflated(file_bytes: int, total_bytes: int, name: str, limits: ArchiveLimits):
+    # Skipped entries count too: decompressing them costs the same as extracting them.
+    if file_bytes > limits.max_file_bytes:
+        raise ArchiveLimitError(f"{name} is larger than {limits.max_file_bytes} bytes")
+    if total_bytes > limits.max_extracted_bytes:
+        raise ArchiveLimitError(f"Extracted files are larger than {limits.max_extracted_bytes} bytes")
+
+def _iter_tar_entries(reader: _LimitedReader, limits: ArchiveLimits) -> Iterator[ArchiveEntry]:
+    """
+    Members of a tar.gz stream. The gzip stream has to be inflated past every
+    member, extracted or not, so the declared sizes of all of them are held to the
+    per-file and total limits before any of their data is read.
+    """
+    total_bytes = 0
+    try:
+        with tarfile.open(fileobj=reader, mode="r|gz") as archive:
+            for member in archive:
+                if not member.isfile():
+                    yield ArchiveEntry(member.name, False, None, iter(()))
+                    continue
+                total_bytes += member.size
+                _check_inflated(member.size, total_bytes, member.name, limits)
+                extracted = archive.extractfile(member)
+                yield ArchiveEntry(member.name, True, member.mtime, iter(lambda: extracted.read(CHUNK_SIZE), b""))
+    except (tarfile.TarError, EOFError, zlib.error, OSError) as e:
+        raise ArchiveError(f"Invalid tar.gz archive: {e}")
+
+# Zip local file header, data descriptor and the records that follow the last entry.
+_ZIP_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_ZIP_LOCAL_SIGNATURE = 0x04034B50
+_ZIP_DESCRIPTOR_SIGNATURE = 0x08074B50
+_ZIP_END_SIGNATURES = (0x02014B50, 0x06054B50, 0x06064B50, 0x05054B50)
+_ZIP_STORED, _ZIP_DEFLATED = 0, 8
+
+def _dos_time(dos_date: int, dos_time: int) -> Optional[float]:
+    try:
+        return time.mktime((
+            (dos_date >> 9) + 1980, (dos_date >> 5) & 0xF, dos_date & 0x1F,
+            dos_time >> 11, (dos_time >> 5) & 0x3F, (dos_time & 0x1F) * 2, 0, 0, -1
+        ))
+    except (OverflowError, ValueError):
+        return None
+
+def _zip64_sizes(extra: bytes, compressed_size: int, size: int):
+    """
+    Sizes from the Zip64 extra field, for entries whose header sizes are 0xFFFFFFFF.
+    """
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, offset)
+        if header_id == 0x0001:
+            values = extra[offset + 4: offset + 4 + length]
+            position = 0
+            if size == 0xFFFFFFFF and position + 8 <= len(values):
+                size = struct.unpack_from("<Q", values, position)[0]
+                position += 8
+            if compressed_size == 0xFFFFFFFF and position + 8 <= len(values):
+                compressed_size = struct.unpack_from("<Q", values, position)[0]
+            return compressed_size, size, True
+        offset += 4 + length
+    return compressed_size, size, False
+
+def _iter_zip_entries(reader: _LimitedReader, limits: ArchiveLimits) -> Iterator[ArchiveEntry]:
+    """
+    Read a zip archive front to back from its local file headers, without the
+    central directory at the end, so it can be extracted while it is uploaded.
+    Supports stored and deflated entries, with or without data descriptors
+    (stored entries only when their size is in the local header).
+
+    An entry the consumer does not read is skipped over its compressed bytes
+    when the local header gives their number; otherwise (data descriptor) it has
+    to be inflated to find its end, and the bytes inflated, read or skipped,
+    are held to the per-file and total limits.
+    """
+    totals = {"bytes": 0}
+    while True:
+        signature_bytes = reader.read_exact(4)
+        signature = struct.unpack("<I", signature_bytes)[0]
+        if signature in _ZIP_END_SIGNATURES:
+            return
+        if signature != _ZIP_LOCAL_SIGNATURE:
+            raise ArchiveError("Invalid zip archive: unexpected record")
+
+        (_, _, flags, method, dos_time, dos_date, crc, compressed_size, size,
+         name_length, extra_length) = _ZIP_LOCAL_HEADER.unpack(signature_bytes + reader.read_exact(_ZIP_LOCAL_HEADER.size - 4))
+        raw_name = reader.read_exact(name_length)
+        extra = reader.read_exact(extra_length)
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437", errors="replace")
+        compressed_size, size, is_zip64 = _zip64_sizes(extra, compressed_size, size)
+        has_descriptor = bool(flags & 0x08)
+
+        if flags & 0x01:
+            raise ArchiveError(f"Encrypted zip entries are not supported: {name}")
+        if method not in (_ZIP_STORED, _ZIP_DEFLATED):
+            raise ArchiveError(f"Unsupported zip compression method {method}: {name}")
+        if method == _ZIP_STORED and has_descriptor:
+            raise ArchiveError(f"Stored zip entry without size cannot be streamed: {name}")
+
+        # remaining: compressed bytes of the entry not read yet (None when unknown)
+        state = {"crc": 0, "bytes": 0, "remaining": None if has_descriptor else compressed_size, "done": False}
+
+        def output(data, name=name):
+            state["crc"] = zlib.crc32(data, state["crc"])
+            state["bytes"] += len(data)
+            totals["bytes"] += len(data)
+            _check_inflated(state["bytes"], totals["bytes"], name, limits)
+            return data
+
+        def read_compressed():
+            remaining = state["remaining"]
+            data = reader.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not data:
+                raise ArchiveError("Archive ends unexpectedly")
+            if remaining is not None:
+                state["remaining"] -= len(data)
+            return data
+
+        def chunks(method=method):
+            if method == _ZIP_STORED:
+                while state["remaining"] > 0:
+                    yield output(read_compressed())
+            else:
+                decompressor = zlib.decompressobj(-15)
+                while not decompressor.eof:
+                    data = read_compressed()
+                    # Bounded output per call, so a small input cannot expand all at once.
+                    while data:
+                        inflated = decompressor.decompress(data, CHUNK_SIZE)
+                        data = decompressor.unconsumed_tail
+                        if inflated:
+                            yield output(inflated)
+                        if decompressor.eof:
+                            break
+                if decompressor.unused_data:
+                    reader.unread(decompressor.unused_data)
+            state["done"] = True
+
+        is_file = not name.endswith("/")
+        entry_chunks = chunks()
+        yield ArchiveEntry(name, is_file, _dos_time(dos_date, dos_time), entry_chunks)
+
+        # Skip whatever the consumer did not read, then check the entry.
+        try:
+            if state["remaining"] is None:
+                for _ in entry_chunks:
+                    pass
+            elif not state["done"]:
+                # With a known size the data is passed over without inflating it.
+                entry_chunks.close()
+                while state["remaining"] > 0:
+                    read_compressed()
+        except zlib.error as e:
+            raise ArchiveError(f"Invalid zip archive: {e}")
+        if has_descriptor:
+            descriptor = reader.read_exact(4)
+            if struct.unpack("<I", descriptor)[0] == _ZIP_DESCRIPTOR_SIGNATURE:
+                descriptor = reader.read_exact(4)
+            crc = struct.unpack("<I", descriptor)[0]
+            reader.read_exact(16 if is_zip64 else 8)
+        # The CRC can only be checked for data that was decompressed.
+        if state["done"] and state["crc"] != crc:
+            raise ArchiveError(f"Invalid zip archive: CRC mismatch in {name}")
+
+def secure_path_part(part: str) -> str:
+    """
+    secure_filename() for one path part, keeping leading underscores so that
+    __init__.py and _private.py keep their names.
+    """
+    name = secure_filename(part)
+    underscores = len(part) - len(part.lstrip("_"))
+    if name and underscores and not name.startswith("_"):
+        name = part[:underscores] + name
+    return name
+
+def sanitize_archive_path(name: str) -> List[str]:
+    """
+    Path parts of an archive member, each passed through secure_path_part;
+    "..", absolute prefixes and empty parts are dropped.
+    """
+    parts = [secure_path_part(part) for part in name.replace("\\", "/").split("/")]
+    return [part for part in parts if part]
+
+def extract_archive_stream(stream, archive_type: str, dest_dir: str,
+                           is_allowed: Callable[[str], bool], limits: ArchiveLimits) -> dict:
+    """
+    Extract the allowed files of an archive into dest_dir while it is read from stream.
+    Nothing is buffered beyond one chunk; each file is written as it is decompressed.
+    File mtimes are taken from the archive so unchanged files keep their mtime.
+
+    Returns counts of the files extracted, entries skipped and bytes written.
+    """
+    reader = _LimitedReader(stream, limits.max_archive_bytes)
+    entries = _iter_zip_entries(reader, limits) if archive_type == "zip" else _iter_tar_entries(reader, limits)
+    extracted_files = skipped = extracted_bytes = seen = 0
+    dest_root = os.path.realpath(dest_dir)
+
+    try:
+        for entry in entries:
+            seen += 1
+            if seen > limits.max_entries:
+                raise ArchiveLimitError(f"Archive has more than {limits.max_entries} entries")
+            parts = sanitize_archive_path(entry.name)
+            if not entry.is_file or not parts or not is_allowed(parts[-1]):
+                skipped += 1
+                continue
+
+            target = os.path.join(dest_root, *parts)
+            if not os.path.realpath(target).startswith(dest_root + os.sep):
+                skipped += 1
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            file_bytes = 0
+            with open(target, "wb") as f:
+                for chunk in entry.chunks:
+                    file_bytes += len(chunk)
+                    extracted_bytes += len(chunk)
+                    if file_bytes > limits.max_file_bytes:
+                        raise ArchiveLimitError(f"{'/'.join(parts)} is larger than {limits.max_file_bytes} bytes")
+                    if extracted_bytes > limits.max_extracted_bytes:
+                        raise ArchiveLimitError(f"Extracted files are larger than {limits.max_extracted_bytes} bytes")
+                    f.write(chunk)
+            if entry.mtime is not None:
+                try:
+                    os.utime(target, (entry.mtime, entry.mtime))
+                except (OSError, OverflowError, ValueError):
+                    pass
+            extracted_files += 1
+    except (tarfile.TarError, EOFError, zlib.error) as e:
+        raise ArchiveError(f"Invalid {archive_type} archive: {e}")
+
+    return {"files": extracted_files, "skipped": skipped, "bytes": extracted_bytes}
+
+def save_archive_upload(stream, archive_type: str, base_dir: str,
+                        is_allowed: Callable[[str], bool], limits: ArchiveLimits) -> dict:
+    """
+    Extract an uploaded archive as the project folder base_dir.
+
+    The archive is extracted into a staging folder next to base_dir, which replaces
+    base_dir only once the whole archive was read successfully; on any error the
+    staging folder is removed and the existing project is left alone. Like a folder
+    upload, a single top-level folder holding everything is dropped.
+    """
+    parent = os.path.dirname(base_dir)
+    os.makedirs(parent, exist_ok=True)
+    staging_dir = os.path.join(parent, f".{os.path.basename(base_dir)}.upload-{uuid.uuid4().hex}")
+    os.makedirs(staging_dir)
+    try:
+        result = extract_archive_stream(stream, archive_type, staging_dir, is_allowed, limits)
+
+        project_root = staging_dir
+        top_level = os.listdir(staging_dir)
+        if len(top_level) == 1 and os.path.isdir(os.path.join(staging_dir, top_level[0])):
+            project_root = os.path.join(staging_dir, top_level[0])
+
+        previous_dir = None
+        if os.path.exists(base_dir):
+            previous_dir = f"{staging_dir}.previous"
+            os.replace(base_dir, previous_dir)
+        os.replace(project_root, base_dir)
+        if previous_dir:
+            shutil.rmtree(previous_dir, ignore_errors=True)
+        return result
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
@@ -0,0 +1,201 @@
+import sys
+import os
+import shutil
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from flask import current_app
+from pymysql.constants import FIELD_TYPE
+from web_app.model.json_for_useCase import export_table_columns, export_tables, iter_table_rows
+
+try:
+    import pyarrow as pa
+except ImportError:            # the columnar export is skipped without pyarrow
+    pa = None
+
+# Low-cardinality string columns, stored as dictionary indexes into one list of distinct values.
+DICTIONARY_COLUMNS = frozenset({
+    "visibility", "scope", "variable_type", "component_type",
+    "organization_type", "return_type", "parameter_type"
+})
+COLUMNAR_DIR = "columnar"
+
+# Integer columns keep the width of their MySQL type.
+_INT_TYPES = {
+    FIELD_TYPE.TINY: "int8", FIELD_TYPE.SHORT: "int16", FIELD_TYPE.YEAR: "int16",
+    FIELD_TYPE.INT24: "int32", FIELD_TYPE.LONG: "int32", FIELD_TYPE.LONGLONG: "int64"
+}
+_FLOAT_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE}
+_TIMESTAMP_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+
+def columnar_export_dir(user_name, project_name):
+    """
+    Directory of a project's Arrow files, next to its JSON export: one <table>.arrow per table.
+    """
+    return os.path.join(current_app.config['USERS_PATH'], user_name, "Json_toAI", project_name, COLUMNAR_DIR)
+
+def arrow_type(column, field_type):
+    if column in DICTIONARY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if field_type in _INT_TYPES:
+        return pa.type_for_alias(_INT_TYPES[field_type])
+    if field_type in _FLOAT_TYPES:
+        return pa.float64()
+    if field_type in _TIMESTAMP_TYPES:
+        return pa.timestamp("us")
+    if field_type == FIELD_TYPE.DATE:
+        return pa.date32()
+    # Strings, enums and decimals; decimals are written as text like in the JSON export.
+    return pa.string()
+
+def _as_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+class _DictionaryEncoder:
+    """
+    Running dictionary of one column. Values only ever get appended, so each batch's
+    dictionary extends the previous one and the writer emits just the new values (a delta).
+    """
+    def __init__(self):
+        self._index = {}
+        self.values = []
+
+    def encode(self, column_values):
+        indices = []
+        for value in column_values:
+            value = _as_text(value)
+            if value is None:
+                indices.append(None)
+                continue
+            index = self._index.get(value)
+            if index is None:
+                index = self._index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(index)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(self.values, type=pa.string())
+        )
+
+def _record_batch(schema, encoders, rows):
+    arrays = []
+    for field, encoder, values in zip(schema, encoders, zip(*rows)):
+        if encoder is not None:
+            arrays.append(encoder.encode(values))
+        elif field.type == pa.string():
+            arrays.append(pa.array([_as_text(value) for value in values], type=pa.string()))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.record_batch(arrays, schema=schema)
+
+def _write_table(path, project_id, table, columns, field_types, batch_size):
+    schema = pa.schema([(column, arrow_type(column, field_type))
+                        for column, field_type in zip(columns, field_types)])
+    encoders = [_DictionaryEncoder() if pa.types.is_dictionary(field.type) else None for field in schema]
+    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    count = 0
+    with pa.ipc.new_file(path, schema, options=options) as writer:
+        rows = []
+        for row in iter_table_rows(project_id, table, columns, batch_size=batch_size):
+            rows.append(row)
+            if len(rows) >= batch_size:
+                writer.write_batch(_record_batch(schema, encoders, rows))
+                count += len(rows)
+                rows = []
+        if rows:
+            writer.write_batch(_record_batch(schema, encoders, rows))
+            count += len(rows)
+    return count
+
+def export_to_arrow(project_id, project_name, user_name, batch_size=8192, include_usages=False):
+    """
+    Write the project's export tables as Arrow IPC files (see columnar_export_dir),
+    alongside the JSON/TXT export and with the same tables (include_usages adds
+    variable_usages). Rows are streamed from the database in record
+    batches of batch_size; the files are written to a staging directory that
+    replaces the previous export once every table is done.
+    Returns (directory, error_msg); directory is None when pyarrow is not installed.
+    """
+    error_msg = []
+    if pa is None:
+        print("⚠️ pyarrow is not installed; skipping the columnar export.")
+        return None, error_msg
+
+    export_dir = columnar_export_dir(user_name, project_name)
+    staging_dir = f"{export_dir}.tmp"
+    try:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        for key, table, columns, field_types in export_table_columns(project_id, include_usages):
+            count = _write_table(os.path.join(staging_dir, f"{key}.arrow"),
+                                 project_id, table, columns, field_types, batch_size)
+            print(f"✅ Wrote {count} {key} rows to Arrow")
+        shutil.rmtree(export_dir, ignore_errors=True)
+        os.replace(staging_dir, export_dir)
+        print(f"Data exported in columnar form to {export_dir}")
+        return export_dir, error_msg
+    except Exception as e:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        error_msg.append(f"Error exporting to Arrow: {e}")
+        return export_dir, error_msg
+
+def is_export_key(key):
+    return key in export_tables(include_usages=True)
+
+def _arrow_path(user_name, project_name, key):
+    if pa is None:
+        raise RuntimeError("pyarrow is required to read the columnar export")
+    if not is_export_key(key):
+        raise KeyError(f"Unknown table: {key}")
+    path = os.path.join(columnar_export_dir(user_name, project_name), f"{key}.arrow")
+    return path if os.path.isfile(path) else None
+
+def read_arrow_table(user_name, project_name, key, columns=None):
+    """
+    One exported table (organizations, components, methods, method_parameters,
+    variables or variable_usages) as a pyarrow.Table, memory-mapped: only the pages of the requested
+    columns are read from disk. Returns None if the project has no such table.
+    """
+    path = _arrow_path(user_name, project_name, key)
+    if path is None:
+        return None
+    # The table's buffers keep the mapping alive after the file is closed.
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        if columns is None:
+            return reader.read_all()
+        indices = [reader.schema.get_field_index(column) for column in columns]
+        missing = [column for column, index in zip(columns, indices) if index < 0]
+        if missing:
+            raise KeyError(f"Unknown column(s) in {key}: {', '.join(missing)}")
+        batches = [reader.get_batch(i).select(indices) for i in range(reader.num_record_batches)]
+        return pa.Table.from_batches(batches, schema=pa.schema([reader.schema.field(i) for i in indices]))
+
+def table_summary(user_name, project_name, key):
+    """
+    {"table", "rows", "columns": [{"name", "type"}]} of one exported table, from the
+    file footer and batch headers only; no column data is read. None if the project
+    has no such table.
+    """
+    path = _arrow_path(user_name, project_name, key)
+    if path is None:
+        return None
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return {
+            "table": key,
+            "rows": rows,
+            "columns": [{"name": field.name, "type": str(field.type)} for field in reader.schema]
+        }
+
+def column_value_counts(user_name, project_name, key, column):
+    """
+    {value: rows} of one column, e.g. variables per scope, reading only that column.
+    """
+    table = read_arrow_table(user_name, project_name, key, [column])
+    if table is None:
+        return {}
+    counts = table.column(column).value_counts()
+    return {item["values"].as_py(): item["counts"].as_py() for item in counts}
@@ -0,0 +1,291 @@
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from flask import current_app
+from web_app.analyzer.file_analyzer import analyze_file
+from web_app.analyzer.analysis_cache import get_analysis_cache, load_analysis
+from web_app.model.manifest_model import ProjectManifest
+from web_app.model.project_model import find_project
+
+# Diagram types drawn from the analysis itself, without asking the model.
+LOCAL_DOCUMENT_TYPES = ("class diagram", "component diagram", "package diagram")
+
+_VISIBILITY_MARKS = {"public": "+", "protected": "#", "private": "-", "internal": "~"}
+_ALIAS_RE = re.compile(r"\W")
+# Files listed by name in the legend of a diagram they are missing from.
+MAX_LISTED_MISSING = 20
+
+@dataclass
+class _Class:
+    name: str
+    alias: str
+    attributes: Dict[str, str] = field(default_factory=dict)   # name -> "+ name: type"
+    methods: List[str] = field(default_factory=list)
+    bases: List[str] = field(default_factory=list)
+
+@dataclass
+class _File:
+    relative_path: str
+    package: str                     # directory relative to the project root, "" at the top
+    name: str                        # module name (file name without extension)
+    alias: str
+    classes: Dict[str, _Class] = field(default_factory=dict)
+    functions: List[str] = field(default_factory=list)
+    globals: Dict[str, str] = field(default_factory=dict)
+
+def is_local_document_type(document_type: str) -> bool:
+    return (document_type or "").strip().lower() in LOCAL_DOCUMENT_TYPES
+
+def _alias(*parts: str) -> str:
+    return _ALIAS_RE.sub("_", "__".join(parts))
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', "'") + '"'
+
+def load_project_analysis(user_name: str, project_name: str) -> Tuple[List[Tuple[str, Dict]], List[str]]:
+    """
+    ([(relative_path, file_analyzer() result)], [missing relative paths]) for the files
+    of the project's last analysis, sorted by path. Results come from the analysis
+    cache when it still has them (the manifest knows each file's content hash); other
+    files are analyzed again. Files neither cached nor uploaded any more are missing.
+    Raises ValueError if the project was never analyzed or every file is missing.
+    """
+    project_id = find_project(user_name, project_name)
+    if project_id is None:
+        raise ValueError(f"Project {project_name} has not been analyzed yet")
+    manifest = ProjectManifest(project_id).load()
+    root_folder = os.path.join(current_app.config["USERS_PATH"], user_name, "uploads", project_name)
+    cache = get_analysis_cache(
+        current_app.config.get("ANALYSIS_CACHE_DIR"),
+        current_app.config.get("ANALYSIS_CACHE_MAX_BYTES", 0)
+    )
+
+    analyzed_files, missing = [], []
+    for relative_path in sorted(manifest.files):
+        entry = manifest.files[relative_path]
+        file_location = os.path.join(root_folder, relative_path)
+        analyzed_file = None
+        if cache is not None and entry.content_hash:
+            analyzed_file = load_analysis(cache, entry.content_hash, file_location)
+        if analyzed_file is None:
+            if not os.path.isfile(file_location):
+                missing.append(relative_path)
+                continue
+            analyzed_file = analyze_file(file_location)
+        analyzed_files.append((relative_path, analyzed_file))
+    if missing:
+        print(f"⚠️ {len(missing)} files of {project_name} are in the manifest but no longer uploaded: "
+              f"{', '.join(missing[:MAX_LISTED_MISSING])}")
+    if not analyzed_files:
+        if missing:
+            raise ValueError(f"The files of project {project_name} are no longer uploaded; analyze it again")
+        raise ValueError(f"Project {project_name} has no analyzed files")
+    return analyzed_files, missing
+
+def _method_signature(method: Dict) -> str:
+    parameters = []
+    for parameter in method.get("parameters", []):
+        text = parameter["parameter_name"]
+        if parameter.get("parameter_type") and parameter["parameter_type"] != "Any":
+            text += f": {parameter['parameter_type']}"
+        if parameter.get("default_value") is not None:
+            text += f" = {parameter['default_value']}"
+        parameters.append(text)
+    parts = [_VISIBILITY_MARKS.get(method.get("visibility"), "+")]
+    if method.get("is_static"):
+        parts.append("{static}")
+    signature = f"{method['method_name']}({', '.join(parameters)})"
+    if method.get("return_type") and method["return_type"] != "Any":
+        signature += f": {method['return_type']}"
+    parts.append(signature)
+    return " ".join(parts)
+
+def _visibility(name: str) -> str:
+    if name.startswith("__") and not name.endswith("__"):
+        return "private"
+    return "protected" if name.startswith("_") else "public"
+
+def _attribute(name: str, variable: Dict) -> str:
+    parts = [_VISIBILITY_MARKS.get(variable.get("visibility") or _visibility(name), "+")]
+    if variable.get("is_static") or variable.get("declaration_type") == "class_attribute":
+        parts.append("{static}")
+    text = name
+    if variable.get("variable_type") and variable["variable_type"] not in ("Any", "unknown"):
+        text += f": {variable['variable_type']}"
+    parts.append(text)
+    return " ".join(parts)
+
+def build_project_model(analyzed_files: List[Tuple[str, Dict]]) -> List[_File]:
+    """
+    Files with their classes (attributes, methods, base names), module functions and
+    module variables, in the order of analyzed_files.
+    """
+    files = []
+    for relative_path, analyzed_file in analyzed_files:
+        relative_path = relative_path.replace(os.sep, "/")
+        package, file_name = os.path.split(relative_path)
+        stem = os.path.splitext(file_name)[0]
+        source = _File(relative_path, package, stem, _alias("f", os.path.splitext(relative_path)[0]))
+        component_result = analyzed_file.get("component", {})
+        for cls in component_result.get("classes", []):
+            source.classes.setdefault(cls["name"], _Class(cls["name"], _alias("c", source.alias, cls["name"])))
+        for dependency in component_result.get("dependencies", []):
+            cls = source.classes.get(dependency["source_component"])
+            if cls is not None and dependency["target_component"] not in cls.bases:
+                cls.bases.append(dependency["target_component"])
+
+        for method in analyzed_file.get("method", {}).get("methods", []):
+            signature = _method_signature(method)
+            owner = source.classes.get(method.get("location"))
+            methods = owner.methods if owner is not None else source.functions
+            if signature not in methods:
+                methods.append(signature)
+
+        for variable in analyzed_file.get("variable", {}).get("variables", []):
+            name = variable["variable_name"]
+            declaration_type = variable.get("declaration_type")
+            owner = source.classes.get(variable.get("component_name"))
+            if owner is not None and declaration_type == "class_attribute":
+                owner.attributes.setdefault(name, _attribute(name, variable))
+            elif owner is not None and declaration_type == "assignment" and name.startswith("self."):
+                # Instance attributes are the self.<name> assignments of the class's methods.
+                attribute = name[len("self."):]
+                if "." not in attribute:
+                    owner.attributes.setdefault(attribute, _attribute(attribute, {**variable, "is_static": False}))
+            elif (owner is None and declaration_type == "assignment" and not variable.get("method_name")
+                    and variable.get("scope") == "global" and "." not in name):
+                source.globals.setdefault(name, _attribute(name, variable))
+        files.append(source)
+    return files
+
+def _resolve_bases(files: List[_File]) -> List[Tuple[_File, _Class, _File, _Class]]:
+    """
+    (file, class, base file, base class) for every base that is a class of the project:
+    a class of the same file first, otherwise the only project class of that name.
+    Bases from libraries, or names defined in several files, are left out.
+    """
+    by_name: Dict[str, List[Tuple[_File, _Class]]] = {}
+    for source in files:
+        for cls in source.classes.values():
+            by_name.setdefault(cls.name, []).append((source, cls))
+    inheritance = []
+    for source in files:
+        for cls in source.classes.values():
+            for base_name in cls.bases:
+                if base_name in source.classes and base_name != cls.name:
+                    inheritance.append((source, cls, source, source.classes[base_name]))
+                elif len(by_name.get(base_name, [])) == 1 and base_name not in source.classes:
+                    base_file, base_cls = by_name[base_name][0]
+                    inheritance.append((source, cls, base_file, base_cls))
+    return inheritance
+
+def _package_tree(packages) -> Dict:
+    tree = {}
+    for package in packages:
+        node = tree
+        for part in filter(None, package.split("/")):
+            node = node.setdefault(part, {})
+    return tree
+
+def _write_packages(lines: List[str], tree: Dict, contents: Dict[str, List[str]], path: str = "", indent: str = ""):
+    """
+    Nested package blocks of tree, each holding the lines contents has for its path.
+    """
+    for name in sorted(tree):
+        package = f"{path}/{name}" if path else name
+        lines.append(f"{indent}package {_quote(name)} as {_alias('p', package)} {{")
+        for line in contents.get(package, []):
+            lines.append(f"{indent}  {line}")
+        _write_packages(lines, tree[name], contents, package, indent + "  ")
+        lines.append(f"{indent}}}")
+
+def _diagram(title: str, body: List[str], header: Optional[List[str]] = None) -> str:
+    return "\n".join(["@startuml", f"title {title}", *(header or []), *body, "@enduml"]) + "\n"
+
+def class_diagram(files: List[_File], title: str) -> str:
+    contents: Dict[str, List[str]] = {}
+    for source in files:
+        lines = contents.setdefault(source.package, [])
+        for cls in source.classes.values():
+            lines.append(f"class {_quote(cls.name)} as {cls.alias} {{")
+            lines.extend(f"  {attribute}" for attribute in cls.attributes.values())
+            lines.extend(f"  {method}" for method in cls.methods)
+            lines.append("}")
+        if source.functions or source.globals:
+            lines.append(f"class {_quote(source.name)} as {source.alias} <<module>> {{")
+            lines.extend(f"  {variable}" for variable in source.globals.values())
+            lines.extend(f"  {function}" for function in source.functions)
+            lines.append("}")
+
+    body = list(contents.pop("", []))
+    _write_packages(body, _package_tree(contents), contents)
+    for _, cls, _, base in _resolve_bases(files):
+        body.append(f"{base.alias} <|-- {cls.alias}")
+    return _diagram(title, body, ["hide empty members", "skinparam classAttributeIconSize 0"])
+
+def component_diagram(files: List[_File], title: str) -> str:
+    contents: Dict[str, List[str]] = {}
+    for source in files:
+        contents.setdefault(source.package, []).append(f"component {_quote(source.name)} as {source.alias}")
+
+    body = list(contents.pop("", []))
+    _write_packages(body, _package_tree(contents), contents)
+    edges = []
+    for source, _, base_file, _ in _resolve_bases(files):
+        edge = f"{source.alias} ..> {base_file.alias} : extends"
+        if base_file is not source and edge not in edges:
+            edges.append(edge)
+    return _diagram(title, body + edges)
+
+def package_diagram(files: List[_File], title: str, project_root_name: str = "(root)") -> str:
+    packages = sorted({source.package for source in files if source.package})
+    body = []
+    if any(not source.package for source in files):
+        # Files at the top of the project.
+        body.extend([f"package {_quote(project_root_name)} as {_alias('p', '')} {{", "}"])
+    _write_packages(body, _package_tree(packages), {})
+    edges = []
+    for source, _, base_file, _ in _resolve_bases(files):
+        edge = f"{_alias('p', source.package)} ..> {_alias('p', base_file.package)}"
+        if source.package != base_file.package and edge not in edges:
+            edges.append(edge)
+    return _diagram(title, body + edges)
+
+_GENERATORS = {
+    "class diagram": class_diagram,
+    "component diagram": component_diagram,
+    "package diagram": package_diagram,
+}
+
+def load_project_model(user_name: str, project_name: str) -> Tuple[List[_File], List[str]]:
+    """
+    (build_project_model() of the project's analysis, relative paths of its missing files).
+    """
+    analyzed_files, missing = load_project_analysis(user_name, project_name)
+    return build_project_model(analyzed_files), missing
+
+def _missing_legend(plantuml: str, missing: List[str]) -> str:
+    lines = ["legend bottom left", f"Left out, no longer uploaded: {len(missing)} files"]
+    lines.extend(missing[:MAX_LISTED_MISSING])
+    if len(missing) > MAX_LISTED_MISSING:
+        lines.append(f"and {len(missing) - MAX_LISTED_MISSING} more")
+    lines.append("endlegend")
+    body, end = plantuml.rsplit("@enduml", 1)
+    return body + "\n".join(lines) + "\n@enduml" + end
+
+def generate_local_plantuml(document_type: str, user_name: str, project_name: str,
+                            model: Optional[Tuple[List[_File], List[str]]] = None) -> str:
+    """
+    PlantUML for a class, component or package diagram of the project, built from
+    its analysis rather than by the model. The same analysis always gives the same
+    diagram, so its render is served from the render cache after the first time.
+    Files that could not be included are listed in a legend of the diagram.
+    model is the load_project_model() of the project, when the caller already has it.
+    """
+    generator = _GENERATORS[document_type.strip().lower()]
+    files, missing = model if model is not None else load_project_model(user_name, project_name)
+    plantuml = generator(files, f"{document_type.strip().title()} of {project_name}")
+    return _missing_legend(plantuml, missing) if missing else plantuml
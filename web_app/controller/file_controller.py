@@ -3,12 +3,22 @@ import os
 from pathlib import Path
 from typing import Dict, Optional,Union
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-from flask import current_app,jsonify
-from model.json_for_useCase import prepare_json
+from flask import current_app,jsonify,request,send_file
+from model.json_for_useCase import prepare_json, export_table_columns, iter_table_rows
+from web_app.model.project_model import find_project, delete_project_rows
+from web_app.controller.llm_encoder import count_tokens
 import json
+import zlib
+import hashlib
+import tempfile
+from contextlib import ExitStack
 from datetime import datetime
 import shutil
 from werkzeug.utils import secure_filename
+try:
+    import brotli
+except ImportError:            # only the gzip copy is written without the Brotli package
+    brotli = None
 def safe_rm_tree(path: Path) -> bool:
     """
     Recursively delete *path* if it exists and is inside its expected parent.
@@ -25,61 +35,220 @@ def safe_rm_tree(path: Path) -> bool:
     shutil.rmtree(path)
     return True
 
-def export_to_json(data, project_name,user_name):
+class CustomJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return str(obj)
+
+# Content-Encoding and file suffix of the pre-compressed copies of an export, best first.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+class _ExportWriter:
+    """
+    Writes the same text to the .json file and, with every double quote removed,
+    to the .txt file. Pieces are gathered and written out every `buffer_size` characters.
+    The JSON bytes are also hashed (for the ETag) and fed to the compressors of the
+    pre-compressed copies, and the tokens of the .txt text are counted (per flushed
+    chunk, so a token split by a chunk edge may count twice).
+    """
+    def __init__(self, json_file, text_file, compressed=(), buffer_size=1 << 16):
+        self.json_file = json_file
+        self.text_file = text_file
+        self.compressed = compressed            # (file, compress(bytes), finish())
+        self.buffer_size = buffer_size
+        self.digest = hashlib.sha256()
+        self.text_tokens = 0
+        self._pieces = []
+        self._size = 0
+
+    def write(self, piece):
+        self._pieces.append(piece)
+        self._size += len(piece)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        chunk = "".join(self._pieces)
+        self._pieces, self._size = [], 0
+        data = chunk.encode('utf-8')
+        self.json_file.write(data)
+        self.digest.update(data)
+        for file, compress, _ in self.compressed:
+            file.write(compress(data))
+        text = chunk.replace('"', '')
+        self.text_file.write(text)
+        self.text_tokens += count_tokens(text)
+
+    def close(self):
+        self.flush()
+        for file, _, finish in self.compressed:
+            file.write(finish())
+
+def _compressor(encoding):
+    """
+    (compress, finish) for a Content-Encoding, or None if it cannot be produced here.
+    """
+    if encoding == "gzip":
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)     # wbits 31: gzip container
+        return compressor.compress, compressor.flush
+    if encoding == "br" and brotli is not None:
+        compressor = brotli.Compressor(quality=9)
+        return compressor.process, compressor.finish
+    return None
+
+def export_to_json(project_id, project_name, user_name, include_usages=False):
+    """
+    Export one project's use-case data to {project}.json and {project}.txt (the JSON
+    without double quotes) in a single pass over the database. Variable usages are
+    only exported with include_usages; the export is what the model is sent.
+
+    Every table is streamed row by row from a server-side cursor and written to both
+    files as it arrives, so memory use does not grow with the size of the project.
+    The same pass writes gzip/brotli copies of the JSON and its SHA-256 (the
+    {project}.json.etag file) for /results, and the token count of the .txt (the
+    {project}.txt.tokens file) that /get_uml compares its prompt with.
+    All files are written under temporary names and renamed once complete.
+    """
     error_msg=[]
     project_export_dir=f"{current_app.config['USERS_PATH']}/{user_name}/Json_toAI/{project_name}"
     if not os.path.exists(project_export_dir):
         os.makedirs(project_export_dir)
         print(f"Created directory: {project_export_dir}")
 
-    # Build filenames using the attempt count.
     json_filename = os.path.join(project_export_dir, f"{project_name}.json")
     text_filename = os.path.join(project_export_dir, f"{project_name}.txt")
-
-    class CustomJSONEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            return str(obj)
-
-    structured_data = {
-        "metadata": {
-            "project_name": project_name,
-            "export_timestamp": datetime.now().isoformat()
-        },
-        "schemas": {},
-        "data": {}
+    compressors = {encoding: _compressor(encoding) for encoding, _ in PRECOMPRESSED}
+    sidecars = [f"{json_filename}{suffix}" for encoding, suffix in PRECOMPRESSED if compressors[encoding]]
+    sidecars.append(f"{json_filename}.etag")
+    sidecars.append(f"{text_filename}.tokens")
+    tmp_paths = {path: f"{path}.tmp" for path in [json_filename, text_filename] + sidecars}
+
+    # Same layout as json.dumps(structured_data, separators=(',', ':')) of the whole export.
+    encode = CustomJSONEncoder(separators=(',', ':')).encode
+    metadata = {
+        "project_name": project_name,
+        "export_timestamp": datetime.now().isoformat()
     }
 
-    for table_name, records in data.items():
-        if records:
-            schema = list(records[0].keys())
-            structured_data["schemas"][table_name] = schema
-            structured_data["data"][table_name] = [
-                [record[field] for field in schema]
-                for record in records
-            ]
-
     try:
-        # Serialize JSON data as a compact string (without extra whitespace)
-        serialized_data = json.dumps(structured_data, cls=CustomJSONEncoder, separators=(',', ':'))
-        
-        # Write the JSON file
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            f.write(serialized_data)
+        tables = export_table_columns(project_id, include_usages)
+        with ExitStack() as files:
+            json_file = files.enter_context(open(tmp_paths[json_filename], 'wb'))
+            text_file = files.enter_context(open(tmp_paths[text_filename], 'w', encoding='utf-8'))
+            compressed = [
+                (files.enter_context(open(tmp_paths[f"{json_filename}{suffix}"], 'wb')), *compressors[encoding])
+                for encoding, suffix in PRECOMPRESSED if compressors[encoding]
+            ]
+            out = _ExportWriter(json_file, text_file, compressed)
+            out.write('{"metadata":' + encode(metadata))
+            out.write(',"schemas":' + encode({key: columns for key, _, columns, _ in tables}))
+            out.write(',"data":{')
+            for index, (key, table, columns, _) in enumerate(tables):
+                out.write((',' if index else '') + encode(key) + ':[')
+                count = 0
+                for row in iter_table_rows(project_id, table, columns):
+                    out.write((',' if count else '') + encode(row))
+                    count += 1
+                out.write(']')
+                print(f"✅ Exported {count} records from {table}")
+            out.write('}}')
+            out.close()
+        with open(tmp_paths[f"{json_filename}.etag"], 'w', encoding='utf-8') as f:
+            f.write(out.digest.hexdigest())
+        with open(tmp_paths[f"{text_filename}.tokens"], 'w', encoding='utf-8') as f:
+            f.write(str(out.text_tokens))
+
+        # Sidecars carry the JSON's mtime, which is how /results tells they belong to it.
+        json_mtime = os.stat(tmp_paths[json_filename]).st_mtime_ns
+        for path in sidecars:
+            os.utime(tmp_paths[path], ns=(json_mtime, json_mtime))
+            os.replace(tmp_paths[path], path)
+        os.replace(tmp_paths[json_filename], json_filename)
         print(f"Data exported successfully to {json_filename}")
-
-        # Create a text file version by stripping out all double quotes.
-        text_data = serialized_data.replace('"', '')
-        with open(text_filename, 'w', encoding='utf-8') as f:
-            f.write(text_data)
+        os.replace(tmp_paths[text_filename], text_filename)
         print(f"Data exported in text form to {text_filename}")
 
         return json_filename,error_msg
     except Exception as e:
-        error_msg.extend(f"Error exporting to JSON/text: {e}")
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        error_msg.append(f"Error exporting to JSON/text: {e}")
         return json_filename,error_msg
-    
+
+def _is_sidecar_of(path, json_mtime):
+    try:
+        return os.stat(path).st_mtime_ns == json_mtime
+    except OSError:
+        return False
+
+def export_digest(json_filename, json_mtime):
+    """
+    SHA-256 of an exported .json, from its .etag file; recomputed (and the file
+    rewritten) when the .etag is missing or from another export.
+    """
+    etag_path = f"{json_filename}.etag"
+    if _is_sidecar_of(etag_path, json_mtime):
+        with open(etag_path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    digest = hashlib.sha256()
+    with open(json_filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(json_filename), prefix=".etag-")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(digest.hexdigest())
+    os.utime(tmp_path, ns=(json_mtime, json_mtime))
+    os.replace(tmp_path, etag_path)
+    return digest.hexdigest()
+
+def export_txt_tokens(json_filename):
+    """
+    Tokens of the .txt export written with json_filename, from its .tokens file;
+    None when that file is missing or from another export (it is not recounted).
+    """
+    tokens_path = f"{os.path.splitext(json_filename)[0]}.txt.tokens"
+    try:
+        if not _is_sidecar_of(tokens_path, os.stat(json_filename).st_mtime_ns):
+            return None
+        with open(tokens_path, 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def export_response(json_filename):
+    """
+    Response serving an exported .json exactly as stored: strong ETag from its hash,
+    304 when If-None-Match matches, and the pre-compressed copy in the best
+    Content-Encoding the client accepts.
+    """
+    try:
+        json_mtime = os.stat(json_filename).st_mtime_ns
+    except OSError:
+        return jsonify({"error": "No exported JSON found for this project. Run the analysis first."}), 404
+
+    path, encoding = json_filename, None
+    best_quality = 0
+    for name, suffix in PRECOMPRESSED:
+        quality = request.accept_encodings[name]
+        if quality > best_quality and _is_sidecar_of(f"{json_filename}{suffix}", json_mtime):
+            path, encoding, best_quality = f"{json_filename}{suffix}", name, quality
+
+    digest = export_digest(json_filename, json_mtime)
+    # Each encoding is its own representation, so it gets its own strong ETag.
+    etag = digest if encoding is None else f"{digest}-{encoding}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = send_file(path, mimetype="application/json", conditional=False, etag=False)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
 def is_ProjectExist(project_name):
     if os.path.exists(f"{current_app.config['USERS_PATH']}/{current_app.config['user_name']}/uploads/{project_name}"):
         return True
@@ -141,12 +310,14 @@ def clear_user_repository(project_name: str) -> Dict[str, Union[bool, str]]:
     Delete the *project_name* directory from both
         •  …/<user>/uploads/<project_name>
         •  …/<user>/Json_toAI/<project_name>
+    and the project's rows in the database (other projects are untouched).
 
     Returns a dict with per-location status:
 
         {
           "uploads"  : True|False|"<error msg>",
-          "Json_toAI": True|False|"<error msg>"
+          "Json_toAI": True|False|"<error msg>",
+          "database" : True|False|"<error msg>"
         }
     """
     if not project_name:
@@ -169,10 +340,45 @@ def clear_user_repository(project_name: str) -> Dict[str, Union[bool, str]]:
         except Exception as exc:
             # capture the error string so the caller can inspect it
             result[label] = f"error: {exc}"
-    db=current_app.config["db"]
-    db.reset_db()
 
+    try:
+        project_id = find_project(user_name, safe_name)
+        if project_id is not None:
+            delete_project_rows(project_id, delete_project=True)
+        result["database"] = project_id is not None
+    except Exception as exc:
+        result["database"] = f"error: {exc}"
+
+    return result
+
+def reset_project(project_name: str, remove_exports: bool) -> Dict[str, Union[bool, str]]:
+    """
+    Delete the analysis rows and manifest of one of the logged-in user's projects,
+    so its next analysis starts from scratch; other users and projects are untouched.
+    The uploads stay; with remove_exports, …/<user>/Json_toAI/<project_name> is deleted too.
+
+    Returns {"database": True|False|"<error msg>"} (and "Json_toAI" with remove_exports).
+    """
+    safe_name = secure_filename(project_name)
+    user_name = current_app.config["user_name"]
+    result: Dict[str, Union[bool, str]] = {}
+
+    if remove_exports:
+        json_dir = Path(current_app.config["USERS_PATH"]) / user_name / "Json_toAI" / safe_name
+        try:
+            result["Json_toAI"] = safe_rm_tree(json_dir)
+        except Exception as exc:
+            result["Json_toAI"] = f"error: {exc}"
+
+    try:
+        project_id = find_project(user_name, safe_name)
+        if project_id is not None:
+            delete_project_rows(project_id)
+        result["database"] = project_id is not None
+    except Exception as exc:
+        result["database"] = f"error: {exc}"
     return result
+
 #This is for self testing
 def print_data(data):
     if data is None:
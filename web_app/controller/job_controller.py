@@ -0,0 +1,224 @@
+import sys
+import os
+import re
+import json
+import time
+import uuid
+import tempfile
+import threading
+import traceback
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.controller.analyzer_controller import process_folder
+from web_app.controller.file_controller import export_to_json
+from web_app.controller.columnar_controller import export_to_arrow
+from web_app.model.project_model import get_or_create_project
+
+# Jobs of this gunicorn worker run one after another (or ANALYSIS_JOBS at a time) in the background.
+_job_executor = None
+_job_executor_lock = threading.Lock()
+_job_stores = {}
+
+FINISHED_STATES = ("done", "failed")
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+class JobStore:
+    """
+    Job states as small JSON files, one per job.
+    Every gunicorn worker can read them, so a progress request does not have to
+    reach the worker that runs the job.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, job_id: str) -> str:
+        if not _JOB_ID_RE.match(job_id or ""):
+            raise ValueError(f"Invalid job id: {job_id}")
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def save(self, state: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path(state["job_id"]))
+
+    def load(self, job_id: str):
+        try:
+            with open(self.path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def cleanup(self, max_age: float = 24 * 3600):
+        """
+        Delete job files not updated for max_age seconds.
+        """
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                if now - entry.stat().st_mtime > max_age:
+                    os.unlink(entry.path)
+            except OSError:
+                continue
+
+class AnalysisJob:
+    """
+    State of one /analyse_folder run: status (queued, running, done, failed),
+    current stage, files done out of files total, and the final message and errors.
+    Changes are written to the JobStore; file progress at most every min_interval seconds.
+    """
+    def __init__(self, store: JobStore, user_name: str, project_name: str, min_interval: float = 0.25):
+        self.store = store
+        self.min_interval = min_interval
+        self._last_save = 0.0
+        now = time.time()
+        self.state = {
+            "job_id": uuid.uuid4().hex,
+            "user_name": user_name,
+            "project_name": project_name,
+            "status": "queued",
+            "stage": "queued",
+            "files_done": 0,
+            "files_total": 0,
+            "message": "",
+            "errors": [],
+            "created_at": now,
+            "updated_at": now
+        }
+        self.save()
+
+    @property
+    def job_id(self):
+        return self.state["job_id"]
+
+    def save(self):
+        self.state["updated_at"] = time.time()
+        self.store.save(self.state)
+        self._last_save = time.monotonic()
+
+    def update(self, **changes):
+        stage_changed = any(
+            key in changes and changes[key] != self.state[key] for key in ("status", "stage")
+        )
+        self.state.update(changes)
+        if stage_changed or time.monotonic() - self._last_save >= self.min_interval:
+            self.save()
+
+    def progress(self, stage, files_done=None, files_total=None):
+        """
+        Progress callback handed to process_folder().
+        """
+        changes = {"stage": stage}
+        if files_done is not None:
+            changes["files_done"] = files_done
+        if files_total is not None:
+            changes["files_total"] = files_total
+        self.update(**changes)
+
+def get_job_store(app) -> JobStore:
+    directory = app.config["JOBS_DIR"]
+    with _job_executor_lock:
+        if directory not in _job_stores:
+            _job_stores[directory] = JobStore(directory)
+        return _job_stores[directory]
+
+def get_job_executor(max_jobs: int):
+    global _job_executor
+    with _job_executor_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="analysis-job")
+        return _job_executor
+
+def run_analysis_job(app, job: AnalysisJob, folder_path: str, incremental: bool,
+                     include_usages: bool = False):
+    """
+    The /analyse_folder pipeline, run in the background in its own app context
+    (and so with its own pooled DB connection):
+      1. Process the folder (analyze files/folders and ingest data into MySQL).
+      2. Stream the use-case data from the database into the JSON and TXT exports
+         (with the variable usages when include_usages is set).
+      3. Write the same tables as Arrow files for columnar reads.
+    """
+    error_messages = []
+    project_name = job.state["project_name"]
+    with app.app_context():
+        try:
+            job.update(status="running", stage="starting")
+            print(f"✅ Starting analysis on folder: {folder_path}")
+
+            # STEP 1: Process the folder and capture any error messages.
+            project_id = get_or_create_project(job.state["user_name"], project_name)
+            folder_errors = process_folder(folder_path, project_id, incremental=incremental, progress=job.progress)
+            if folder_errors:
+                error_messages.extend(folder_errors)
+            else:
+                print("✅ Folder processing completed with no errors.")
+
+            # STEP 2: Export the use-case data to JSON and TXT files.
+            job.update(stage="exporting")
+            export_result, json_error = export_to_json(project_id, project_name, job.state["user_name"],
+                                                     include_usages)
+            if json_error:
+                error_messages.extend(json_error)
+                job.update(status="failed", stage="exporting",
+                           message="Operation completed with some errors.", errors=error_messages)
+                return
+            print(f"✅ Data exported successfully to file: {export_result}")
+
+            # STEP 3: Columnar copy of the export; the JSON/TXT files stay usable without it.
+            _, arrow_error = export_to_arrow(project_id, project_name, job.state["user_name"],
+                                             include_usages=include_usages)
+            error_messages.extend(arrow_error)
+
+            if error_messages:
+                message = ("Operation completed but some errors occur when analyzing folders. "
+                           "It may affect the result of diagrams")
+            else:
+                message = "✅ Analysis complete!"
+            job.update(status="done", stage="done", message=message, errors=error_messages)
+        except Exception as e:
+            error_messages.append(f"{e}\n{traceback.format_exc()}")
+            job.update(status="failed", message=str(e), errors=error_messages)
+
+def submit_analysis_job(app, user_name: str, project_name: str,
+                        folder_path: str, incremental: bool,
+                        include_usages: Optional[bool] = None) -> AnalysisJob:
+    """
+    Queue the analysis of folder_path and return its job right away.
+    include_usages defaults to the app's EXPORT_VARIABLE_USAGES.
+    """
+    if include_usages is None:
+        include_usages = app.config.get("EXPORT_VARIABLE_USAGES", False)
+    store = get_job_store(app)
+    store.cleanup()
+    job = AnalysisJob(store, user_name, project_name)
+    executor = get_job_executor(app.config.get("ANALYSIS_JOBS") or 1)
+    executor.submit(run_analysis_job, app, job, folder_path, incremental, include_usages)
+    return job
+
+def stream_job_events(store: JobStore, job_id: str, poll_interval: float = 0.5, heartbeat: float = 15.0):
+    """
+    Server-Sent Events for a job: one "progress" event whenever its state changes,
+    then a final "done" or "failed" event. A comment line is sent every `heartbeat`
+    seconds so proxies keep the connection open.
+    """
+    last = None
+    last_sent = time.monotonic()
+    while True:
+        state = store.load(job_id)
+        if state is None:
+            yield f"event: failed\ndata: {json.dumps({'job_id': job_id, 'message': 'Unknown job'})}\n\n"
+            return
+        if state != last:
+            event = state["status"] if state["status"] in FINISHED_STATES else "progress"
+            yield f"event: {event}\ndata: {json.dumps(state)}\n\n"
+            last = state
+            last_sent = time.monotonic()
+            if event in FINISHED_STATES:
+                return
+        elif time.monotonic() - last_sent >= heartbeat:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        time.sleep(poll_interval)
@@ -0,0 +1,261 @@
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from config.external_ai_config import (
+    get_prompt, get_partial_prompt, get_openai, get_async_openai, PROMPT_VERSION
+)
+from web_app.cache.disk_cache import DiskCache
+
+UML_MODEL = "o3-mini"
+UML_SYSTEM_MESSAGE = (
+    "You are an expert in generating optimized PlantUML diagrams. "
+    "Return ONLY valid PlantUML code wrapped in @startuml/@enduml. "
+    "No comments, no explanations."
+)
+_END_RE = re.compile(r"@enduml", re.IGNORECASE)
+
+_llm_caches = {}
+_llm_caches_lock = threading.Lock()
+
+class LLMResponseCache:
+    """
+    Model replies on disk (a DiskCache shared by every worker), with counters of
+    this process: hits, misses, regenerations and the model time the hits saved.
+    Each entry keeps how long the original call took, which is what a hit saves.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.store = DiskCache(directory, max_bytes, suffix=".json")
+        self.regenerated = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        data = self.store.get(key)
+        if data is None:
+            return None
+        try:
+            entry = json.loads(data)
+        except ValueError:
+            return None
+        with self._lock:
+            self.saved_seconds += entry.get("latency", 0.0)
+        return entry
+
+    def put(self, key: str, reply: str, latency: float, regenerated: bool = False):
+        entry = {"reply": reply, "latency": round(latency, 3), "created_at": time.time()}
+        if regenerated:
+            with self._lock:
+                self.regenerated += 1
+        try:
+            self.store.put(key, json.dumps(entry).encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️ Could not cache LLM reply {key}: {e}")
+
+    def stats(self) -> Dict:
+        stats = self.store.stats()
+        with self._lock:
+            stats.update({
+                "pid": os.getpid(),
+                "regenerated": self.regenerated,
+                "saved_seconds": round(self.saved_seconds, 1)
+            })
+        return stats
+
+def get_llm_cache(app) -> Optional[LLMResponseCache]:
+    """
+    The reply cache of this process, or None when disabled (no LLM_CACHE_DIR)
+    or its directory cannot be created.
+    """
+    directory = app.config.get("LLM_CACHE_DIR")
+    max_bytes = app.config.get("LLM_CACHE_MAX_BYTES") or 0
+    if not directory or max_bytes <= 0:
+        return None
+    with _llm_caches_lock:
+        cache = _llm_caches.get(directory)
+        if cache is None:
+            try:
+                cache = LLMResponseCache(directory, max_bytes)
+            except OSError as e:
+                print(f"⚠️ LLM cache disabled, cannot use {directory}: {e}")
+                return None
+            _llm_caches[directory] = cache
+        return cache
+
+def llm_cache_key(document_type: str, exported_text: str, model: str = UML_MODEL,
+                  system_message: str = UML_SYSTEM_MESSAGE, part: Optional[str] = None) -> str:
+    """
+    Everything that decides the reply: the export (by hash), the diagram type, the
+    model, the prompt template version and the system message; for map-reduce
+    generation also which part ("2/5") the text is.
+    """
+    text_hash = hashlib.sha256(exported_text.encode("utf-8")).hexdigest()
+    parts = [PROMPT_VERSION, model, system_message, document_type.strip(), text_hash]
+    if part:
+        parts.append(part)
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+def ask_for_plantuml(app, document_type: str, exported_text: str,
+                     regenerate: bool = False) -> Tuple[str, Dict]:
+    """
+    The model's PlantUML reply for exported_text and document_type, plus
+    {"cached", "latency", "saved_seconds"} about where it came from.
+    A reply cached for the same export, diagram type and prompt is returned without
+    calling the model unless regenerate is set; then the model is asked again and
+    its new reply replaces the cached one.
+    """
+    cache = get_llm_cache(app)
+    key = llm_cache_key(document_type, exported_text)
+    if cache is not None and not regenerate:
+        entry = cache.get(key)
+        if entry is not None:
+            stats = cache.stats()
+            print(f"[llm_controller] cache hit {key[:12]}: saved {entry['latency']}s "
+                  f"(hit rate {stats['hit_rate']}, {stats['saved_seconds']}s saved by this worker)")
+            return entry["reply"], {"cached": True, "latency": 0.0, "saved_seconds": entry["latency"]}
+
+    started = time.monotonic()
+    response = get_openai().chat.completions.create(
+        model=UML_MODEL,
+        max_completion_tokens=10_000,
+        messages=[
+            {"role": "system", "content": UML_SYSTEM_MESSAGE},
+            {"role": "user", "content": get_prompt(document_type, exported_text)},
+        ],
+    )
+    latency = time.monotonic() - started
+    reply = response.choices[0].message.content.strip()
+    if cache is not None:
+        cache.put(key, reply, latency, regenerated=regenerate)
+    return reply, {"cached": False, "latency": round(latency, 3), "saved_seconds": 0.0}
+
+def ask_for_plantuml_parts(app, document_type: str, chunk_texts: List[str],
+                           regenerate: bool = False) -> Tuple[List[str], Dict]:
+    """
+    Map step of map-reduce generation: one partial PlantUML reply per chunk, plus
+    {"cached", "parts", "cached_parts", "latency", "slowest_part", "saved_seconds"}.
+    Cached parts are reused (unless regenerate); the rest are requested concurrently,
+    at most LLM_MAX_CONCURRENCY at a time, so the wall-clock time follows the
+    slowest part rather than the sum of all of them.
+    """
+    cache = get_llm_cache(app)
+    total = len(chunk_texts)
+    keys = [llm_cache_key(document_type, text, part=f"{index + 1}/{total}")
+            for index, text in enumerate(chunk_texts)]
+    replies = [None] * total
+    saved_seconds = 0.0
+    if cache is not None and not regenerate:
+        for index, key in enumerate(keys):
+            entry = cache.get(key)
+            if entry is not None:
+                replies[index] = entry["reply"]
+                saved_seconds += entry["latency"]
+    missing = [index for index, reply in enumerate(replies) if reply is None]
+
+    async def request_all():
+        client = get_async_openai()
+        semaphore = asyncio.Semaphore(max(1, app.config.get("LLM_MAX_CONCURRENCY") or 1))
+
+        async def request(index):
+            prompt = get_partial_prompt(document_type, chunk_texts[index], index + 1, total)
+            async with semaphore:
+                started = time.monotonic()
+                response = await client.chat.completions.create(
+                    model=UML_MODEL,
+                    max_completion_tokens=10_000,
+                    messages=[
+                        {"role": "system", "content": UML_SYSTEM_MESSAGE},
+                        {"role": "user", "content": prompt},
+                    ],
+                )
+                return response.choices[0].message.content.strip(), time.monotonic() - started
+
+        try:
+            return await asyncio.gather(*(request(index) for index in missing), return_exceptions=True)
+        finally:
+            await client.close()
+
+    started = time.monotonic()
+    latencies, errors = [], []
+    if missing:
+        for index, result in zip(missing, asyncio.run(request_all())):
+            if isinstance(result, BaseException):
+                errors.append(f"part {index + 1}/{total}: {result}")
+                continue
+            replies[index], latency = result
+            latencies.append(latency)
+            if cache is not None:
+                # Parts that succeeded are kept even if another part failed.
+                cache.put(keys[index], replies[index], latency, regenerated=regenerate)
+    if errors:
+        raise RuntimeError("Partial diagram generation failed: " + "; ".join(errors))
+
+    print(f"[llm_controller] {total} parts, {total - len(missing)} from cache, "
+          f"{round(time.monotonic() - started, 1)}s")
+    return replies, {
+        "cached": not missing,
+        "parts": total,
+        "cached_parts": total - len(missing),
+        "latency": round(time.monotonic() - started, 3),
+        "slowest_part": round(max(latencies), 3) if latencies else 0.0,
+        "saved_seconds": round(saved_seconds, 3)
+    }
+
+def stream_plantuml(app, document_type: str, exported_text: str, regenerate: bool = False,
+                    info: Optional[Dict] = None) -> Iterator[str]:
+    """
+    ask_for_plantuml() that yields the reply piece by piece as the model writes it.
+    Once the iterator is exhausted, info holds "reply" (the whole reply) and the
+    "cached", "latency" and "saved_seconds" of ask_for_plantuml().
+    A cached reply is yielded in one piece. Reading stops at the first @enduml: the
+    diagram is complete there, and whatever the model adds after it is not waited for.
+    """
+    info = {} if info is None else info
+    cache = get_llm_cache(app)
+    key = llm_cache_key(document_type, exported_text)
+    if cache is not None and not regenerate:
+        entry = cache.get(key)
+        if entry is not None:
+            info.update(reply=entry["reply"], cached=True, latency=0.0, saved_seconds=entry["latency"])
+            yield entry["reply"]
+            return
+
+    started = time.monotonic()
+    stream = get_openai().chat.completions.create(
+        model=UML_MODEL,
+        max_completion_tokens=10_000,
+        stream=True,
+        messages=[
+            {"role": "system", "content": UML_SYSTEM_MESSAGE},
+            {"role": "user", "content": get_prompt(document_type, exported_text)},
+        ],
+    )
+    reply = ""
+    try:
+        for chunk in stream:
+            # Azure sends its content filter results as chunks without choices.
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            # "@enduml" may be split over two chunks, so look back a few characters.
+            end = _END_RE.search(reply + delta, max(0, len(reply) - len("@enduml")))
+            if end is not None:
+                delta = delta[:end.end() - len(reply)]
+                reply += delta
+                yield delta
+                break
+            reply += delta
+            yield delta
+    finally:
+        stream.close()
+    latency = time.monotonic() - started
+    reply = reply.strip()
+    if cache is not None:
+        cache.put(key, reply, latency, regenerated=regenerate)
+    info.update(reply=reply, cached=False, latency=round(latency, 3), saved_seconds=0.0)
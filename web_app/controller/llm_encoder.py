@@ -0,0 +1,321 @@
+import os
+import sys
+import re
+import json
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:              # no tokenizer available: estimate from the length
+    _ENCODING = None
+
+_SYMBOL_REF_RE = re.compile(r"\$\d+")
+VISIBILITY_MARKS = {"public": "+", "private": "-", "protected": "#", "internal": "~"}
+LEGEND = (
+    "Format: one item per line, nesting by indentation. "
+    "O folder/package: name type path. C component: name type. "
+    "M method: visibility(+ public,- private,# protected,~ internal) [static] name(params)->return; "
+    "param name:type=default, ? = optional. "
+    "V variable: visibility name:type scope [const] [static]. "
+    "\": text\" is a description. $n is an entry of the symbol table ($n=text lines)."
+)
+
+# Levels of detail, tried in order until the text fits the token budget.
+DETAIL_LEVELS = (
+    {},
+    {"descriptions": False},
+    {"descriptions": False, "local_variables": False},
+    {"descriptions": False, "local_variables": False, "private_members": False},
+    {"descriptions": False, "local_variables": False, "private_members": False, "signatures": False},
+)
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens of text for the OpenAI models (o200k_base), or about 4 characters per
+    token when tiktoken is not installed.
+    """
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def _rows(export: Dict, table: str) -> List[Dict]:
+    columns = export.get("schemas", {}).get(table)
+    if not columns:
+        return []
+    return [dict(zip(columns, row)) for row in export.get("data", {}).get(table, [])]
+
+def _is_private(name: Optional[str]) -> bool:
+    name = name or ""
+    return name.startswith("_") and not (name.startswith("__") and name.endswith("__"))
+
+def _description(row: Dict, detail: Dict) -> str:
+    text = " ".join(str(row.get("description") or "").split())
+    if not text or not detail.get("descriptions", True):
+        return ""
+    return f" : {text[:200]}"
+
+class _SymbolTable:
+    """
+    Short $n references for type strings repeated often enough that the reference
+    plus one table line is shorter than writing them out.
+    """
+    def __init__(self, values):
+        self.symbols = {}
+        counts = Counter(value for value in values if value)
+        candidates = []
+        for value, count in counts.items():
+            ref_length = 3
+            saving = count * (len(value) - ref_length) - (len(value) + ref_length + 2)
+            if saving > 0:
+                candidates.append((saving, value))
+        for index, (_, value) in enumerate(sorted(candidates, reverse=True)):
+            self.symbols[value] = f"${index}"
+
+    def ref(self, value) -> str:
+        if value is None or value == "":
+            return ""
+        value = str(value)
+        return self.symbols.get(value, value)
+
+    def lines(self) -> List[str]:
+        return [f"{ref}={value}" for value, ref in self.symbols.items()]
+
+class _Model:
+    """
+    The exported rows nested for the LLM: organizations > components > methods >
+    parameters and variables, with NULL links and IDs resolved away.
+    """
+    def __init__(self, export: Dict):
+        self.project = export.get("metadata", {}).get("project_name", "")
+        self.organizations = _rows(export, "organizations")
+        self.components_by_org = defaultdict(list)
+        self.methods_by_component = defaultdict(list)
+        self.parameters_by_method = defaultdict(list)
+        self.component_variables = defaultdict(list)
+        self.method_variables = defaultdict(list)
+        self.loose_variables = []
+        for row in _rows(export, "components"):
+            self.components_by_org[row.get("organization_id")].append(row)
+        for row in _rows(export, "methods"):
+            self.methods_by_component[row.get("component_id")].append(row)
+        for row in _rows(export, "method_parameters"):
+            self.parameters_by_method[row.get("method_id")].append(row)
+        for row in _rows(export, "variables"):
+            if row.get("method_id") is not None:
+                self.method_variables[row["method_id"]].append(row)
+            elif row.get("component_id") is not None:
+                self.component_variables[row["component_id"]].append(row)
+            else:
+                self.loose_variables.append(row)
+
+        paths = [row.get("organization_path") or "" for row in self.organizations]
+        self.path_prefix = os.path.commonpath(paths) if len(paths) > 1 and all(paths) else ""
+        self.symbols = _SymbolTable(
+            [row.get("return_type") for rows in self.methods_by_component.values() for row in rows]
+            + [row.get("parameter_type") for rows in self.parameters_by_method.values() for row in rows]
+            + [row.get("variable_type") for rows in list(self.component_variables.values())
+               + list(self.method_variables.values()) + [self.loose_variables] for row in rows]
+        )
+
+    def _path(self, path) -> str:
+        path = path or ""
+        if self.path_prefix and path.startswith(self.path_prefix):
+            path = path[len(self.path_prefix):].lstrip("/\\") or "."
+        return path
+
+    def _variable(self, row: Dict, indent: str, detail: Dict) -> Optional[str]:
+        if not detail.get("private_members", True) and _is_private(row.get("variable_name")):
+            return None
+        flags = [row.get("scope") or ""]
+        if row.get("is_constant"):
+            flags.append("const")
+        if row.get("is_static"):
+            flags.append("static")
+        type_ref = self.symbols.ref(row.get("variable_type"))
+        name = f"{row.get('variable_name')}" + (f":{type_ref}" if type_ref else "")
+        parts = [VISIBILITY_MARKS.get(row.get("visibility"), ""), name] + flags
+        return f"{indent}V {' '.join(part for part in parts if part)}{_description(row, detail)}"
+
+    def _parameter(self, row: Dict) -> str:
+        text = row.get("parameter_name") or ""
+        type_ref = self.symbols.ref(row.get("parameter_type"))
+        if type_ref:
+            text += f":{type_ref}"
+        if row.get("default_value") not in (None, ""):
+            text += f"={row['default_value']}"
+        elif row.get("is_required") == 0:
+            text += "?"
+        return text
+
+    def _method(self, row: Dict, indent: str, detail: Dict) -> List[str]:
+        if not detail.get("private_members", True) and _is_private(row.get("method_name")):
+            return []
+        parts = [VISIBILITY_MARKS.get(row.get("visibility"), ""), "static" if row.get("is_static") else ""]
+        signature = row.get("method_name") or ""
+        if detail.get("signatures", True):
+            parameters = ", ".join(self._parameter(p) for p in self.parameters_by_method.get(row.get("method_id"), []))
+            signature += f"({parameters})"
+            return_ref = self.symbols.ref(row.get("return_type"))
+            if return_ref:
+                signature += f"->{return_ref}"
+        parts.append(signature)
+        lines = [f"{indent}M {' '.join(part for part in parts if part)}{_description(row, detail)}"]
+        if detail.get("local_variables", True):
+            for variable in self.method_variables.get(row.get("method_id"), []):
+                line = self._variable(variable, indent + " ", detail)
+                if line:
+                    lines.append(line)
+        return lines
+
+    def _component(self, row: Dict, indent: str, detail: Dict) -> List[str]:
+        kind = f" {row['component_type']}" if row.get("component_type") else ""
+        lines = [f"{indent}C {row.get('component_name')}{kind}{_description(row, detail)}"]
+        for variable in self.component_variables.get(row.get("component_id"), []):
+            line = self._variable(variable, indent + " ", detail)
+            if line:
+                lines.append(line)
+        for method in self.methods_by_component.get(row.get("component_id"), []):
+            lines.extend(self._method(method, indent + " ", detail))
+        return lines
+
+    def organization_blocks(self, detail: Dict) -> List[List[str]]:
+        """
+        Lines of each organization with everything nested in it; components and
+        variables without a known organization come last, as "(no folder)".
+        """
+        blocks = []
+        for org in self.organizations:
+            kind = f" {org['organization_type']}" if org.get("organization_type") else ""
+            path = self._path(org.get("organization_path"))
+            path = f" {path}" if path and path != org.get("organization_name") else ""
+            lines = [f"O {org.get('organization_name')}{kind}{path}{_description(org, detail)}"]
+            for component in self.components_by_org.get(org.get("organization_id"), []):
+                lines.extend(self._component(component, " ", detail))
+            blocks.append(lines)
+        known = {org.get("organization_id") for org in self.organizations}
+        orphans = [c for org_id, rows in self.components_by_org.items() if org_id not in known for c in rows]
+        if orphans or self.loose_variables:
+            lines = ["O (no folder)"]
+            for component in orphans:
+                lines.extend(self._component(component, " ", detail))
+            for variable in self.loose_variables:
+                line = self._variable(variable, " ", detail)
+                if line:
+                    lines.append(line)
+            blocks.append(lines)
+        return blocks
+
+    def header_lines(self, body: Optional[List[str]] = None) -> List[str]:
+        """
+        Project line, legend and symbol table; only the symbols used in body when given.
+        """
+        header = [f"Project {self.project}", LEGEND]
+        if self.path_prefix:
+            header.append("Folder paths are relative to the project root.")
+        symbol_lines = self.symbols.lines()
+        if body is not None:
+            used = set(_SYMBOL_REF_RE.findall("\n".join(body)))
+            symbol_lines = [line for line in symbol_lines if line.split("=", 1)[0] in used]
+        if symbol_lines:
+            header.append("Symbols:")
+            header.extend(symbol_lines)
+        return header
+
+    def render(self, detail: Dict) -> str:
+        body = [line for block in self.organization_blocks(detail) for line in block]
+        return "\n".join(self.header_lines() + body)
+
+def _truncate(text: str, token_budget: int) -> str:
+    """
+    Cut whole lines off the end of text until it fits token_budget.
+    """
+    lines = text.split("\n")
+    low, high = 0, len(lines)
+    while low < high:                  # largest number of lines that fits
+        middle = (low + high + 1) // 2
+        candidate = "\n".join(lines[:middle]) + f"\n... ({len(lines) - middle} more lines omitted)"
+        if count_tokens(candidate) <= token_budget:
+            low = middle
+        else:
+            high = middle - 1
+    return "\n".join(lines[:low]) + f"\n... ({len(lines) - low} more lines omitted)"
+
+def encode_for_llm(export: Dict, token_budget: int = 0) -> Tuple[str, Dict]:
+    """
+    Compact text of an export (the structure written by export_to_json) for the
+    model prompt, and {"tokens", "level", "truncated"} about it.
+    Details are dropped level by level (DETAIL_LEVELS) and finally whole lines cut
+    until the text fits token_budget; 0 means no budget.
+    """
+    model = _Model(export)
+    for level, detail in enumerate(DETAIL_LEVELS):
+        text = model.render(detail)
+        tokens = count_tokens(text)
+        if not token_budget or tokens <= token_budget:
+            return text, {"tokens": tokens, "level": level, "truncated": False}
+    text = _truncate(text, token_budget)
+    return text, {"tokens": count_tokens(text), "level": len(DETAIL_LEVELS) - 1, "truncated": True}
+
+def encode_chunks(export: Dict, chunk_tokens: int) -> List[Tuple[str, Dict]]:
+    """
+    The export split along organization boundaries for map-reduce generation:
+    [(text, {"tokens", "level", "truncated", "organizations"})], each text a
+    self-contained encoding (header plus whole organizations) of at most
+    chunk_tokens. Organizations are packed together in export order; one that is
+    too big on its own is sent with less detail, or cut, like encode_for_llm does.
+    """
+    model = _Model(export)
+    blocks_by_level = [model.organization_blocks(detail) for detail in DETAIL_LEVELS]
+    header_tokens = count_tokens("\n".join(model.header_lines()))
+
+    # Level of detail of each organization: the first one that fits a chunk alone.
+    units = []
+    for index in range(len(blocks_by_level[0])):
+        for level, blocks in enumerate(blocks_by_level):
+            block = blocks[index]
+            tokens = count_tokens("\n".join(block))
+            if header_tokens + tokens <= chunk_tokens or level == len(DETAIL_LEVELS) - 1:
+                units.append((block, tokens, level))
+                break
+
+    chunks, current, current_tokens = [], [], 0
+    for unit in units:
+        if current and current_tokens + unit[1] + header_tokens > chunk_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit[1]
+    if current:
+        chunks.append(current)
+
+    result = []
+    for chunk in chunks:
+        body = [line for block, _, _ in chunk for line in block]
+        text = "\n".join(model.header_lines(body) + body)
+        truncated = False
+        if count_tokens(text) > chunk_tokens:
+            text, truncated = _truncate(text, chunk_tokens), True
+        result.append((text, {
+            "tokens": count_tokens(text),
+            "level": max(level for _, _, level in chunk),
+            "truncated": truncated,
+            "organizations": len(chunk)
+        }))
+    return result
+
+def load_export(json_dir: str) -> Tuple[str, Dict]:
+    """
+    (file_name, export) of the newest *.json export in json_dir.
+    Raises ValueError if none exist.
+    """
+    json_files = sorted(
+        (entry for entry in os.scandir(json_dir) if entry.is_file() and entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+    ) if os.path.isdir(json_dir) else []
+    if not json_files:
+        raise ValueError("No .json file found in Json_toAI folder")
+    with open(json_files[-1].path, "r", encoding="utf-8") as f:
+        return json_files[-1].name, json.load(f)
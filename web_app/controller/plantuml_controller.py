@@ -0,0 +1,330 @@
+import os
+import re
+import sys
+import time
+import atexit
+import hashlib
+import selectors
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.cache.disk_cache import DiskCache
+
+FORMATS = ("pdf", "svg", "png")
+MIMETYPES = {"pdf": "application/pdf", "svg": "image/svg+xml", "png": "image/png"}
+# Written by PlantUML after every diagram in -pipe mode, so one process can render many.
+PIPE_DELIMITER = b"___CD_INSIGHT_PLANTUML_END___"
+_START_RE = re.compile(rb"^\s*@start", re.MULTILINE | re.IGNORECASE)
+_WARM_UP = "@startuml\nAlice -> Bob : warm up\n@enduml\n"
+
+_pools = {}
+_pools_lock = threading.Lock()
+_render_caches = {}
+DEFAULT_RENDER_CACHE_BYTES = 64 * 1024 * 1024
+_DIAGRAM_KEY_RE = re.compile(r"^[0-9a-f]{64}\.(pdf|svg|png)$")
+
+class PlantUMLError(RuntimeError):
+    """
+    PlantUML rejected the diagram, died, or no renderer became free in time.
+    """
+
+class PlantUMLTimeout(PlantUMLError):
+    """
+    A render took longer than the timeout; its process was killed.
+    """
+
+class PlantUMLProcess:
+    """
+    One `java -jar plantuml.jar -t<format> -pipe` process, kept running between renders.
+    Diagrams are written to its stdin one after another; the output of each ends with
+    PIPE_DELIMITER. Error messages arrive on stderr before the (error) image.
+    """
+    def __init__(self, jar_path: str, fmt: str, max_renders: int = 500):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported PlantUML format: {fmt}")
+        self.fmt = fmt
+        self.max_renders = max_renders
+        self.renders = 0
+        self.proc = subprocess.Popen(
+            self.command(jar_path, fmt),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.proc.stdout, selectors.EVENT_READ, "stdout")
+        self._selector.register(self.proc.stderr, selectors.EVENT_READ, "stderr")
+
+    @staticmethod
+    def command(jar_path: str, fmt: str):
+        return ["java", "-Djava.awt.headless=true", "-jar", jar_path, "-DPLANTUML_LIMIT_SIZE=8192",
+                f"-t{fmt}", "-pipe", "-pipedelimitor", PIPE_DELIMITER.decode("ascii"), "-charset", "UTF-8"]
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def usable(self) -> bool:
+        return self.alive() and self.renders < self.max_renders
+
+    def _read_ready(self, timeout):
+        """
+        {"stdout"/"stderr": bytes} of whatever is readable within timeout;
+        b"" for a stream at end of file.
+        """
+        chunks = {}
+        for key, _ in self._selector.select(timeout):
+            chunks[key.data] = os.read(key.fd, 1 << 16)
+        return chunks
+
+    def render(self, uml_code: str, timeout: float) -> bytes:
+        """
+        Output of the first diagram in uml_code.
+        Raises PlantUMLError for a diagram PlantUML reports as invalid or a process
+        that exited, PlantUMLTimeout (after killing the process) past timeout seconds.
+        """
+        # Whatever is left over (e.g. the newline after the last delimiter) belongs to an earlier render.
+        # A stream at end of file is always readable, so stop at the first b"" (the process exited).
+        leftover_stderr = bytearray()
+        while True:
+            chunks = self._read_ready(0)
+            if not chunks:
+                break
+            leftover_stderr += chunks.get("stderr", b"")
+            if b"" in chunks.values():
+                self.close(kill=True)
+                raise PlantUMLError(
+                    f"PlantUML exited unexpectedly: {bytes(leftover_stderr).decode('utf-8', 'replace').strip()}"
+                )
+
+        source = uml_code.encode("utf-8")
+        expected = max(1, len(_START_RE.findall(source)))
+        deadline = time.monotonic() + timeout
+        self.renders += 1
+        try:
+            self.proc.stdin.write(source.rstrip(b"\n") + b"\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise PlantUMLError(f"PlantUML process is not running: {e}")
+
+        stdout, stderr = bytearray(), bytearray()
+        while stdout.count(PIPE_DELIMITER) < expected:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close(kill=True)
+                raise PlantUMLTimeout(f"PlantUML did not finish within {timeout}s")
+            chunks = self._read_ready(remaining)
+            if chunks.get("stdout") == b"" or chunks.get("stderr") == b"":
+                self.close(kill=True)
+                raise PlantUMLError(
+                    f"PlantUML exited unexpectedly: {bytes(stderr).decode('utf-8', 'replace').strip()}"
+                )
+            stdout += chunks.get("stdout", b"")
+            stderr += chunks.get("stderr", b"")
+        # An error message written just before the image is already in the pipe.
+        stderr += self._read_ready(0).get("stderr", b"")
+
+        lines = bytes(stderr).decode("utf-8", "replace").splitlines()
+        if "ERROR" in lines:
+            raise PlantUMLError("\n".join(lines[lines.index("ERROR"):]))
+        return bytes(stdout[:stdout.index(PIPE_DELIMITER)])
+
+    def close(self, kill: bool = False):
+        try:
+            self._selector.close()
+            if kill:
+                self.proc.kill()
+            else:
+                self.proc.stdin.close()
+                self.proc.terminate()
+            self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.kill()
+        for stream in (self.proc.stdout, self.proc.stderr):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+class PlantUMLPool:
+    """
+    Warm PlantUML processes shared by the threads of one gunicorn worker.
+
+    At most max_processes JVMs run at once, across all formats; a render that needs
+    a format with no free process may stop an idle process of another format to
+    start one. Processes that died, timed out or reached their render limit are
+    replaced on the next checkout.
+    """
+    def __init__(self, jar_path: str, max_processes: int = 2, timeout: float = 60,
+                 checkout_timeout: float = 60, warm_up: bool = True):
+        self.jar_path = jar_path
+        self.max_processes = max_processes
+        self.timeout = timeout
+        self.checkout_timeout = checkout_timeout
+        self.warm_up = warm_up
+        self._idle = {fmt: [] for fmt in FORMATS}
+        self._running = 0
+        self._condition = threading.Condition()
+
+    def _start(self, fmt: str) -> PlantUMLProcess:
+        process = PlantUMLProcess(self.jar_path, fmt)
+        if self.warm_up:
+            # First render loads and JIT-compiles PlantUML; do it before a user waits on it.
+            try:
+                process.render(_WARM_UP, self.timeout)
+            except PlantUMLError as e:
+                # The process is closed by now; the caller gets PlantUML's own message.
+                print(f"⚠️ PlantUML warm-up failed: {e}")
+                process.close(kill=True)
+                raise
+        return process
+
+    def acquire(self, fmt: str) -> PlantUMLProcess:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported PlantUML format: {fmt}")
+        deadline = time.monotonic() + self.checkout_timeout
+        stale = []
+        with self._condition:
+            while True:
+                idle = self._idle[fmt]
+                while idle and not idle[-1].usable():
+                    stale.append(idle.pop())
+                    self._running -= 1
+                if idle:
+                    process = idle.pop()
+                    break
+                if self._running < self.max_processes:
+                    process = None
+                    self._running += 1
+                    break
+                other = next((procs for procs in self._idle.values() if procs), None)
+                if other:
+                    # Trade an idle process of another format for one of this format.
+                    stale.append(other.pop(0))
+                    process = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PlantUMLError(f"No PlantUML renderer free after {self.checkout_timeout}s")
+                self._condition.wait(remaining)
+
+        for old in stale:
+            old.close()
+        if process is not None:
+            return process
+        try:
+            return self._start(fmt)
+        except Exception:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, process: PlantUMLProcess):
+        with self._condition:
+            if process.usable():
+                self._idle[process.fmt].append(process)
+            else:
+                self._running -= 1
+            self._condition.notify()
+        if not process.usable():
+            process.close()
+
+    def render(self, uml_code: str, fmt: str = "pdf") -> bytes:
+        process = self.acquire(fmt)
+        try:
+            return process.render(uml_code, self.timeout)
+        finally:
+            self.release(process)
+
+    def close(self):
+        with self._condition:
+            idle = [process for procs in self._idle.values() for process in procs]
+            for procs in self._idle.values():
+                procs.clear()
+            self._running -= len(idle)
+        for process in idle:
+            process.close()
+
+def get_plantuml_pool(app) -> PlantUMLPool:
+    """
+    The PlantUML pool of this process for the app's jar, created on first use.
+    """
+    jar_path = app.config["PLANTUML_JAR_PATH"]
+    with _pools_lock:
+        if jar_path not in _pools:
+            pool = PlantUMLPool(
+                jar_path,
+                max_processes=app.config.get("PLANTUML_PROCESSES") or 2,
+                timeout=app.config.get("PLANTUML_RENDER_TIMEOUT") or 60
+            )
+            atexit.register(pool.close)
+            _pools[jar_path] = pool
+        return _pools[jar_path]
+
+@lru_cache(maxsize=None)
+def plantuml_version(jar_path: str) -> str:
+    """
+    Identity of the PlantUML build: a hash of the jar, so a new jar never serves
+    diagrams rendered by the old one.
+    """
+    digest = hashlib.sha256()
+    with open(jar_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def diagram_key(uml_code: str, fmt: str, version: str) -> str:
+    """
+    Cache key and file name of a rendered diagram: <sha256 of version, format and source>.<format>.
+    """
+    digest = hashlib.sha256(f"{version}\0{fmt}\0{uml_code}".encode("utf-8")).hexdigest()
+    return f"{digest}.{fmt}"
+
+def is_diagram_key(key: str) -> bool:
+    return bool(_DIAGRAM_KEY_RE.match(key or ""))
+
+def get_render_cache(app) -> Optional[DiskCache]:
+    """
+    On-disk LRU cache of rendered diagrams shared by every worker, or None when its
+    directory cannot be created. It cannot be turned off: diagrams are only ever
+    sent as their /diagrams URL.
+    """
+    directory = app.config.get("RENDER_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "cd_insight_diagrams")
+    max_bytes = app.config.get("RENDER_CACHE_MAX_BYTES") or 0
+    if max_bytes <= 0:
+        max_bytes = DEFAULT_RENDER_CACHE_BYTES
+    with _pools_lock:
+        cache = _render_caches.get(directory)
+        if cache is None:
+            try:
+                cache = DiskCache(directory, max_bytes)
+            except OSError as e:
+                print(f"⚠️ Render cache unavailable, cannot use {directory}: {e}")
+                return None
+            _render_caches[directory] = cache
+        return cache
+
+def render_diagram(app, uml_code: str, fmt: str = "pdf") -> Tuple[str, bytes]:
+    """
+    (key, bytes) of uml_code rendered to fmt and stored in the render cache under
+    key. A diagram rendered before (by any user or worker) comes from the cache
+    without starting PlantUML.
+    Raises PlantUMLError if the diagram cannot be stored, as it could not be served.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported PlantUML format: {fmt}")
+    cache = get_render_cache(app)
+    if cache is None:
+        raise PlantUMLError("The render cache is unavailable, see RENDER_CACHE_DIR")
+
+    key = diagram_key(uml_code, fmt, plantuml_version(app.config["PLANTUML_JAR_PATH"]))
+    data = cache.get(key)
+    if data is None:
+        data = get_plantuml_pool(app).render(uml_code, fmt)
+        try:
+            cache.put(key, data)
+        except OSError as e:
+            print(f"⚠️ Could not cache diagram {key}: {e}")
+            raise PlantUMLError(f"Could not store the rendered diagram: {e}") from e
+    return key, data
@@ -1,13 +1,23 @@
 # src/uml_controller.py
 import os
-import base64
-import subprocess
+import re
+import json
+import time
+import queue
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 
-from flask import jsonify, current_app
-from config.external_ai_config import get_prompt, get_openai
+from flask import jsonify, current_app, url_for
+from web_app.controller.plantuml_controller import FORMATS, MIMETYPES, render_diagram
+from web_app.controller.llm_controller import ask_for_plantuml, ask_for_plantuml_parts, stream_plantuml
+from web_app.controller.llm_encoder import encode_chunks, encode_for_llm, load_export
+from web_app.controller.file_controller import export_txt_tokens
+from web_app.controller.diagram_controller import (
+    generate_local_plantuml, is_local_document_type, load_project_model
+)
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -29,21 +39,16 @@ def load_latest_txt(json_dir: str) -> Tuple[str, str]:
     return latest.name, latest.read_text(encoding="utf-8")
 
 
-def render_plantuml_to_pdf(uml_code: str, jar_path: str) -> bytes:
+def render_plantuml(uml_code: str, fmt: str = "pdf") -> Tuple[str, bytes]:
     """
-    Run `plantuml.jar` in `-tpdf -pipe` mode and return the generated PDF bytes.
-    Raises RuntimeError on non-zero exit.
+    Render `uml_code` to PDF, SVG or PNG; returns (diagram key, bytes).
+    Diagrams rendered before come from the render cache, the rest from one of the
+    warm PlantUML processes of this worker (see plantuml_controller).
+    The key names the cached copy at /diagrams/<key>.
+    Raises PlantUMLError if PlantUML rejects the diagram, dies or times out, or the
+    render cannot be stored.
     """
-    cmd = ["java", "-jar", jar_path, "-DPLANTUML_LIMIT_SIZE=8192", "-tpdf", "-pipe", "-charset", "UTF-8"]
-    proc = subprocess.Popen(
-        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    stdout, stderr = proc.communicate(input=uml_code.encode("utf-8"), timeout=60)
-
-    if proc.returncode != 0:
-        raise RuntimeError(stderr.decode("utf-8") or "PlantUML rendering failed")
-
-    return stdout
+    return render_diagram(current_app, uml_code, fmt)
 
 
 def sanitise_plantuml(raw: str) -> str:
@@ -65,59 +70,260 @@ def sanitise_plantuml(raw: str) -> str:
     return code
 
 
+# Sequence-diagram groups and multi-line notes: kept whole when merging fragments.
+_GROUP_START_RE = re.compile(r"^(alt|opt|loop|par|group|critical|break|box)\b", re.IGNORECASE)
+_NOTE_START_RE = re.compile(r"^[rh]?note\b[^:]*$", re.IGNORECASE)
+_SINGLE_DIRECTIVES = ("title", "header", "footer", "caption", "left to right direction",
+                      "top to bottom direction")
+
+
+def _read_opaque(lines, pos, first):
+    """
+    An alt/loop/... group up to its matching `end`, or a note up to `end note`, as one string.
+    """
+    block, depth = [first], 1
+    is_note = bool(_NOTE_START_RE.match(first))
+    while pos < len(lines) and depth:
+        line = " ".join(lines[pos].split())
+        pos += 1
+        block.append(line)
+        lowered = line.lower()
+        if is_note:
+            if lowered in ("end note", "endnote", "end rnote", "endrnote", "end hnote", "endhnote"):
+                depth = 0
+        elif _GROUP_START_RE.match(line):
+            depth += 1
+        elif lowered == "end" or lowered.startswith("end "):
+            depth -= 1
+    return "\n".join(block), pos
+
+
+def _parse_statements(lines, pos=0):
+    """
+    Statements of a PlantUML body: lines, opaque groups, and [header, children]
+    for `... {` blocks. Returns (statements, position after the closing brace).
+    """
+    statements = []
+    while pos < len(lines):
+        line = " ".join(lines[pos].split())
+        pos += 1
+        if not line or line.lower().startswith(("@startuml", "@enduml")):
+            continue
+        if line == "}":
+            return statements, pos
+        if line.endswith("{"):
+            children, pos = _parse_statements(lines, pos)
+            statements.append([line, children])
+        elif _GROUP_START_RE.match(line) or _NOTE_START_RE.match(line):
+            block, pos = _read_opaque(lines, pos, line)
+            statements.append(block)
+        else:
+            statements.append(line)
+    return statements, pos
+
+
+def _merge_statements(target, statements):
+    """
+    Add statements to target, dropping exact duplicates and merging the children
+    of blocks with the same header (`class Order {` from two fragments becomes one).
+    """
+    blocks = {item[0]: item for item in target if isinstance(item, list)}
+    seen = {item for item in target if isinstance(item, str)}
+    for statement in statements:
+        if isinstance(statement, list):
+            existing = blocks.get(statement[0])
+            if existing is None:
+                existing = [statement[0], []]
+                blocks[statement[0]] = existing
+                target.append(existing)
+            _merge_statements(existing[1], statement[1])
+        elif statement not in seen:
+            lowered = statement.lower()
+            directive = next((d for d in _SINGLE_DIRECTIVES if lowered.startswith(d)), None)
+            if directive and any(s.lower().startswith(directive) for s in seen):
+                continue                # only the first fragment's title, direction, ...
+            seen.add(statement)
+            target.append(statement)
+
+
+def _write_statements(statements, indent=""):
+    lines = []
+    for statement in statements:
+        if isinstance(statement, list):
+            lines.append(f"{indent}{statement[0]}")
+            lines.extend(_write_statements(statement[1], indent + "  "))
+            lines.append(f"{indent}}}")
+        else:
+            lines.extend(f"{indent}{line}" for line in statement.split("\n"))
+    return lines
+
+
+def merge_plantuml(fragments) -> str:
+    """
+    Reduce step of map-reduce generation: one diagram from partial PlantUML replies.
+    Elements declared in several fragments appear once, with the members of all
+    declarations; fragments the model answered with 0 are left out ("0" if all were).
+    """
+    merged = []
+    for fragment in fragments:
+        if fragment.strip() == "0":
+            continue
+        code = sanitise_plantuml(fragment)
+        statements, _ = _parse_statements(code.splitlines())
+        _merge_statements(merged, statements)
+    if not merged:
+        return "0"
+    return "\n".join(["@startuml"] + _write_statements(merged) + ["@enduml"])
+
+
+def _encode_export(json_dir: str, mode: str):
+    """
+    (mode, file_name, export, metadata_text, tokens) for asking the model about the
+    project's export; "auto" is resolved to "single", or to "chunked" when the
+    full-detail export is over LLM_TOKEN_BUDGET.
+    """
+    file_name, export = load_export(json_dir)
+    token_budget = current_app.config.get("LLM_TOKEN_BUDGET") or 0
+    # "auto" keeps every detail and switches to chunks when that is over the budget.
+    metadata_text, encoding = encode_for_llm(export, token_budget if mode == "single" else 0)
+    if mode == "auto":
+        mode = "chunked" if token_budget and encoding["tokens"] > token_budget else "single"
+    tokens = {
+        # Counted once when the export was written; None for exports older than that.
+        "export_txt": export_txt_tokens(os.path.join(json_dir, file_name)),
+        "budget": token_budget,
+        "mode": mode,
+    }
+    if mode == "single":
+        tokens.update(sent=encoding["tokens"], detail_level=encoding["level"], truncated=encoding["truncated"])
+    return mode, file_name, export, metadata_text, tokens
+
+
+def _ask_model_in_parts(document_type: str, file_name: str, export, tokens, regenerate: bool):
+    """
+    Map-reduce: partial diagrams per group of organizations, requested concurrently,
+    then merged into one reply. Returns (reply, llm_info).
+    """
+    chunk_tokens = current_app.config.get("LLM_CHUNK_TOKENS") or tokens["budget"] or 20_000
+    chunks = encode_chunks(export, chunk_tokens)
+    tokens.update(sent=sum(info["tokens"] for _, info in chunks), chunks=[info for _, info in chunks])
+    print(f"[uml_controller] sending {file_name} in {len(chunks)} parts: {tokens['sent']} tokens "
+          f"instead of {tokens['export_txt']} for the .txt export")
+    fragments, llm_info = ask_for_plantuml_parts(
+        current_app, document_type, [text for text, _ in chunks], regenerate
+    )
+    return merge_plantuml(fragments), llm_info
+
+
+def _ask_model(document_type: str, json_dir: str, regenerate: bool, mode: str):
+    """
+    (reply, llm_info, tokens) of the model for the project's export: one prompt in
+    "single" mode, partial diagrams of chunks merged into one in "chunked" mode.
+    """
+    mode, file_name, export, metadata_text, tokens = _encode_export(json_dir, mode)
+    if mode == "single":
+        print(f"[uml_controller] sending {file_name}: {tokens['sent']} tokens "
+              f"instead of {tokens['export_txt']} for the .txt export")
+        ai_reply, llm_info = ask_for_plantuml(current_app, document_type, metadata_text, regenerate)
+    else:
+        ai_reply, llm_info = _ask_model_in_parts(document_type, file_name, export, tokens, regenerate)
+    return ai_reply, llm_info, tokens
+
+
+GENERATION_MODES = ("auto", "single", "chunked", "local")
+
+
+def _generation_mode(document_type: str, mode: Optional[str]) -> Tuple[str, bool, Optional[str]]:
+    """
+    (mode, drawn locally?, error message) for the requested mode (LLM_GENERATION_MODE by default).
+    """
+    mode = mode or current_app.config.get("LLM_GENERATION_MODE") or "auto"
+    if mode not in GENERATION_MODES:
+        return mode, False, f"Unknown generation mode: {mode}"
+    local = is_local_document_type(document_type) and mode in ("auto", "local")
+    if mode == "local" and not local:
+        return mode, False, "Only class, component and package diagrams can be generated locally"
+    return mode, local, None
+
+
+def _render(uml_code: str, fmt: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (key of the diagram rendered to fmt, None), or (None, error message).
+    """
+    jar_path = current_app.config["PLANTUML_JAR_PATH"]
+    if not os.path.isfile(jar_path):
+        return None, f"PlantUML jar not found at {jar_path}"
+    try:
+        diagram_key, _ = render_plantuml(uml_code, fmt)
+    except Exception as e:
+        return None, f"PlantUML {fmt.upper()} generation failed: {e}"
+    return diagram_key, None
+
+
+def _delivery(fmt: str, diagram_key: str) -> Dict:
+    """
+    How the client gets the rendered diagram: its key in the render cache, turned
+    into a /diagrams URL by _with_diagram_url(). The bytes are never inlined.
+    """
+    return {
+        "format": fmt,
+        "mimetype": MIMETYPES[fmt],
+        "diagram_key": diagram_key,
+    }
+
+
+def _with_diagram_url(result: Dict) -> Dict:
+    # url_for needs the request, which worker threads of a batch do not have.
+    diagram_key = result.pop("diagram_key", None)
+    if "error" not in result:
+        result["diagram_url"] = url_for("get_diagram", key=diagram_key)
+    return result
+
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Public entry point
 # ────────────────────────────────────────────────────────────────────────────────
-def generate_uml(document_type: str, json_dir: str):
+def generate_uml(document_type: str, json_dir: str, regenerate: bool = False, mode: Optional[str] = None,
+                 user_name: Optional[str] = None, project_name: Optional[str] = None, fmt: str = "pdf"):
+    """
+    Metadata of the generated diagram as JSON: its PlantUML, where the code came from,
+    and "diagram_url", the rendered PDF, SVG or PNG (fmt) at /diagrams.
+    """
     try:
-        # ─── STEP 1: build prompt with file content ────────────────────────────
-        file_name, exported_text = load_latest_txt(json_dir)
-        prompt = get_prompt(document_type, exported_text)
-        print(f"[uml_controller] sending file {file_name} ({len(exported_text)} bytes)")
-
-        # ─── STEP 2: call OpenAI for PlantUML code ─────────────────────────────
-        client = get_openai()
-
-        response = client.chat.completions.create(
-            model="o3-mini",
-            max_completion_tokens=10_000,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert in generating optimized PlantUML diagrams. "
-                        "Return ONLY valid PlantUML code wrapped in @startuml/@enduml. "
-                        "No comments, no explanations."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-        )
+        if fmt not in FORMATS:
+            return jsonify({"error": f"Unsupported diagram format: {fmt}"}), 400
+        mode, local, mode_error = _generation_mode(document_type, mode)
+        if mode_error:
+            return jsonify({"error": mode_error}), 400
 
-        ai_reply = response.choices[0].message.content.strip()
+        # ─── STEP 1–2: PlantUML code from the analysis, or from the model ──────
+        if local:
+            # Deterministic: no model call, and the same analysis always gives the same code.
+            ai_reply = generate_local_plantuml(document_type, user_name, project_name)
+            llm_info = {"cached": False, "saved_seconds": 0.0}
+            tokens = {"mode": "local", "sent": 0}
+        else:
+            ai_reply, llm_info, tokens = _ask_model(document_type, json_dir, regenerate, mode)
         if ai_reply == "0":
             return jsonify({"error": "AI determined this is not a valid technical document"}), 400
 
         # ─── STEP 3: sanitise PlantUML code ───────────────────────────────────
         uml_code = sanitise_plantuml(ai_reply)
 
-        # ─── STEP 4: render PDF via PlantUML JAR ───────────────────────────────
-        jar_path = current_app.config["PLANTUML_JAR_PATH"]
-        if not os.path.isfile(jar_path):
-            return jsonify({"error": f"PlantUML jar not found at {jar_path}"}), 500
-
-        try:
-            pdf_bytes = render_plantuml_to_pdf(uml_code, jar_path)
-        except Exception as e:
-            return jsonify({"error": f"PlantUML PDF generation failed: {e}"}), 500
-
-        encoded_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
+        # ─── STEP 4: render via PlantUML JAR ───────────────────────────────────
+        diagram_key, render_error = _render(uml_code, fmt)
+        if render_error:
+            return jsonify({"error": render_error}), 500
 
         return jsonify(
-            {
-                "pdf": encoded_pdf,
+            _with_diagram_url({
+                **_delivery(fmt, diagram_key),
                 "plantuml": uml_code,
-            }
+                "cached": llm_info["cached"],
+                "saved_seconds": llm_info["saved_seconds"],
+                "tokens": tokens,
+                "generator": "local" if local else "llm",
+            })
         )
 
     # ─── Error handling ────────────────────────────────────────────────────────
@@ -132,4 +338,266 @@ def generate_uml(document_type: str, json_dir: str):
                 }
             ),
             500,
-        )
\ No newline at end of file
+        )
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _with_keep_alive(iterator, heartbeat: float):
+    """
+    Items of iterator, read in a background thread, with None in between whenever
+    nothing arrived for `heartbeat` seconds (the model can think for a long while
+    before its first token). If the client goes away, the thread still reads the
+    reply to its end, so it gets cached for the next request.
+    """
+    items = queue.Queue()
+    finished = object()
+
+    def pump():
+        try:
+            for item in iterator:
+                items.put((item, None))
+            items.put((finished, None))
+        except Exception as e:
+            items.put((finished, e))
+
+    threading.Thread(target=pump, daemon=True).start()
+    while True:
+        try:
+            item, error = items.get(timeout=heartbeat)
+        except queue.Empty:
+            yield None
+            continue
+        if error is not None:
+            raise error
+        if item is finished:
+            return
+        yield item
+
+
+def stream_uml(document_type: str, json_dir: str, regenerate: bool = False, mode: Optional[str] = None,
+               user_name: Optional[str] = None, project_name: Optional[str] = None, fmt: str = "pdf",
+               heartbeat: float = 15.0):
+    """
+    generate_uml() as Server-Sent Events, for a page that shows the diagram being written:
+      "status"   {"stage": "encoding" | "generating" | "rendering", ...}
+      "delta"    {"text"}: the next piece of the model's reply, as it arrives
+      "plantuml" {"plantuml"}: the complete, sanitised code, sent before rendering starts
+      "done"     the generate_uml() JSON
+      "failed"   {"error"}
+    Must run inside the request context (stream_with_context).
+    """
+    try:
+        if fmt not in FORMATS:
+            yield _sse("failed", {"error": f"Unsupported diagram format: {fmt}"})
+            return
+        mode, local, mode_error = _generation_mode(document_type, mode)
+        if mode_error:
+            yield _sse("failed", {"error": mode_error})
+            return
+
+        if local:
+            ai_reply = generate_local_plantuml(document_type, user_name, project_name)
+            llm_info = {"cached": False, "saved_seconds": 0.0}
+            tokens = {"mode": "local", "sent": 0}
+        else:
+            yield _sse("status", {"stage": "encoding"})
+            mode, file_name, export, metadata_text, tokens = _encode_export(json_dir, mode)
+            yield _sse("status", {"stage": "generating", "tokens": tokens})
+            if mode == "single":
+                llm_info = {}
+                app = current_app._get_current_object()
+                pieces = stream_plantuml(app, document_type, metadata_text, regenerate, llm_info)
+                for piece in _with_keep_alive(pieces, heartbeat):
+                    yield ": keep-alive\n\n" if piece is None else _sse("delta", {"text": piece})
+                ai_reply = llm_info["reply"]
+            else:
+                # Partial diagrams are merged before anything is shown, so there is nothing to stream.
+                ai_reply, llm_info = _ask_model_in_parts(document_type, file_name, export, tokens, regenerate)
+        if ai_reply == "0":
+            yield _sse("failed", {"error": "AI determined this is not a valid technical document"})
+            return
+
+        uml_code = sanitise_plantuml(ai_reply)
+        yield _sse("plantuml", {"plantuml": uml_code})
+        yield _sse("status", {"stage": "rendering"})
+        diagram_key, render_error = _render(uml_code, fmt)
+        if render_error:
+            yield _sse("failed", {"error": render_error})
+            return
+
+        yield _sse("done", _with_diagram_url({
+            **_delivery(fmt, diagram_key),
+            "plantuml": uml_code,
+            "cached": llm_info["cached"],
+            "saved_seconds": llm_info["saved_seconds"],
+            "tokens": tokens,
+            "generator": "local" if local else "llm",
+        }))
+    except Exception as e:
+        traceback.print_exc()
+        yield _sse("failed", {"error": str(e)})
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Several diagrams of one project
+# ────────────────────────────────────────────────────────────────────────────────
+MAX_BATCH_DIAGRAMS = 8
+
+
+def _batch_diagram(app, document_type: str, local: bool, shared: Dict,
+                   regenerate: bool, project_name: Optional[str], fmt: str) -> Dict:
+    """
+    One diagram of a batch, run in a worker thread: the generate_uml() fields, with
+    "diagram_key" instead of the URL, or {"error"}.
+    shared holds what every diagram of the batch reuses: the encoded export and
+    the project model of the local generator.
+    """
+    started = time.monotonic()
+    result = {"document_type": document_type}
+    try:
+        with app.app_context():
+            if local:
+                ai_reply = generate_local_plantuml(document_type, None, project_name, model=shared["model"])
+                llm_info = {"cached": False, "saved_seconds": 0.0}
+                tokens = {"mode": "local", "sent": 0}
+            else:
+                mode, file_name, export, metadata_text, tokens = shared["export"]
+                tokens = dict(tokens)
+                if mode == "single":
+                    ai_reply, llm_info = ask_for_plantuml(app, document_type, metadata_text, regenerate)
+                else:
+                    ai_reply, llm_info = _ask_model_in_parts(document_type, file_name, export, tokens, regenerate)
+            if ai_reply == "0":
+                result["error"] = "AI determined this is not a valid technical document"
+                return result
+
+            uml_code = sanitise_plantuml(ai_reply)
+            diagram_key, render_error = _render(uml_code, fmt)
+            if render_error:
+                result.update(error=render_error, plantuml=uml_code)
+                return result
+            result.update(_delivery(fmt, diagram_key))
+            result.update(
+                plantuml=uml_code,
+                cached=llm_info["cached"],
+                saved_seconds=llm_info["saved_seconds"],
+                tokens=tokens,
+                generator="local" if local else "llm",
+            )
+    except Exception as e:
+        traceback.print_exc()
+        result["error"] = str(e)
+    finally:
+        result["seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def iter_uml_batch(app, document_types: List[str], json_dir: str, regenerate: bool = False,
+                   mode: Optional[str] = None, user_name: Optional[str] = None,
+                   project_name: Optional[str] = None, fmt: str = "pdf"):
+    """
+    Generate several diagrams of one project at once; yields each result as it is
+    ready (not in request order), to be passed through _with_diagram_url().
+    The export is read and encoded once, the local generator's project model loaded
+    once, and at most UML_BATCH_CONCURRENCY diagrams are generated and rendered at
+    the same time, so the batch takes about as long as its slowest diagram.
+    A diagram that fails has an "error" and does not stop the others.
+    Needs no request context, so it can run in a background thread.
+    Raises ValueError for a batch that cannot run at all (unknown mode, project not analyzed).
+    """
+    with app.app_context():
+        mode = mode or app.config.get("LLM_GENERATION_MODE") or "auto"
+        if mode not in GENERATION_MODES:
+            raise ValueError(f"Unknown generation mode: {mode}")
+        plans, rejected = [], []
+        for document_type in dict.fromkeys(t.strip() for t in document_types if t.strip()):
+            _, local, mode_error = _generation_mode(document_type, mode)
+            if mode_error:
+                # Only this diagram cannot be drawn locally; the rest of the batch can.
+                rejected.append({"document_type": document_type, "error": mode_error})
+            else:
+                plans.append((document_type, local))
+
+        shared = {}
+        if any(local for _, local in plans):
+            shared["model"] = load_project_model(user_name, project_name)
+        if not all(local for _, local in plans):
+            shared["export"] = _encode_export(json_dir, mode)
+
+    yield from rejected
+    if not plans:
+        return
+
+    workers = max(1, min(len(plans), app.config.get("UML_BATCH_CONCURRENCY") or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_batch_diagram, app, document_type, local, shared, regenerate, project_name, fmt)
+            for document_type, local in plans
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def generate_uml_batch(document_types: List[str], json_dir: str, regenerate: bool = False,
+                       mode: Optional[str] = None, user_name: Optional[str] = None,
+                       project_name: Optional[str] = None, fmt: str = "pdf"):
+    """
+    All diagrams of iter_uml_batch() in one JSON response, in the order they were asked for.
+    """
+    if not document_types:
+        return jsonify({"error": "Please select at least one document type."}), 400
+    if len(document_types) > MAX_BATCH_DIAGRAMS:
+        return jsonify({"error": f"At most {MAX_BATCH_DIAGRAMS} diagrams can be generated at once."}), 400
+    if mode and mode not in GENERATION_MODES:
+        return jsonify({"error": f"Unknown generation mode: {mode}"}), 400
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unsupported diagram format: {fmt}"}), 400
+    started = time.monotonic()
+    try:
+        results = [
+            _with_diagram_url(result) for result in iter_uml_batch(
+                current_app._get_current_object(), document_types, json_dir, regenerate, mode, user_name, project_name, fmt
+            )
+        ]
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+    order = {document_type.strip(): index for index, document_type in enumerate(document_types)}
+    results.sort(key=lambda result: order.get(result["document_type"], len(order)))
+    return jsonify({"diagrams": results, "seconds": round(time.monotonic() - started, 3)})
+
+
+def stream_uml_batch(document_types: List[str], json_dir: str, regenerate: bool = False,
+                     mode: Optional[str] = None, user_name: Optional[str] = None,
+                     project_name: Optional[str] = None, fmt: str = "pdf", heartbeat: float = 15.0):
+    """
+    iter_uml_batch() as Server-Sent Events: a "diagram" event per finished diagram,
+    then "done" {"diagrams", "seconds"}, or "failed" {"error"}.
+    Must run inside the request context (stream_with_context).
+    """
+    started = time.monotonic()
+    if not document_types or len(document_types) > MAX_BATCH_DIAGRAMS:
+        yield _sse("failed", {"error": f"Please select 1 to {MAX_BATCH_DIAGRAMS} document types."})
+        return
+    if fmt not in FORMATS:
+        yield _sse("failed", {"error": f"Unsupported diagram format: {fmt}"})
+        return
+    try:
+        count = 0
+        results = iter_uml_batch(
+            current_app._get_current_object(), document_types, json_dir, regenerate, mode, user_name, project_name, fmt
+        )
+        for result in _with_keep_alive(results, heartbeat):
+            if result is None:
+                yield ": keep-alive\n\n"
+                continue
+            count += 1
+            yield _sse("diagram", _with_diagram_url(result))
+        yield _sse("done", {"diagrams": count, "seconds": round(time.monotonic() - started, 3)})
+    except Exception as e:
+        traceback.print_exc()
+        yield _sse("failed", {"error": str(e)})
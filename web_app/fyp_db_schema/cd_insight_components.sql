@@ -24,6 +24,7 @@ DROP TABLE IF EXISTS `components`;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `components` (
   `component_id` int NOT NULL AUTO_INCREMENT,
+  `project_id` int NOT NULL,
   `organization_id` int DEFAULT NULL,
   `component_name` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
   `component_type` enum('class','interface','service','controller','repository','utility') COLLATE utf8mb4_general_ci DEFAULT NULL,
@@ -31,6 +32,7 @@ CREATE TABLE `components` (
   `organization_type` varchar(45) DEFAULT NOT NULL,
   PRIMARY KEY (`component_id`),
   KEY `organization_id` (`organization_id`),
+  KEY `project_id` (`project_id`),
   CONSTRAINT `components_ibfk_1` FOREIGN KEY (`organization_id`) REFERENCES `organizations` (`organization_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -24,6 +24,7 @@ DROP TABLE IF EXISTS `methodparameters`;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `methodparameters` (
   `parameter_id` int NOT NULL AUTO_INCREMENT,
+  `project_id` int NOT NULL,
   `method_id` int DEFAULT NULL,
   `parameter_name` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
   `parameter_type` varchar(100) COLLATE utf8mb4_general_ci NOT NULL,
@@ -32,6 +33,7 @@ CREATE TABLE `methodparameters` (
   `description` text COLLATE utf8mb4_general_ci,
   PRIMARY KEY (`parameter_id`),
   KEY `method_id` (`method_id`),
+  KEY `project_id` (`project_id`),
   CONSTRAINT `methodparameters_ibfk_1` FOREIGN KEY (`method_id`) REFERENCES `methods` (`method_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -24,6 +24,7 @@ DROP TABLE IF EXISTS `methods`;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `methods` (
   `method_id` int NOT NULL AUTO_INCREMENT,
+  `project_id` int NOT NULL,
   `component_id` int DEFAULT NULL,
   `method_name` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
   `return_type` varchar(100) COLLATE utf8mb4_general_ci DEFAULT NULL,
@@ -32,6 +33,7 @@ CREATE TABLE `methods` (
   `description` text COLLATE utf8mb4_general_ci,
   PRIMARY KEY (`method_id`),
   KEY `component_id` (`component_id`),
+  KEY `project_id` (`project_id`),
   CONSTRAINT `methods_ibfk_1` FOREIGN KEY (`component_id`) REFERENCES `components` (`component_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -24,7 +24,7 @@ DROP TABLE IF EXISTS `organizations`;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `organizations` (
   `organization_id` int NOT NULL AUTO_INCREMENT,
-  `project_id` int DEFAULT NULL,
+  `project_id` int NOT NULL,
   `organization_name` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
   `organization_path` varchar(512) COLLATE utf8mb4_general_ci NOT NULL,
   `description` text COLLATE utf8mb4_general_ci,
@@ -24,6 +24,7 @@ DROP TABLE IF EXISTS `variables`;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `variables` (
   `variable_id` int NOT NULL AUTO_INCREMENT,
+  `project_id` int NOT NULL,
   `component_id` int DEFAULT NULL,
   `method_id` int DEFAULT NULL,
   `variable_name` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
@@ -36,6 +37,7 @@ CREATE TABLE `variables` (
   PRIMARY KEY (`variable_id`),
   KEY `component_id` (`component_id`),
   KEY `method_id` (`method_id`),
+  KEY `project_id` (`project_id`),
   CONSTRAINT `variables_ibfk_1` FOREIGN KEY (`component_id`) REFERENCES `components` (`component_id`),
   CONSTRAINT `variables_ibfk_2` FOREIGN KEY (`method_id`) REFERENCES `methods` (`method_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -24,6 +24,7 @@ DROP TABLE IF EXISTS `variableusages`;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `variableusages` (
   `usage_id` int NOT NULL AUTO_INCREMENT,
+  `project_id` int NOT NULL,
   `variable_id` int DEFAULT NULL,
   `component_id` int DEFAULT NULL,
   `method_id` int DEFAULT NULL,
@@ -33,6 +34,7 @@ CREATE TABLE `variableusages` (
   KEY `variable_id` (`variable_id`),
   KEY `component_id` (`component_id`),
   KEY `method_id` (`method_id`),
+  KEY `project_id` (`project_id`),
   CONSTRAINT `variableusages_ibfk_1` FOREIGN KEY (`variable_id`) REFERENCES `variables` (`variable_id`),
   CONSTRAINT `variableusages_ibfk_2` FOREIGN KEY (`component_id`) REFERENCES `components` (`component_id`),
   CONSTRAINT `variableusages_ibfk_3` FOREIGN KEY (`method_id`) REFERENCES `methods` (`method_id`)
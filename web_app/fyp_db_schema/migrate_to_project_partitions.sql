@@ -0,0 +1,82 @@
+-- Upgrade a cd_insight database created from the original schema dumps to the
+-- per-project layout: projects owned by a user, an indexed project_id on every
+-- analysis table, variableusages linked to its project and the filemanifest table.
+--
+-- Run it once, after a backup (ALTER TABLE is not transactional):
+--     mysql cd_insight < migrate_to_project_partitions.sql
+--
+-- Before projects existed every analysis replaced the previous one, so the
+-- analysis rows already in the database are those of a single project. They are
+-- kept as the project @legacy_project of @legacy_user; set both to the user and
+-- project that were analyzed last. Existing projects rows get @legacy_user as
+-- their owner. That project's next analysis replaces the migrated rows (it has no
+-- manifest yet, so it runs in full).
+
+SET @legacy_user = 'legacy';
+SET @legacy_project = 'legacy_project';
+
+-- projects: owner and one project name per owner
+ALTER TABLE `projects`
+  ADD COLUMN `user_name` varchar(255) COLLATE utf8mb4_general_ci NOT NULL DEFAULT '' AFTER `project_id`;
+UPDATE `projects` SET `user_name` = @legacy_user WHERE `user_name` = '';
+ALTER TABLE `projects`
+  ALTER COLUMN `user_name` DROP DEFAULT,
+  ADD UNIQUE KEY `unique_user_project` (`user_name`,`project_name`);
+
+INSERT INTO `projects` (`user_name`, `project_name`) VALUES (@legacy_user, @legacy_project)
+  ON DUPLICATE KEY UPDATE `project_id` = LAST_INSERT_ID(`project_id`);
+SET @legacy_project_id = LAST_INSERT_ID();
+
+-- organizations: project_id existed but was never written
+UPDATE `organizations` SET `project_id` = @legacy_project_id WHERE `project_id` IS NULL;
+ALTER TABLE `organizations` MODIFY `project_id` int NOT NULL;
+
+-- components: the project of their organization
+ALTER TABLE `components` ADD COLUMN `project_id` int DEFAULT NULL AFTER `component_id`;
+UPDATE `components`
+  LEFT JOIN `organizations` ON `organizations`.`organization_id` = `components`.`organization_id`
+  SET `components`.`project_id` = COALESCE(`organizations`.`project_id`, @legacy_project_id);
+ALTER TABLE `components` MODIFY `project_id` int NOT NULL, ADD KEY `project_id` (`project_id`);
+
+-- methods: the project of their component
+ALTER TABLE `methods` ADD COLUMN `project_id` int DEFAULT NULL AFTER `method_id`;
+UPDATE `methods`
+  LEFT JOIN `components` ON `components`.`component_id` = `methods`.`component_id`
+  SET `methods`.`project_id` = COALESCE(`components`.`project_id`, @legacy_project_id);
+ALTER TABLE `methods` MODIFY `project_id` int NOT NULL, ADD KEY `project_id` (`project_id`);
+
+-- methodparameters: the project of their method
+ALTER TABLE `methodparameters` ADD COLUMN `project_id` int DEFAULT NULL AFTER `parameter_id`;
+UPDATE `methodparameters`
+  LEFT JOIN `methods` ON `methods`.`method_id` = `methodparameters`.`method_id`
+  SET `methodparameters`.`project_id` = COALESCE(`methods`.`project_id`, @legacy_project_id);
+ALTER TABLE `methodparameters` MODIFY `project_id` int NOT NULL, ADD KEY `project_id` (`project_id`);
+
+-- variables: the project of their component
+ALTER TABLE `variables` ADD COLUMN `project_id` int DEFAULT NULL AFTER `variable_id`;
+UPDATE `variables`
+  LEFT JOIN `components` ON `components`.`component_id` = `variables`.`component_id`
+  SET `variables`.`project_id` = COALESCE(`components`.`project_id`, @legacy_project_id);
+ALTER TABLE `variables` MODIFY `project_id` int NOT NULL, ADD KEY `project_id` (`project_id`);
+
+-- variableusages: the project of their variable
+ALTER TABLE `variableusages` ADD COLUMN `project_id` int DEFAULT NULL AFTER `usage_id`;
+UPDATE `variableusages`
+  LEFT JOIN `variables` ON `variables`.`variable_id` = `variableusages`.`variable_id`
+  SET `variableusages`.`project_id` = COALESCE(`variables`.`project_id`, @legacy_project_id);
+ALTER TABLE `variableusages` MODIFY `project_id` int NOT NULL, ADD KEY `project_id` (`project_id`);
+
+-- filemanifest: new, as in cd_insight_filemanifest.sql
+CREATE TABLE IF NOT EXISTS `filemanifest` (
+  `manifest_id` int NOT NULL AUTO_INCREMENT,
+  `project_id` int NOT NULL,
+  `entry_type` enum('file','organization') COLLATE utf8mb4_general_ci NOT NULL,
+  `relative_path` varchar(512) COLLATE utf8mb4_general_ci NOT NULL,
+  `file_size` bigint DEFAULT NULL,
+  `file_mtime_ns` bigint DEFAULT NULL,
+  `content_hash` char(64) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  `analyzer_version` varchar(32) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  `row_id` int DEFAULT NULL,
+  PRIMARY KEY (`manifest_id`),
+  KEY `project_id` (`project_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,57 @@
+import sys
+import os
+from contextlib import contextmanager
+from typing import List, Sequence
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+# Rows per INSERT statement; keeps each statement well below max_allowed_packet.
+BULK_CHUNK_SIZE = 500
+
+@contextmanager
+def transaction(db, commit=True):
+    """
+    Run the enclosed statements in one transaction.
+    With commit=False the caller owns the transaction and nothing is started or committed here.
+    """
+    if not commit:
+        yield
+        return
+    db.begin()
+    try:
+        yield
+    except Exception:
+        db.rollback()
+        raise
+    db.commit()
+
+def _auto_increment_step(cursor):
+    # Read once per cursor; the session variable does not change under us.
+    step = getattr(cursor, "_auto_increment_step", None)
+    if step is None:
+        cursor.execute("SELECT @@auto_increment_increment AS step")
+        result = cursor.fetchone()
+        step = int(result["step"]) if result else 1
+        cursor._auto_increment_step = step
+    return step
+
+def insert_rows(cursor, table: str, columns: Sequence[str], rows: Sequence[Sequence], chunk_size: int = BULK_CHUNK_SIZE) -> List[int]:
+    """
+    Insert rows with multi-row INSERT statements and return the generated IDs in row order.
+
+    A multi-row INSERT ... VALUES is a "simple insert" for InnoDB, so the IDs it generates
+    are consecutive (in steps of auto_increment_increment) starting from LAST_INSERT_ID().
+    """
+    if not rows:
+        return []
+
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    column_list = ", ".join(columns)
+    step = _auto_increment_step(cursor)
+    ids = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        sql = f"INSERT INTO {table} ({column_list}) VALUES " + ", ".join([placeholders] * len(chunk))
+        cursor.execute(sql, [value for row in chunk for value in row])
+        first_id = cursor.lastrowid
+        ids.extend(range(first_id, first_id + step * len(chunk), step))
+    return ids
@@ -2,71 +2,68 @@ import pymysql
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-from flask import current_app
-def insert_components(analyzed_class):
-    db = current_app.config["db"]
-    cursor = current_app.config["cursor"]
+from web_app.model.db_session import get_db, get_cursor
+from web_app.model.bulk_model import insert_rows, transaction
+def insert_components(analyzed_class, symbols, commit=True):
+    db = get_db()
+    cursor = get_cursor()
     """
     Insert component information into the database
-    Links components with their organizations if they exist
+    Links components with the organization of their directory, resolved from
+    the SymbolTable of the current run, and registers the new component_ids there.
+    Returns the generated component_ids, in insertion order
     """
     if not analyzed_class.get("components"):
-        return
+        return []
 
     if cursor is None:
         print("Failed to establish database connection")
-        return
+        return []
 
     try:
         file_location=analyzed_class["file_location"]
+        organization_id = symbols.organization_id(file_location)
+        rows = []
         for component in analyzed_class["components"]:
             component_name = component.get("component_name")
             component_type = component.get("component_type")
             description = component.get("description")
-            organization_name = component.get("organization_name")
             # Skip if required fields are missing
             if not all([component_name, component_type]):
                 continue
 
-            # Get organization_id if organization_name exists
-            organization_id = None
-            if organization_name:
-                cursor.execute(
-                    "SELECT organization_id FROM organizations WHERE organization_name = %s",
-                    (organization_name,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    organization_id = result['organization_id']
-                    print(f"📂 Found organization_id {organization_id} for {organization_name}")
-                else:
-                    print(f"⚠️ Organization '{organization_name}' not found in database")
+            # organization_id stays NULL when the directory is not an organization
+            rows.append((symbols.project_id, component_name, component_type, description, organization_id, file_location))
 
-            # Insert component with organization_id if available
-            if organization_id:
-                sql = """
-                    INSERT INTO components 
-                    (component_name, component_type, description, organization_id,file_location) 
-                    VALUES (%s, %s, %s, %s,%s)
-                """
-                values = (component_name, component_type, description, organization_id,file_location)
-            else:
-                sql = """
-                    INSERT INTO components 
-                    (component_name, component_type, description,file_location) 
-                    VALUES (%s, %s, %s,%s)
-                """
-                values = (component_name, component_type, description,file_location)
-            
-            cursor.execute(sql, values)
-            db.commit()
-            print(f"✅ Component '{component_name}' inserted successfully")
+        with transaction(db, commit):
+            component_ids = insert_rows(
+                cursor, "components",
+                ("project_id", "component_name", "component_type", "description", "organization_id", "file_location"),
+                rows
+            )
+        for component_id in component_ids:
+            symbols.add_component(file_location, component_id)
+        print(f"✅ {len(component_ids)} components inserted successfully")
+        return component_ids
 
     except pymysql.Error as err:
         print(f"❌ Database error in insert_components: {err}")
-        db.rollback()
         raise
     except Exception as e:
         print(f"❌ Unexpected error in insert_components: {e}")
-        db.rollback()
         raise
+
+def set_components_organization(component_ids, organization_id, commit=True):
+    """
+    Attach already stored components to an organization.
+    """
+    if not component_ids:
+        return
+    db = get_db()
+    cursor = get_cursor()
+    placeholders = ", ".join(["%s"] * len(component_ids))
+    with transaction(db, commit):
+        cursor.execute(
+            f"UPDATE components SET organization_id = %s WHERE component_id IN ({placeholders})",
+            (organization_id, *component_ids)
+        )
@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from flask import current_app, g
+
+def get_db():
+    """
+    Connection of the current app context, checked out of the pool on first use
+    and returned to it when the context ends (see release_db).
+    """
+    if "db" not in g:
+        g.db = current_app.config["db_pool"].acquire()
+    return g.db
+
+def get_cursor():
+    """
+    Cursor on the connection of the current app context.
+    """
+    if "cursor" not in g:
+        g.cursor = get_db().cursor()
+    return g.cursor
+
+def release_db(exception=None):
+    """
+    Teardown handler: close the context's cursor and give its connection back to the pool.
+    """
+    cursor = g.pop("cursor", None)
+    db = g.pop("db", None)
+    if cursor is not None:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+    if db is not None:
+        current_app.config["db_pool"].release(db)
@@ -1,61 +1,111 @@
 import pymysql
 import sys
 import os
-from flask import current_app
+from web_app.model.db_session import get_db, get_cursor
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
-def prepare_json():
+# Export key -> table, in the order the tables appear in the export.
+EXPORT_TABLES = {
+    'organizations': 'organizations',
+    'components': 'components',
+    'methods': 'methods',
+    'method_parameters': 'methodparameters',
+    'variables': 'variables'
+}
+# Exported only on request: usages outnumber variables by about ten to one.
+USAGE_EXPORT_TABLES = {
+    'variable_usages': 'variableusages'
+}
+
+def export_tables(include_usages=False):
+    """
+    Export key -> table of an export, with the variable usages when include_usages is set.
+    """
+    if include_usages:
+        return {**EXPORT_TABLES, **USAGE_EXPORT_TABLES}
+    return EXPORT_TABLES
+
+def prepare_json(project_id, include_usages=False):
     error_msg=[]
     """
-    Fetch all data from components, methods, method parameters, and variables tables
+    Fetch one project's data from the organizations, components, methods, method parameters
+    and variables tables (and variable usages with include_usages), reading only its rows
+    through the project_id indexes
     Returns a dictionary containing all the data
     """
-    db = current_app.config["db"]
-    cursor = current_app.config["cursor"]
-
+    db = get_db()
+    cursor = get_cursor()
 
-    all_data = {
-        'organizations':[],
-        'components': [],
-        'methods': [],
-        'method_parameters': [],
-        'variables': []
-    }
 
-    tables = {
-        'organizations':'organizations',
-        'components': 'components',
-        'methods': 'methods',
-        'method_parameters': 'methodparameters',
-        'variables': 'variables'
-    }
+    tables = export_tables(include_usages)
+    all_data = {key: [] for key in tables}
 
     try:
         for key, table in tables.items():
             try:
-                cursor.execute(f"SELECT * FROM {table}")
+                cursor.execute(f"SELECT * FROM {table} WHERE project_id = %s", (project_id,))
                 columns = [col[0] for col in cursor.description]
                 rows = cursor.fetchall()
                 
                 # If using regular cursor
-                if isinstance(rows[0], tuple):
+                if rows and isinstance(rows[0], tuple):
                     all_data[key] = [dict(zip(columns, row)) for row in rows]
                 # If using DictCursor
                 else:
-                    all_data[key] = rows
+                    all_data[key] = list(rows)
+                # project_id is the same on every row; leave it out of the export
+                for row in all_data[key]:
+                    row.pop("project_id", None)
 
                 print(f"✅ Successfully fetched {len(rows)} records from {table}")
                 
             except pymysql.Error as e:
-                error_msg.extend(f"Error fetching from {table}: {e}")
+                error_msg.append(f"Error fetching from {table}: {e}")
                 all_data[key] = []
 
         return all_data,error_msg
 
     except Exception as e:
-        error_msg.extend(f"Unexpected error: {e}")
+        error_msg.append(f"Unexpected error: {e}")
         return all_data,error_msg
 
+def export_table_columns(project_id, include_usages=False):
+    """
+    (key, table, columns, field_types) of every export table holding rows of the project,
+    project_id left out of the columns; field_types are the pymysql FIELD_TYPE codes.
+    The variableusages table is only included with include_usages.
+    Reads at most one row per table.
+    """
+    cursor = get_cursor()
+    result = []
+    for key, table in export_tables(include_usages).items():
+        cursor.execute(f"SELECT * FROM {table} WHERE project_id = %s LIMIT 1", (project_id,))
+        if cursor.fetchone() is None:
+            continue
+        description = [col for col in cursor.description if col[0] != "project_id"]
+        result.append((key, table, [col[0] for col in description], [col[1] for col in description]))
+    return result
+
+def iter_table_rows(project_id, table, columns, batch_size=1000):
+    """
+    Yield the project's rows of one table as tuples in `columns` order.
+    Rows come through a server-side (unbuffered) cursor, so only batch_size of them
+    are in memory at a time. The connection can run no other query until the
+    generator is exhausted or closed.
+    """
+    cursor = get_db().cursor(pymysql.cursors.SSCursor)
+    try:
+        column_list = ", ".join(f"`{column}`" for column in columns)
+        cursor.execute(f"SELECT {column_list} FROM {table} WHERE project_id = %s", (project_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        # Closing an unbuffered cursor reads off whatever rows are left.
+        cursor.close()
+
 def print_formatted_data(data):
     """Helper function to print the data in a readable format"""
     if not data:
@@ -70,5 +120,5 @@ def print_formatted_data(data):
                 print(f"  {key}: {value}")
 
 if __name__ =="__main__":
-    data = prepare_json()
+    data = prepare_json(1)
     print_formatted_data(data)
\ No newline at end of file
@@ -0,0 +1,152 @@
+import pymysql
+import sys
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.model.db_session import get_db, get_cursor
+from web_app.model.bulk_model import transaction
+
+@dataclass
+class ManifestEntry:
+    relative_path: str
+    file_size: Optional[int] = None
+    file_mtime_ns: Optional[int] = None
+    content_hash: Optional[str] = None
+    analyzer_version: Optional[str] = None
+    row_id: Optional[int] = None          # component_id of a file, organization_id of a folder
+
+class ProjectManifest:
+    """
+    What the last analysis of a project stored: every analyzed file with its size,
+    mtime, content hash and component, and every organization folder with its id.
+    Rows live in the filemanifest table so they are written in the same transaction
+    as the analysis rows they describe.
+    """
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self.files: Dict[str, ManifestEntry] = {}
+        self.organizations: Dict[str, ManifestEntry] = {}
+
+    def load(self):
+        cursor = get_cursor()
+        cursor.execute(
+            """
+            SELECT entry_type, relative_path, file_size, file_mtime_ns, content_hash, analyzer_version, row_id
+            FROM filemanifest WHERE project_id = %s
+            """,
+            (self.project_id,)
+        )
+        for row in cursor.fetchall():
+            entry = ManifestEntry(
+                relative_path=row["relative_path"],
+                file_size=row["file_size"],
+                file_mtime_ns=row["file_mtime_ns"],
+                content_hash=row["content_hash"],
+                analyzer_version=row["analyzer_version"],
+                row_id=row["row_id"]
+            )
+            entries = self.files if row["entry_type"] == "file" else self.organizations
+            entries[entry.relative_path] = entry
+        return self
+
+    def _delete_entries(self, entry_type: str, relative_paths: Iterable[str]):
+        cursor = get_cursor()
+        relative_paths = list(relative_paths)
+        if relative_paths:
+            placeholders = ", ".join(["%s"] * len(relative_paths))
+            cursor.execute(
+                f"""
+                DELETE FROM filemanifest
+                WHERE project_id = %s AND entry_type = %s AND relative_path IN ({placeholders})
+                """,
+                (self.project_id, entry_type, *relative_paths)
+            )
+
+    def record(self, entry_type: str, entries: Iterable[ManifestEntry]):
+        """
+        Insert or replace manifest rows. Runs inside the caller's transaction.
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        cursor = get_cursor()
+        self._delete_entries(entry_type, (entry.relative_path for entry in entries))
+        cursor.executemany(
+            """
+            INSERT INTO filemanifest
+            (project_id, entry_type, relative_path, file_size, file_mtime_ns,
+             content_hash, analyzer_version, row_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [
+                (self.project_id, entry_type, entry.relative_path, entry.file_size,
+                 entry.file_mtime_ns, entry.content_hash, entry.analyzer_version, entry.row_id)
+                for entry in entries
+            ]
+        )
+        target = self.files if entry_type == "file" else self.organizations
+        for entry in entries:
+            target[entry.relative_path] = entry
+
+    def forget(self, entry_type: str, relative_paths: Iterable[str]):
+        """
+        Remove manifest rows. Runs inside the caller's transaction.
+        """
+        relative_paths = list(relative_paths)
+        self._delete_entries(entry_type, relative_paths)
+        target = self.files if entry_type == "file" else self.organizations
+        for relative_path in relative_paths:
+            target.pop(relative_path, None)
+
+def delete_component_rows(component_ids, commit=True):
+    """
+    Delete the analysis rows of the given components: their variable usages,
+    variables, methods, method parameters and the components themselves.
+    """
+    component_ids = [component_id for component_id in component_ids if component_id]
+    if not component_ids:
+        return
+
+    db = get_db()
+    cursor = get_cursor()
+    placeholders = ", ".join(["%s"] * len(component_ids))
+    try:
+        with transaction(db, commit):
+            cursor.execute(f"DELETE FROM variableusages WHERE component_id IN ({placeholders})", component_ids)
+            cursor.execute(f"DELETE FROM variables WHERE component_id IN ({placeholders})", component_ids)
+            cursor.execute(
+                f"""
+                DELETE methodparameters FROM methodparameters
+                JOIN methods ON methods.method_id = methodparameters.method_id
+                WHERE methods.component_id IN ({placeholders})
+                """,
+                component_ids
+            )
+            cursor.execute(f"DELETE FROM methods WHERE component_id IN ({placeholders})", component_ids)
+            cursor.execute(f"DELETE FROM components WHERE component_id IN ({placeholders})", component_ids)
+    except pymysql.Error as err:
+        print(f"❌ Database error in delete_component_rows: {err}")
+        raise
+
+def delete_organization_rows(organization_ids, commit=True):
+    """
+    Delete organizations, detaching any component that still points at them.
+    """
+    organization_ids = [organization_id for organization_id in organization_ids if organization_id]
+    if not organization_ids:
+        return
+
+    db = get_db()
+    cursor = get_cursor()
+    placeholders = ", ".join(["%s"] * len(organization_ids))
+    try:
+        with transaction(db, commit):
+            cursor.execute(
+                f"UPDATE components SET organization_id = NULL WHERE organization_id IN ({placeholders})",
+                organization_ids
+            )
+            cursor.execute(f"DELETE FROM organizations WHERE organization_id IN ({placeholders})", organization_ids)
+    except pymysql.Error as err:
+        print(f"❌ Database error in delete_organization_rows: {err}")
+        raise
@@ -1,24 +1,34 @@
 import pymysql
 import sys
 import os
-from flask import current_app
+from web_app.model.db_session import get_db, get_cursor
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.model.bulk_model import insert_rows, transaction
 
-def insert_method(analyzed_method):
+def insert_method(analyzed_method, file_location, symbols, commit=True):
     """
-    Insert method and its parameters into the database
+    Insert methods and their parameters into the database
+    Methods are written with multi-row inserts; the generated method_ids
+    are then used for the methodparameters rows.
     Args:
         analyzed_method: Dictionary containing method information
-        db: Database connection
-        cursor: Database cursor
+        file_location: File the methods were found in; its component owns them
+        symbols: SymbolTable of the current analysis run; receives the new method_ids
+        commit: Commit in a transaction of its own; pass False when the caller owns the transaction
+    Returns:
+        List of the generated method_ids, in insertion order
     """
     if not analyzed_method.get("methods"):
-        return
+        return []
+
+    db = get_db()
+    cursor = get_cursor()
 
-    db = current_app.config["db"]
-    cursor = current_app.config["cursor"]
-            
     try:
+        component_id = symbols.component_id(file_location)
+        method_rows = []
+        method_keys = []
+        method_parameters = []
         for method in analyzed_method["methods"]:
             # Extract method details with default values
             method_details = {
@@ -36,90 +46,64 @@ def insert_method(analyzed_method):
                 print("❌ Skipping method: Missing method name")
                 continue
 
-            # Get component_id if location exists
-            component_id = None
-            if method_details['location']:
-                cursor.execute(
-                    "SELECT component_id FROM components WHERE component_name = %s",
-                    (method_details['location'],)
-                )
-                result = cursor.fetchone()
-                component_id = result['component_id'] if result else None
-
-            # Prepare method insertion
-            if component_id:
-                sql = """
-                    INSERT INTO methods 
-                    (component_id, return_type, visibility, is_static, description, method_name) 
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                values = (
-                    component_id,
-                    method_details['return_type'],
-                    method_details['visibility'],
-                    method_details['is_static'],
-                    method_details['description'],
-                    method_details['method_name']
-                )
-            else:
-                sql = """
-                    INSERT INTO methods 
-                    (return_type, visibility, is_static, description, method_name) 
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                values = (
-                    method_details['return_type'],
-                    method_details['visibility'],
-                    method_details['is_static'],
-                    method_details['description'],
-                    method_details['method_name']
-                )
-
-            # Insert method
-            cursor.execute(sql, values)
-            db.commit()
-            print(f"✅ Method '{method_details['method_name']}' inserted successfully")
+            method_rows.append((
+                symbols.project_id,
+                component_id,
+                method_details['return_type'],
+                method_details['visibility'],
+                method_details['is_static'],
+                method_details['description'],
+                method_details['method_name']
+            ))
+            method_keys.append((method_details['location'], method_details['method_name']))
+            method_parameters.append(method_details['parameters'])
 
-            # Get the last inserted method_id
-            method_id = cursor.lastrowid
+        with transaction(db, commit):
+            method_ids = insert_rows(
+                cursor, "methods",
+                ("project_id", "component_id", "return_type", "visibility", "is_static", "description", "method_name"),
+                method_rows
+            )
+            for (location, method_name), method_id in zip(method_keys, method_ids):
+                symbols.add_method(file_location, location, method_name, method_id)
 
-            # Insert parameters
-            for param in method_details['parameters']:
-                param_details = {
-                    'name': param.get('parameter_name'),
-                    'type': param.get('parameter_type'),
-                    'required': param.get('is_required', True),
-                    'default': param.get('default_value'),
-                    'description': param.get('description')
-                }
+            # Parameters of every method, linked through the generated method_ids
+            parameter_rows = []
+            for method_id, parameters in zip(method_ids, method_parameters):
+                for param in parameters:
+                    param_details = {
+                        'name': param.get('parameter_name'),
+                        'type': param.get('parameter_type'),
+                        'required': param.get('is_required', True),
+                        'default': param.get('default_value'),
+                        'description': param.get('description')
+                    }
 
-                # Skip if parameter name is missing
-                if not param_details['name']:
-                    continue
+                    # Skip if parameter name is missing
+                    if not param_details['name']:
+                        continue
 
-                sql = """
-                    INSERT INTO methodparameters 
-                    (method_id, parameter_name, parameter_type, is_required, default_value, description) 
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                values = (
-                    method_id,
-                    param_details['name'],
-                    param_details['type'],
-                    param_details['required'],
-                    param_details['default'],
-                    param_details['description']
-                )
+                    parameter_rows.append((
+                        symbols.project_id,
+                        method_id,
+                        param_details['name'],
+                        param_details['type'],
+                        param_details['required'],
+                        param_details['default'],
+                        param_details['description']
+                    ))
 
-                cursor.execute(sql, values)
-                db.commit()
-                print(f"✅ Parameter '{param_details['name']}' inserted for method '{method_details['method_name']}'")
+            insert_rows(
+                cursor, "methodparameters",
+                ("project_id", "method_id", "parameter_name", "parameter_type", "is_required", "default_value", "description"),
+                parameter_rows
+            )
+        print(f"✅ {len(method_ids)} methods and {len(parameter_rows)} parameters inserted successfully")
+        return method_ids
 
     except pymysql.Error as err:
         print(f"❌ Database error: {err}")
-        db.rollback()
         raise
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
-        db.rollback()
         raise
@@ -2,25 +2,30 @@ import pymysql
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-from flask import current_app
+from web_app.model.db_session import get_db, get_cursor
+from web_app.model.bulk_model import insert_rows, transaction
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
-def insert_organization(analyzed_organization):
+def insert_organization(analyzed_organization, symbols, commit=True):
     """
     Insert organizations into the database
     Args:
         analyzed_organization: Dictionary containing organization information
-        db: Database connection
-        cursor: Database cursor
+        symbols: SymbolTable of the current analysis run; receives the new organization_ids
+        commit: Commit in a transaction of its own; pass False when the caller owns the transaction
+    Returns:
+        List of the generated organization_ids, in insertion order
     """
     if not analyzed_organization.get("organizations"):
-        return
+        return []
+
+    db = get_db()
+    cursor = get_cursor()
 
-    db = current_app.config["db"]
-    cursor = current_app.config["cursor"]
-            
     try:
+        rows = []
+        paths = []
         for organization in analyzed_organization["organizations"]:
             # Extract organization details with default values
             organization_details = {
@@ -34,29 +39,29 @@ def insert_organization(analyzed_organization):
                 print("❌ Skipping organization: Missing organization name")
                 continue
 
-            # Prepare organization insertion
-            sql = """
-                INSERT INTO organizations 
-                (organization_name, organization_path,organization_type) 
-                VALUES (%s, %s, %s)
-            """
-            values = (
+            rows.append((
+                symbols.project_id,
                 organization_details['organization_name'],
                 organization_details['organization_path'],
                 organization_details['organization_type']
-            )
+            ))
+            paths.append(organization_details['organization_path'])
 
-            # Insert organization
-            cursor.execute(sql, values)
-            db.commit()
-            print(f"✅ Organization '{organization_details['organization_name']}' inserted successfully")
+        # Insert all organizations in one transaction
+        with transaction(db, commit):
+            organization_ids = insert_rows(
+                cursor, "organizations",
+                ("project_id", "organization_name", "organization_path", "organization_type"),
+                rows
+            )
+        for path, organization_id in zip(paths, organization_ids):
+            symbols.add_organization(path, organization_id)
+        print(f"✅ {len(organization_ids)} organizations inserted successfully")
+        return organization_ids
 
     except pymysql.Error as err:
         print(f"❌ Database error: {err}")
-        db.rollback()
         raise
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
-        db.rollback()
         raise
-
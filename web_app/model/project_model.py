@@ -0,0 +1,58 @@
+import pymysql
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from web_app.model.db_session import get_db, get_cursor
+from web_app.model.bulk_model import transaction
+
+# Tables holding analysis rows, children first so foreign keys never block a delete.
+PROJECT_TABLES = ("variableusages", "variables", "methodparameters", "methods", "components", "organizations", "filemanifest")
+
+def get_or_create_project(user_name, project_name):
+    """
+    project_id of a user's project, inserting the projects row on first use.
+    """
+    cursor = get_cursor()
+    try:
+        # LAST_INSERT_ID(project_id) makes lastrowid the existing id when the row is already there.
+        cursor.execute(
+            """
+            INSERT INTO projects (user_name, project_name) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE project_id = LAST_INSERT_ID(project_id)
+            """,
+            (user_name, project_name)
+        )
+        return cursor.lastrowid
+    except pymysql.Error as err:
+        print(f"❌ Database error in get_or_create_project: {err}")
+        raise
+
+def find_project(user_name, project_name):
+    """
+    project_id of a user's project, or None if it was never analyzed.
+    """
+    cursor = get_cursor()
+    cursor.execute(
+        "SELECT project_id FROM projects WHERE user_name = %s AND project_name = %s",
+        (user_name, project_name)
+    )
+    result = cursor.fetchone()
+    return result["project_id"] if result else None
+
+def delete_project_rows(project_id, delete_project=False, commit=True):
+    """
+    Delete every analysis row of one project (and its manifest) through the
+    project_id indexes; other projects are not touched.
+    With delete_project, the projects row itself goes too.
+    """
+    db = get_db()
+    cursor = get_cursor()
+    try:
+        with transaction(db, commit):
+            for table in PROJECT_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE project_id = %s", (project_id,))
+            if delete_project:
+                cursor.execute("DELETE FROM projects WHERE project_id = %s", (project_id,))
+    except pymysql.Error as err:
+        print(f"❌ Database error in delete_project_rows: {err}")
+        raise
@@ -0,0 +1,46 @@
+import sys
+import os
+from typing import Dict, Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+class SymbolTable:
+    """
+    IDs of the rows written during one analysis run, keyed by qualified name,
+    so that foreign keys are resolved from memory instead of by a SELECT per row.
+    project_id is the project every row of the run belongs to.
+
+      organizations: organization path relative to the project root
+      components:    file location (one component per file)
+      methods:       (file location, class name or "global", method name)
+    """
+    def __init__(self, root_folder: Optional[str] = None, project_id: Optional[int] = None):
+        self.root_folder = root_folder
+        self.project_id = project_id
+        self.organizations: Dict[str, int] = {}
+        self.components: Dict[str, int] = {}
+        self.methods: Dict[Tuple[str, str, str], int] = {}
+
+    def add_organization(self, organization_path: str, organization_id: int):
+        self.organizations[organization_path] = organization_id
+
+    def organization_id(self, file_location: str) -> Optional[int]:
+        """
+        Organization of the directory holding file_location, if that directory is one.
+        """
+        if self.root_folder is None:
+            return None
+        folder = os.path.relpath(os.path.dirname(file_location), self.root_folder)
+        return self.organizations.get(folder)
+
+    def add_component(self, file_location: str, component_id: int):
+        self.components.setdefault(file_location, component_id)
+
+    def component_id(self, file_location: str) -> Optional[int]:
+        return self.components.get(file_location)
+
+    def add_method(self, file_location: str, location: str, method_name: str, method_id: int):
+        # The first definition wins when a name is redefined (e.g. property setters).
+        self.methods.setdefault((file_location, location or "global", method_name), method_id)
+
+    def method_id(self, file_location: str, location: Optional[str], method_name: str) -> Optional[int]:
+        return self.methods.get((file_location, location or "global", method_name))
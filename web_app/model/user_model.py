@@ -3,11 +3,11 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
-from flask import current_app
+from web_app.model.db_session import get_db, get_cursor
 
 def login_verification(user_name, user_pwd):
-    db = current_app.config["db"]
-    cursor = current_app.config["cursor"]
+    db = get_db()
+    cursor = get_cursor()
 
     if(user_name == None or user_pwd == None):
         return False
@@ -2,32 +2,78 @@ import pymysql
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-from flask import current_app
-def insert_variable(analyzed_variable):
+from web_app.model.db_session import get_db, get_cursor
+from web_app.model.bulk_model import insert_rows, transaction
+
+def _enum_value(value):
+    # Enums from the analyzer, their plain values from the analysis cache
+    return getattr(value, 'value', value)
+
+class _VariableIndex:
+    """
+    variable_id of the variable a usage refers to, from the variables just inserted
+    for the file. A name is looked up in the usage's own method first, then among
+    its class's attributes (self.<name> assigned in any method of the class, or a
+    class attribute), then at module level. The first declaration of a name wins.
+    """
+    def __init__(self):
+        self.declared = {}
+        self.instance_attributes = {}
+
+    def add(self, component_name, method_name, variable_name, variable_id):
+        self.declared.setdefault((component_name, method_name, variable_name), variable_id)
+        if component_name and variable_name.startswith('self.'):
+            self.instance_attributes.setdefault((component_name, variable_name), variable_id)
+
+    def resolve(self, component_name, method_name, variable_name):
+        variable_id = self.declared.get((component_name, method_name, variable_name))
+        if variable_id is None and component_name:
+            if variable_name.startswith('self.'):
+                variable_id = (self.instance_attributes.get((component_name, variable_name))
+                               or self.declared.get((component_name, None, variable_name[len('self.'):])))
+            else:
+                variable_id = self.declared.get((component_name, None, variable_name))
+        if variable_id is None:
+            variable_id = self.declared.get((None, None, variable_name))
+        return variable_id
+
+def insert_variable(analyzed_variable, file_location, symbols, commit=True):
     """
-    Insert variables into the database
+    Insert variables and their usages into the database
+    Component and method IDs are resolved from the SymbolTable of the current run;
+    usages are linked to the generated variable_ids in memory (see _VariableIndex)
+    and written with multi-row inserts like the variables. Usages of names that are
+    not variables of the file (builtins, imports, functions) are not stored.
     Args:
-        analyzed_variable: Dictionary containing variable information
-        db: Database connection
-        cursor: Database cursor
+        analyzed_variable: Dictionary containing variable and usage information
+        file_location: File the variables were found in; its component owns them
+        symbols: SymbolTable of the current analysis run
+        commit: Commit in a transaction of its own; pass False when the caller owns the transaction
+    Returns:
+        List of the generated variable_ids, in insertion order
     """
-    db = current_app.config["db"]
-    cursor = current_app.config["cursor"]
+    db = get_db()
+    cursor = get_cursor()
 
     if not analyzed_variable.get("variables"):
         print("⚠️ No variables to insert")
-        return
-        
+        return []
+
     try:
+        component_id = symbols.component_id(file_location)
+        rows = []
+        keys = []
         for variable in analyzed_variable["variables"]:
+            # Scope is a Scope enum from the analyzer and its plain value from the analysis cache
+            scope = _enum_value(variable.get('scope'))
             # Extract variable details with default values
             var_details = {
                 'name': variable.get('variable_name'),
                 'type': variable.get('variable_type'),
-                'scope': variable.get('scope').value if variable.get('scope') else None,
+                'scope': scope or None,
                 'is_constant': variable.get('is_constant', False),
                 'is_static': variable.get('is_static', False),
-                'visibility': variable.get('visibility'),
+                'visibility': _enum_value(variable.get('visibility')),
                 'description': variable.get('description'),
                 'component_name': variable.get('component_name'),
                 'method_name': variable.get('method_name'),
@@ -40,35 +86,15 @@ def insert_variable(analyzed_variable):
                 print("❌ Skipping variable: Missing variable name")
                 continue
 
-            # Get component_id if component_name exists
-            component_id = None
-            if var_details['component_name']:
-                cursor.execute(
-                    "SELECT component_id FROM components WHERE component_name = %s",
-                    (var_details['component_name'],)
-                )
-                result = cursor.fetchone()
-                component_id = result['component_id'] if result else None
-
-            # Get method_id if method_name exists
+            # Get method_id of the enclosing method, qualified by file and class
             method_id = None
             if var_details['method_name']:
-                cursor.execute(
-                    "SELECT method_id FROM methods WHERE method_name = %s",
-                    (var_details['method_name'],)
+                method_id = symbols.method_id(
+                    file_location, var_details['component_name'], var_details['method_name']
                 )
-                result = cursor.fetchone()
-                method_id = result['method_id'] if result else None
 
-            # Insert variable
-            sql = """
-                INSERT INTO variables
-                (component_id, method_id, variable_name, variable_type, 
-                 scope, is_constant, is_static, visibility, description)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            values = (
+            rows.append((
+                symbols.project_id,
                 component_id,
                 method_id,
                 var_details['name'],
@@ -78,21 +104,49 @@ def insert_variable(analyzed_variable):
                 var_details['is_static'],
                 var_details['visibility'],
                 var_details['description']
+            ))
+            keys.append((var_details['component_name'], var_details['method_name'], var_details['name']))
+
+        with transaction(db, commit):
+            variable_ids = insert_rows(
+                cursor, "variables",
+                ("project_id", "component_id", "method_id", "variable_name", "variable_type",
+                 "scope", "is_constant", "is_static", "visibility", "description"),
+                rows
+            )
+            index = _VariableIndex()
+            for (component_name, method_name, name), variable_id in zip(keys, variable_ids):
+                index.add(component_name, method_name, name, variable_id)
+
+            usage_rows = []
+            for usage in analyzed_variable.get("usages", []):
+                variable_id = index.resolve(
+                    usage.get('component_name'), usage.get('method_name'), usage.get('variable_name')
+                )
+                if variable_id is None:
+                    continue
+                method_id = None
+                if usage.get('method_name'):
+                    method_id = symbols.method_id(file_location, usage.get('component_name'), usage['method_name'])
+                usage_rows.append((
+                    symbols.project_id,
+                    variable_id,
+                    component_id,
+                    method_id,
+                    _enum_value(usage.get('usage_type')),
+                    usage.get('line_number')
+                ))
+            insert_rows(
+                cursor, "variableusages",
+                ("project_id", "variable_id", "component_id", "method_id", "usage_type", "line_number"),
+                usage_rows
             )
-            
-            try:
-                cursor.execute(sql, values)
-                db.commit()
-                print(f"✅ Variable '{var_details['name']}' inserted successfully")
-            except pymysql.Error as err:
-                print(f"❌ Error inserting variable '{var_details['name']}': {err}")
-                db.rollback()
+        print(f"✅ {len(variable_ids)} variables and {len(usage_rows)} usages inserted successfully")
+        return variable_ids
 
     except pymysql.Error as err:
         print(f"❌ Database error: {err}")
-        db.rollback()
         raise
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
-        db.rollback()
         raise
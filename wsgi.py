@@ -1,12 +1,17 @@
 from web_app import init_app
-import os, sys, json,traceback
-from flask import Flask, request, render_template, jsonify, send_file,redirect
+import os, sys,traceback
+from flask import Flask, Response, request, render_template, jsonify, send_file,redirect,stream_with_context
 from werkzeug.utils import secure_filename
-from web_app.controller.analyzer_controller import process_folder
-from web_app.controller.file_controller import export_to_json, is_ProjectExist,clear_user_repository
-from web_app.model.json_for_useCase import prepare_json
-import shutil
-from web_app.controller.uml_controller import generate_uml
+from web_app.controller.archive_controller import (
+    ArchiveError, ArchiveLimitError, ArchiveLimits, detect_archive_type, save_archive_upload, secure_path_part
+)
+from web_app.controller.job_controller import submit_analysis_job, get_job_store, stream_job_events
+from web_app.controller.file_controller import is_ProjectExist,clear_user_repository,export_response,reset_project
+from web_app.controller.columnar_controller import table_summary, column_value_counts
+from web_app.controller.uml_controller import generate_uml, stream_uml, generate_uml_batch, stream_uml_batch
+from web_app.controller.plantuml_controller import MIMETYPES, get_render_cache, is_diagram_key
+from web_app.controller.llm_controller import get_llm_cache
+from web_app.controller.analyzer_controller import analysis_cache
 from web_app.model.user_model import login_verification
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "/")))
 app = init_app()
@@ -40,17 +45,26 @@ def login():
 def admin():
     return render_template("admin.html")
 
+def _reset_project_response(remove_exports, message):
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+    project_name = secure_filename(request.form.get("projectName", ""))
+    if not project_name:
+        return jsonify({"error": "❌ Please enter project name"}), 400
+    result = reset_project(project_name, remove_exports)
+    errors = [value for value in result.values() if isinstance(value, str)]
+    if errors:
+        return jsonify({"error": "; ".join(errors), **result}), 500
+    if not result["database"]:
+        return jsonify({"error": f"Project {project_name} has not been analyzed yet", **result}), 404
+    return jsonify({"message": message, **result}), 200
+
 @app.route("/reset_db", methods=["POST"])
 def reset_db_route():
-    db=app.config["db"]
-    status = db.reset_db()
-    if status:
-        jsonify({"message":"Database reset successfully"}),200
-    else:
-        return jsonify({"error": "Fail to reset database"}), 500
-    
+    # Only the logged-in user's project; DB.reset_db (reset_db.py) is the admin reset of everything.
+    return _reset_project_response(True, "Project data and exports reset successfully")
 
-@app.route("/clear_user_repository")
+@app.route("/clear_user_repository", methods=["POST"])
 def clear_repository():
     project_name = request.form.get("clearProjectName")
     if not project_name:
@@ -59,32 +73,8 @@ def clear_repository():
 
 @app.route("/initialize_db", methods=["POST"])
 def initialize_db():
-    db=app.config["db"]
-    cursor=app.config["cursor"]
-    try:
-        db.reset_db()
-        # Ensure JSON_DIR exists in the persistent disk directory
-        if not os.path.exists(app.config["JSON_DIR"]):
-            os.makedirs(app.config["JSON_DIR"], exist_ok=True)
-        # Delete all files from Json_toAI
-        for filename in os.listdir(app.config["JSON_DIR"]):
-            file_path = os.path.join(app.config["JSON_DIR"], filename)
-            try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-            except Exception as del_exc:
-                print(f"Failed to delete {file_path}. Reason: {del_exc}")
-        return jsonify({"message": "✅ All data tables have been created!"}), 200
-
-    except Exception as e:
-        db.rollback()
-        return jsonify({"error": f"❌ Failed to create table: {str(e)}"}), 500
-
-    finally:
-        cursor.close()
-        db.close()
+    # The project's rows and manifest go; its next analysis rebuilds them from the uploads.
+    return _reset_project_response(False, "✅ Project data cleared; the next analysis rebuilds it")
 
 @app.route("/upload", methods=["POST"])
 def upload():
@@ -93,7 +83,16 @@ def upload():
 
     if not (app.config["user_name"] and app.config["is_login"]):
         return redirect("/")
-    
+
+    # A single .zip / .tar.gz sent as the raw request body is extracted while it streams in.
+    # Checked before request.form is touched, which would read the whole body.
+    try:
+        archive_type = detect_archive_type(request.mimetype, request.args.get("archive"))
+    except ArchiveError as e:
+        return jsonify({"error": str(e)}), 400
+    if archive_type:
+        return upload_archive(archive_type, allowed_file)
+
     raw_project_name = request.form.get("projectName", "")
 
     if not raw_project_name:
@@ -128,7 +127,7 @@ def upload():
             # Standardize the path delimiters to forward slash.
             relative_path = relative_path.replace("\\", "/")
             
-            parts = [secure_filename(p) for p in relative_path.split("/") if p]
+            parts = [secure_path_part(p) for p in relative_path.split("/") if p]
             if parts:
                 parts = parts[1:]                           # remove original root
 
@@ -143,63 +142,74 @@ def upload():
         "uploaded_path": base_dir
     }), 200
 
+def upload_archive(archive_type, allowed_file):
+    """
+    Extract an archive upload into the project folder; the project name comes from
+    the query string (?projectName=...) because the body is the archive itself.
+    """
+    project_name = secure_filename(request.args.get("projectName", ""))
+    if not project_name:
+        return jsonify({"error": "Missing projectName"}), 400
+
+    limits = ArchiveLimits(
+        max_archive_bytes=app.config["UPLOAD_MAX_ARCHIVE_BYTES"],
+        max_extracted_bytes=app.config["UPLOAD_MAX_EXTRACTED_BYTES"],
+        max_file_bytes=app.config["UPLOAD_MAX_FILE_BYTES"],
+        max_entries=app.config["UPLOAD_MAX_ARCHIVE_ENTRIES"]
+    )
+    if request.content_length and request.content_length > limits.max_archive_bytes:
+        return jsonify({"error": f"Archive is larger than {limits.max_archive_bytes} bytes"}), 413
+
+    base_dir = os.path.join(app.config["USERS_PATH"], app.config["user_name"], "uploads", project_name)
+    try:
+        result = save_archive_upload(request.stream, archive_type, base_dir, allowed_file, limits)
+    except ArchiveLimitError as e:
+        return jsonify({"error": str(e)}), 413
+    except ArchiveError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "message": f"✅ {result['files']} files extracted successfully!",
+        "uploaded_path": base_dir,
+        "skipped": result["skipped"]
+    }), 200
+
 @app.route("/analyse_folder", methods=["POST"])
 def analyse_folder():
     """
-    This endpoint:
+    This endpoint queues a background job and returns its id right away (202).
+    The job:
       1. Processes the folder (analyzes files/folders and ingests data into MySQL).
+         By default only files added or changed since the last analysis are processed;
+         send incremental=false to re-analyze the whole project.
+         Variable usages are exported with include_usages=true (default: EXPORT_VARIABLE_USAGES).
       2. Retrieves use-case data from the database.
-      3. Exports metadata (JSON, GZ, TXT).
-      4. Returns all error messages (if any) along with a success status.
+      3. Exports metadata (JSON, TXT).
+    Follow it with GET /analyse_folder/<job_id>/events (Server-Sent Events) or
+    GET /analyse_folder/<job_id>; the final state carries the message and all error messages.
     """
-    errorMessages = []
     if not app.config["is_login"]:
         return redirect("/")
-    project_name = request.form.get("projectName")
+    project_name = secure_filename(request.form.get("projectName", ""))
+    if not project_name:
+        return jsonify({"error": "Missing projectName"}), 400
+    incremental = request.form.get("incremental", "true").lower() != "false"
+    include_usages = request.form.get("include_usages")
+    if include_usages is not None:
+        include_usages = include_usages.lower() == "true"
     try:
-        folder_path=f"{app.config['USERS_PATH']}/uploads/{app.config['user_name']}/{project_name}"
+        folder_path = os.path.join(app.config["USERS_PATH"], app.config["user_name"], "uploads", project_name)
         if not os.path.isdir(folder_path):
-            return jsonify({"error": f"Folder '{folder_path}' does not exist."}), 404
-        
-        print(f"✅ Starting analysis on folder: {folder_path}")
-
-        # STEP 1: Process the folder and capture any error messages.
-        folder_errors = process_folder(folder_path)
-        if folder_errors:
-            errorMessages.extend(folder_errors)
-        else:
-            print("✅ Folder processing completed with no errors.")
-        
-        # STEP 2: Retrieve use-case data from the database.
-        data,data_error = prepare_json()
-        if data_error:
-            errorMessages.append(data_error)
-            return jsonify({
-                "message": "Operation completed with some errors.",
-                "error": errorMessages
-            }), 500
-        else:
-            print("✅ Data successfully retrieved.")
-        
-        # STEP 3: Export the use-case data to JSON, GZ, and TXT files.
-        export_result,json_error= export_to_json(data, project_name, app.config["user_name"])
-        if json_error:
-            errorMessages.append(json_error)
-            return jsonify({
-                "message": "Operation completed with some errors.",
-                "error": errorMessages
-            }), 500
-        else:
-            print(f"✅ Data exported successfully to file: {export_result}")
-        
-        # Combine and return all error messages if any.
-        if errorMessages:
-            return jsonify({
-                "message": "Operation completed but some errors occur when analyzing folders. It may affect the result of diagrams",
-                "error": errorMessages
-            }), 500
-        else:
-            return jsonify({"message": "✅ Analysis complete!"}), 200
+            return jsonify({"error": f"Folder '{project_name}' does not exist."}), 404
+
+        job = submit_analysis_job(app, app.config["user_name"], project_name, folder_path,
+                                  incremental, include_usages)
+        return jsonify({
+            "message": "Analysis queued",
+            "job_id": job.job_id,
+            "status_url": f"/analyse_folder/{job.job_id}",
+            "events_url": f"/analyse_folder/{job.job_id}/events"
+        }), 202
 
     except Exception as e:
         return jsonify({
@@ -207,27 +217,84 @@ def analyse_folder():
             "traceback": traceback.format_exc()
         }), 500
 
+def _own_job_state(job_id):
+    # Another user's job is reported as unknown rather than shown.
+    state = get_job_store(app).load(job_id)
+    if state is None or state.get("user_name") != app.config["user_name"]:
+        return None
+    return state
+
+@app.route("/analyse_folder/<job_id>", methods=["GET"])
+def analyse_folder_status(job_id):
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+    state = _own_job_state(job_id)
+    if state is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(state), 200
+
+@app.route("/analyse_folder/<job_id>/events", methods=["GET"])
+def analyse_folder_events(job_id):
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+    if _own_job_state(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return Response(
+        stream_job_events(get_job_store(app), job_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/results", methods=["GET"])
 def get_results():
-    try:
-        user_name = app.config["user_name"]
-        upload_folder=app.config["UPLOAD_FOLDER"]
-        json_dir = f'{upload_folder}/{user_name}/Json_toAI'
-        # List all files in the JSON_DIR ending with .json
-        json_files = [f for f in os.listdir(json_dir) if f.endswith(".json")]
-        if not json_files:
-            return jsonify({"error": "No JSON file found in Json_toAI directory."}), 404
-
-        # Assume there is only one JSON file, so pick the first one.
-        json_file = os.path.join(json_dir, json_files[0])
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            
-        return jsonify(data), 200
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
 
+    project_name = secure_filename(request.args.get("projectName", ""))
+    if not project_name:
+        return jsonify({"error": "Please provide a project name."}), 400
+
+    user_name = app.config["user_name"]
+    json_file = os.path.join(app.config["USERS_PATH"], user_name, "Json_toAI", project_name, f"{project_name}.json")
+    try:
+        return export_response(json_file)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/results/columnar", methods=["GET"])
+def get_columnar_results():
+    """
+    Answers from the project's Arrow export without loading it whole:
+      ?projectName=&table=variables                 rows and column types of one table
+      ?projectName=&table=variables&column=scope    rows per value of one column
+    """
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+
+    project_name = secure_filename(request.args.get("projectName", ""))
+    table = request.args.get("table", "")
+    column = request.args.get("column")
+    if not project_name or not table:
+        return jsonify({"error": "Please provide a project name and a table."}), 400
+
+    user_name = app.config["user_name"]
+    try:
+        if column:
+            if table_summary(user_name, project_name, table) is None:
+                return jsonify({"error": f"No columnar export of {table} for {project_name}."}), 404
+            counts = column_value_counts(user_name, project_name, table, column)
+            # A list, since a column can hold NULL (None is not a JSON object key).
+            counts = [{"value": value, "rows": rows} for value, rows in counts.items()]
+            return jsonify({"table": table, "column": column, "counts": counts}), 200
+        summary = table_summary(user_name, project_name, table)
+        if summary is None:
+            return jsonify({"error": f"No columnar export of {table} for {project_name}."}), 404
+        return jsonify(summary), 200
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+
 @app.route("/get_uml", methods=["POST"])
 def get_uml():
     if not (app.config["user_name"] and app.config["is_login"]):
@@ -237,9 +304,125 @@ def get_uml():
     project_name = request.form.get("project_name")
     user_name = app.config["user_name"]
     
+    # Ask the model again even if it already answered for this export and diagram type.
+    regenerate = request.form.get("regenerate", "").lower() in ("1", "true", "on")
+
     json_dir = f'{app.config["USERS_PATH"]}/{user_name}/Json_toAI/{project_name}'
 
-    return generate_uml(document_type, json_dir)
+    # "single" prompt, "chunked" map-reduce, "local" (class, component and package diagrams
+    # from the analysis), or "auto" (local when possible, chunked only when over the token budget).
+    mode = request.form.get("mode") or None
+
+    # The JSON only describes the diagram; the PDF, SVG or PNG itself is fetched from /diagrams.
+    fmt = request.form.get("format", "pdf").lower()
+
+    return generate_uml(document_type, json_dir, regenerate, mode,
+                        user_name=user_name, project_name=project_name, fmt=fmt)
+
+@app.route("/get_uml/stream", methods=["GET"])
+def get_uml_stream():
+    """
+    /get_uml as Server-Sent Events (GET, so the page can use EventSource): the model's
+    reply is forwarded while it is written and rendering starts at its @enduml.
+    """
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+
+    document_type = request.args.get("document_type", "")
+    project_name = secure_filename(request.args.get("project_name", ""))
+    if not (document_type and project_name):
+        return jsonify({"error": "Please provide a document type and a project name."}), 400
+    user_name = app.config["user_name"]
+    regenerate = request.args.get("regenerate", "").lower() in ("1", "true", "on")
+    json_dir = f'{app.config["USERS_PATH"]}/{user_name}/Json_toAI/{project_name}'
+
+    return Response(
+        stream_with_context(stream_uml(
+            document_type, json_dir, regenerate, request.args.get("mode") or None,
+            user_name=user_name, project_name=project_name, fmt=request.args.get("format", "pdf").lower()
+        )),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/get_uml/batch", methods=["POST"])
+def get_uml_batch():
+    """
+    Several diagrams of one project (a document_type field per diagram), generated
+    concurrently. All of them in one JSON response, or with stream=1 as
+    Server-Sent Events, one "diagram" event as each finishes.
+    """
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+
+    document_types = request.form.getlist("document_type")
+    project_name = secure_filename(request.form.get("project_name", ""))
+    if not project_name:
+        return jsonify({"error": "Please provide a project name."}), 400
+    user_name = app.config["user_name"]
+    regenerate = request.form.get("regenerate", "").lower() in ("1", "true", "on")
+    mode = request.form.get("mode") or None
+    fmt = request.form.get("format", "pdf").lower()
+    json_dir = f'{app.config["USERS_PATH"]}/{user_name}/Json_toAI/{project_name}'
+
+    if request.form.get("stream", "").lower() in ("1", "true", "on"):
+        return Response(
+            stream_with_context(stream_uml_batch(
+                document_types, json_dir, regenerate, mode, user_name=user_name, project_name=project_name, fmt=fmt
+            )),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    return generate_uml_batch(document_types, json_dir, regenerate, mode,
+                              user_name=user_name, project_name=project_name, fmt=fmt)
+
+@app.route("/llm_cache/stats", methods=["GET"])
+def llm_cache_stats():
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+    cache = get_llm_cache(app)
+    if cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **cache.stats()}), 200
+
+@app.route("/analysis_cache/stats", methods=["GET"])
+def analysis_cache_stats():
+    """
+    Size of the analysis cache, and the hits and misses of the analyses run by this
+    gunicorn worker (cached results are looked up here before files are handed to
+    the analysis processes).
+    """
+    if not (app.config["user_name"] and app.config["is_login"]):
+        return jsonify({"error": "Please log in first."}), 401
+    cache = analysis_cache()
+    if cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **cache.stats()}), 200
+
+@app.route("/diagrams/<key>", methods=["GET"])
+def get_diagram(key):
+    """
+    A rendered diagram from the render cache, sent from disk as it is. The URL is
+    derived from the diagram content, so it never changes meaning and may be cached
+    for a year. ?download=<name> sends it as an attachment named <name>.<format>.
+    """
+    cache = get_render_cache(app)
+    path = cache.touch(key) if cache is not None and is_diagram_key(key) else None
+    if path is None:
+        return jsonify({"error": "Diagram not found."}), 404
+
+    fmt = key.rsplit(".", 1)[1]
+    download = secure_filename(request.args.get("download", ""))
+    try:
+        response = send_file(
+            path, mimetype=MIMETYPES[fmt], etag=key, conditional=True,
+            as_attachment=bool(download), download_name=f"{download}.{fmt}" if download else None
+        )
+    except FileNotFoundError:
+        # Evicted between the lookup and the open.
+        return jsonify({"error": "Diagram not found."}), 404
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0')
\ No newline at end of file